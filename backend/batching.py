@@ -0,0 +1,142 @@
+"""
+Dynamic micro-batching for model inference.
+
+Concurrent requests submit one item each; a single background loop collects
+up to ``max_batch_size`` items (or waits at most ``max_wait_ms`` after the
+first one arrives), runs one batched call and hands every caller its own
+result.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher",
+        executor=None,
+    ):
+        """
+        run_batch: blocking function mapping a list of items to a list of
+                   results of the same length (one result per item).
+        executor:  optional executors.BoundedExecutor to run batches on;
+                   defaults to the event loop's default thread pool.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self.executor = executor
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self._batch_sizes: Counter = Counter()
+        self._items = 0
+        self._batches = 0
+        self._batch_time_total = 0.0
+
+    # -------------------
+    # PUBLIC API
+    # -------------------
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its own result."""
+        self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    def stats(self) -> dict:
+        mean = self._items / self._batches if self._batches else 0.0
+        avg_ms = 1000.0 * self._batch_time_total / self._batches if self._batches else 0.0
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": round(mean, 3),
+            "avg_batch_ms": round(avg_ms, 3),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            # batch size -> number of batches of that size
+            "batch_size_histogram": {
+                str(k): v for k, v in sorted(self._batch_sizes.items())
+            },
+        }
+
+    # -------------------
+    # INTERNALS
+    # -------------------
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def _collect(self) -> list:
+        # Block until the first item arrives, then fill the batch until it is
+        # full or the wait budget (measured from the first item) runs out.
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Still take whatever is already waiting, without blocking
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _loop(self):
+        while True:
+            batch = await self._collect()
+
+            # Callers that gave up (e.g. client disconnected) are dropped
+            batch = [(item, fut) for item, fut in batch if not fut.cancelled()]
+            if not batch:
+                continue
+
+            items = [item for item, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = await self._run(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: run_batch returned {len(results)} results "
+                        f"for {len(items)} items"
+                    )
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            self._batch_time_total += time.perf_counter() - start
+            self._batches += 1
+            self._items += len(items)
+            self._batch_sizes[len(items)] += 1
+
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    async def _run(self, items: list) -> list:
+        # Run the blocking batch function off the event loop so it keeps
+        # accepting requests while the model is busy.
+        if self.executor is not None:
+            return await self.executor.run(self.run_batch, items)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run_batch, items)
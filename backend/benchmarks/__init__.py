@@ -0,0 +1,12 @@
+"""
+Benchmarks for the detection services. Run each module from backend/ with
+python -m benchmarks.<name>; every module's docstring describes its run.
+
+    synthetic      reproducible test images and videos (bench_data/)
+    bench_stages   per-stage micro-benchmarks of both pipelines
+    loadgen        concurrent load against the apps, in-process or over HTTP
+    results        result JSON files and regression checks against a baseline
+
+plus one-off comparisons of specific optimisations (bench_heuristics,
+bench_video_reader, bench_face_tracking, bench_unified_server).
+"""
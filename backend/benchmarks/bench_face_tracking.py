@@ -0,0 +1,96 @@
+"""
+Benchmark detect-then-track face extraction against MTCNN on every frame.
+
+For each video and each frame count, samples one set of frame indices the
+way the video service does, decodes them once and finds face boxes with:
+
+    detect   detect_face_boxes(): MTCNN on every sampled frame
+    track    detect_face_boxes_tracked(): MTCNN on anchor frames (plus
+             re-detections), boxes interpolated and verified in between
+
+and reports MTCNN frames, time, how often both agree on "face / no face"
+and the IoU of the boxes where both found one.
+
+Run (from backend/):
+    python -m benchmarks.bench_face_tracking path/to/clip.mp4 [more.mp4 ...]
+    python -m benchmarks.bench_face_tracking clip.mp4 --frames 10,30,60
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from facenet_pytorch import MTCNN
+
+from training.train_ffpp_video_model import (
+    IMG_SIZE,
+    _box_iou,
+    detect_face_boxes,
+    detect_face_boxes_tracked,
+    open_video,
+    read_frames,
+    sample_frame_indices,
+)
+
+
+class CountingMTCNN:
+    """Wraps MTCNN to count frames passed to detect()."""
+
+    def __init__(self, mtcnn: MTCNN):
+        self._mtcnn = mtcnn
+        self.frames = 0
+
+    def detect(self, imgs, landmarks=False):
+        self.frames += len(imgs)
+        return self._mtcnn.detect(imgs, landmarks=landmarks)
+
+    def __getattr__(self, name):
+        return getattr(self._mtcnn, name)
+
+
+def sampled_frames(path: Path, num_frames: int):
+    cap, keyframes, total = open_video(path, num_frames)
+    try:
+        indices = sorted(set(sample_frame_indices(total, num_frames)))
+        decoded = read_frames(cap, indices, keyframes)
+    finally:
+        cap.release()
+    order = sorted(decoded)
+    return order, [cv2.cvtColor(decoded[i], cv2.COLOR_BGR2RGB) for i in order]
+
+
+def run(fn, mtcnn: MTCNN, *args):
+    counting = CountingMTCNN(mtcnn)
+    start = time.perf_counter()
+    boxes = fn(*args, counting)
+    return boxes, counting.frames, 1000.0 * (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+", type=Path)
+    parser.add_argument("--frames", default="10,30", help="comma-separated frames per video")
+    args = parser.parse_args()
+
+    mtcnn = MTCNN(image_size=IMG_SIZE[0], margin=0, keep_all=False, post_process=False, device="cpu")
+    np.random.seed(0)
+
+    print(f"{'video':<28}{'frames':>7}{'mtcnn det/trk':>15}{'ms det/trk':>18}{'speedup':>9}{'found agree':>13}{'mean IoU':>10}")
+    for path in args.videos:
+        for num_frames in (int(f) for f in args.frames.split(",")):
+            order, frames = sampled_frames(path, num_frames)
+            detect_face_boxes(frames[:1], mtcnn)  # warm-up
+            full, n_full, t_full = run(detect_face_boxes, mtcnn, frames)
+            tracked, n_trk, t_trk = run(detect_face_boxes_tracked, mtcnn, frames, order)
+
+            agree = np.mean([(a is None) == (b is None) for a, b in zip(full, tracked)])
+            ious = [_box_iou(a, b) for a, b in zip(full, tracked) if a is not None and b is not None]
+            mean_iou = f"{np.mean(ious):.3f}" if ious else "-"
+            print(f"{path.name[:27]:<28}{len(frames):>7}{n_full:>8}/{n_trk:<6}{t_full:>10.0f}/{t_trk:<7.0f}"
+                  f"{t_full / t_trk:>8.2f}x{agree * 100:>12.1f}%{mean_iou:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Micro-benchmark and accuracy check for heuristics.py.
+
+Compares heuristics.heuristic_scores against the original full-resolution
+implementation (three cvtColor calls, float64 Laplacian), reproduced below
+as the reference, on photos rendered at several resolutions:
+
+    - max / mean |score difference| per score (texture, lighting, pixels)
+    - per-image latency of both and the speed-up
+
+Images come from --images (any folder of .jpg/.png, searched recursively),
+falling back to data_small/test, then to synthetic textured images.
+
+Run (from backend/):
+    python -m benchmarks.bench_heuristics
+    python -m benchmarks.bench_heuristics --images data_small/test --limit 50
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from heuristics import HEURISTICS_SAMPLE_SIZE, HEURISTICS_TOLERANCE, heuristic_scores
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+RESOLUTIONS = {"480p": 480, "1080p": 1080, "4k": 2160}  # short side
+
+
+# -------------------
+# REFERENCE (original main.py implementation)
+# -------------------
+def reference_scores(image_bgr: np.ndarray):
+    h, w, _ = image_bgr.shape
+    size = int(min(h, w) * 0.7)
+    y1 = (h - size) // 2
+    x1 = (w - size) // 2
+    face = image_bgr[y1 : y1 + size, x1 : x1 + size]
+
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    var = cv2.Laplacian(gray, cv2.CV_64F).var()
+    tex = int(float(np.clip((var - 10.0) / (300.0 - 10.0), 0.0, 1.0)) * 100)
+
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    gh, gw = gray.shape
+    diff = abs(float(gray[:, : gw // 2].mean()) - float(gray[:, gw // 2 :].mean()))
+    std_dev = float(gray.std())
+    s = (diff / 50.0 + max(0, 1.0 - std_dev / 60.0)) / 2.0
+    light = int(float(np.clip(s, 0.0, 1.0)) * 100)
+
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    edge_density = cv2.Canny(gray, 100, 200).mean() / 255.0
+    noise_level = cv2.absdiff(gray, cv2.GaussianBlur(gray, (5, 5), 0)).mean() / 255.0
+    s = (edge_density * 1.5 + noise_level * 2.0) / 2.0
+    pix = int(float(np.clip(s, 0.0, 1.0)) * 100)
+    return tex, light, pix
+
+
+# -------------------
+# TEST IMAGES
+# -------------------
+def load_sources(folder, limit: int):
+    if folder is None and (BASE_DIR / "data_small" / "test").exists():
+        folder = BASE_DIR / "data_small" / "test"
+    if folder is not None:
+        paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        images = [cv2.imread(str(p)) for p in paths[:limit]]
+        return [img for img in images if img is not None]
+
+    # Synthetic stand-ins: smooth gradients + blobs + fine texture
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(limit):
+        base = cv2.resize(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8), (640, 480), interpolation=cv2.INTER_CUBIC)
+        detail = rng.normal(0, rng.uniform(2, 25), base.shape)
+        images.append(np.clip(base + detail, 0, 255).astype(np.uint8))
+    return images
+
+
+def render(img: np.ndarray, short_side: int, rng) -> np.ndarray:
+    """Rescale to a target resolution and add mild sensor noise."""
+    scale = short_side / min(img.shape[:2])
+    out = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 3, out.shape)
+    return np.clip(out + noise, 0, 255).astype(np.uint8)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, 1000.0 * (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=Path, default=None)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--sample-size", type=int, default=HEURISTICS_SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)  # per-request cost, as on a busy CPU pool
+    rng = np.random.default_rng(1)
+    sources = load_sources(args.images, args.limit)
+    print(f"📷 {len(sources)} source images, sample size {args.sample_size}")
+
+    ok = True
+    print(f"\n{'res':<7}{'ref ms':>9}{'new ms':>9}{'speed-up':>10}   max |Δ| (tex, light, pix)   mean |Δ|")
+    for label, short_side in RESOLUTIONS.items():
+        images = [render(img, short_side, rng) for img in sources]
+
+        ref, ref_ms = timed(lambda: np.array([reference_scores(img) for img in images]))
+        new, new_ms = timed(lambda: np.array([heuristic_scores(img, args.sample_size) for img in images]))
+
+        diff = np.abs(ref - new)
+        max_diff = diff.max(axis=0)
+        ok &= bool(np.all(max_diff <= np.array(HEURISTICS_TOLERANCE)))
+        print(
+            f"{label:<7}{ref_ms / len(images):>9.2f}{new_ms / len(images):>9.2f}"
+            f"{ref_ms / new_ms:>9.1f}x   {str(tuple(int(d) for d in max_diff)):<27}"
+            f"{tuple(round(float(d), 2) for d in diff.mean(axis=0))}"
+        )
+
+    status = "✅ within" if ok else "❌ outside"
+    print(f"\n{status} documented tolerance {HEURISTICS_TOLERANCE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Micro-benchmark every stage of the image and video pipelines on synthetic
+inputs (benchmarks/synthetic.py), one stage at a time:
+
+    image.decode[<image>]        decode_image() of the JPEG bytes
+    image.resize[<image>]        resize_for_model() to the model input size
+    image.heuristics[<image>]    heuristic_scores() on the full-res image
+    image.preprocess[b<N>]       TensorBatchBuffer.fill() (normalisation)
+    image.forward[b<N>]          EfficientNet-B4 forward
+    video.decode[<video>]        open_video() + read_frames() of VIDEO_N_PASSES samplings
+    video.mtcnn[<video>]         detect_face_boxes() on those frames
+    video.backbone[b<N>]         embed_frames() on N face crops
+    video.gru[b<P>]              classify_sequence() on P clips' features
+
+Models are built with random weights (latency does not depend on them), so
+no checkpoint is needed. TOPOLOGY / THREAD_BUDGET apply as in the services;
+--precision / --channels-last run the forwards as IMAGE_PRECISION etc. would
+(see runtimes.py). Results
+(p50/p95/p99, throughput, RSS) go to --out as JSON (see results.py);
+--baseline compares against an earlier run and exits 1 on a regression.
+
+Run (from backend/):
+    python -m benchmarks.bench_stages
+    python -m benchmarks.bench_stages --repeat 50 --only image --out bench_results/stages.json
+    python -m benchmarks.bench_stages --precision bf16 --channels-last --out bench_results/stages_bf16.json
+    python -m benchmarks.bench_stages --baseline bench_results/stages_baseline.json
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from facenet_pytorch import MTCNN
+
+from benchmarks.results import add_result_args, check_baseline, summarize, write_results
+from benchmarks.synthetic import DEFAULT_OUT, load_manifest
+from detectors import DeepfakeDetector, IMG_SIZE as IMAGE_SIZE
+from heuristics import heuristic_scores
+from image_pipeline import TensorBatchBuffer, decode_image, resize_for_model
+from model_loader import process_memory
+from runtimes import PRECISIONS, EagerRuntime, resolve_precision
+from topology import apply_topology
+from training.train_ffpp_video_model import (
+    FRAMES_PER_VIDEO,
+    IMG_SIZE as VIDEO_SIZE,
+    VideoDeepfakeModel,
+    detect_face_boxes,
+    open_video,
+    read_frames,
+    sample_frame_indices,
+)
+from verdicts import VIDEO_N_PASSES
+
+# -------------------
+# CONFIG
+# -------------------
+IMAGE_BATCHES = (1, 8)
+VIDEO_FRAME_BATCHES = (8, FRAMES_PER_VIDEO * VIDEO_N_PASSES)
+VIDEO_CLIP_BATCHES = (1, VIDEO_N_PASSES)
+
+
+def bench(fn, repeat: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+# -------------------
+# STAGES
+# -------------------
+def image_stages(manifest: dict, data_dir: Path, repeat: int, warmup: int, precision: str, channels_last: bool) -> dict:
+    results = {}
+    for item in manifest["images"]:
+        data = (data_dir / item["path"]).read_bytes()
+        img = decode_image(data)
+        results[f"image.decode[{item['name']}]"] = bench(lambda: decode_image(data), repeat, warmup)
+        results[f"image.resize[{item['name']}]"] = bench(lambda: resize_for_model(img, IMAGE_SIZE), repeat, warmup)
+        results[f"image.heuristics[{item['name']}]"] = bench(lambda: heuristic_scores(img), repeat, warmup)
+
+    model = EagerRuntime(DeepfakeDetector(), torch.device("cpu"), precision, channels_last)
+    buffer = TensorBatchBuffer(IMAGE_SIZE, max(IMAGE_BATCHES))
+    resized = resize_for_model(decode_image((data_dir / manifest["images"][0]["path"]).read_bytes()), IMAGE_SIZE)
+    for n in IMAGE_BATCHES:
+        images = [resized] * n
+        results[f"image.preprocess[b{n}]"] = bench(lambda: buffer.fill(images), repeat, warmup)
+        x = buffer.fill(images).clone()
+        with torch.inference_mode():
+            results[f"image.forward[b{n}]"] = bench(lambda: model(x), repeat, warmup)
+    return results
+
+
+def video_stages(manifest: dict, data_dir: Path, repeat: int, warmup: int, precision: str, channels_last: bool) -> dict:
+    results = {}
+    mtcnn = MTCNN(image_size=VIDEO_SIZE[0], margin=0, keep_all=False, post_process=False, device="cpu")
+    for item in manifest["videos"]:
+        path = data_dir / item["path"]
+
+        def decode():
+            cap, keyframes, total = open_video(path, FRAMES_PER_VIDEO)
+            try:
+                indices = [i for _ in range(VIDEO_N_PASSES) for i in sample_frame_indices(total, FRAMES_PER_VIDEO)]
+                return read_frames(cap, indices, keyframes)
+            finally:
+                cap.release()
+
+        np.random.seed(0)  # same samplings every run
+        results[f"video.decode[{item['name']}]"] = bench(decode, repeat, warmup)
+        frames_rgb = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in decode().values()]
+        results[f"video.mtcnn[{item['name']}]"] = bench(lambda: detect_face_boxes(frames_rgb, mtcnn), repeat, warmup)
+
+    model = EagerRuntime(VideoDeepfakeModel(pretrained=False), torch.device("cpu"), precision, channels_last)
+    with torch.inference_mode():
+        for n in VIDEO_FRAME_BATCHES:
+            frames = torch.randn(n, 3, *VIDEO_SIZE)
+            results[f"video.backbone[b{n}]"] = bench(lambda: model.embed_frames(frames), repeat, warmup)
+        feature_dim = model.model.backbone.num_features
+        for p in VIDEO_CLIP_BATCHES:
+            feats = torch.randn(p, FRAMES_PER_VIDEO, feature_dim)
+            results[f"video.gru[b{p}]"] = bench(lambda: model.classify_sequence(feats), repeat, warmup)
+    return results
+
+
+# -------------------
+# MAIN
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", type=Path, default=DEFAULT_OUT, help="synthetic inputs (generated if missing)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", choices=["image", "video"], default=None)
+    parser.add_argument("--precision", choices=PRECISIONS, default="fp32")
+    parser.add_argument("--channels-last", action="store_true")
+    add_result_args(parser, "stages.json")
+    args = parser.parse_args()
+
+    apply_topology()
+    torch.manual_seed(0)
+    manifest = load_manifest(args.data)
+    precision = resolve_precision(args.precision, torch.device("cpu"))
+
+    results = {}
+    if args.only in (None, "image"):
+        results.update(image_stages(manifest, args.data, args.repeat, args.warmup, precision, args.channels_last))
+    if args.only in (None, "video"):
+        results.update(video_stages(manifest, args.data, args.repeat, args.warmup, precision, args.channels_last))
+
+    print(f"\n{'stage':<44}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}")
+    for name, r in results.items():
+        print(f"{name:<44}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['throughput_per_s']:>10.1f}")
+
+    payload = write_results(args.out, "stages", results, process_memory(), args)
+    sys.exit(0 if check_baseline(payload, args.baseline, args.tolerance) else 1)
+
+
+if __name__ == "__main__":
+    main()
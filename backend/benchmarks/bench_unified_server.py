@@ -0,0 +1,167 @@
+"""
+Benchmark the single-process server (server.py) against separate services.
+
+Memory: the image service, the video service and the unified server are
+each started in a fresh process. The process loads its models, analyses
+one image and/or video and reports its resident set size. The table
+compares image + video against the unified process.
+
+Latency isolation: in one unified process, image analyses run back to back:
+    idle        nothing else running
+    loaded      while --video-workers video analyses run in a loop
+once with the priority scheduler (SCHEDULER_PRIORITIES=1) and once with
+plain FIFO pools (SCHEDULER_PRIORITIES=0). Result cache and near-duplicate
+lookups are disabled so every request really runs the models.
+
+Run (from backend/):
+    python -m benchmarks.bench_unified_server --image photo.jpg --video clip.mp4
+    python -m benchmarks.bench_unified_server --image photo.jpg --video clip.mp4 --requests 50 --video-workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+
+
+# -------------------
+# CHILD PROCESSES
+# -------------------
+def load_services(services: str):
+    os.environ["SERVER_SERVICES"] = services
+    import server
+    from model_loader import MODEL_REGISTRY
+
+    for loader in MODEL_REGISTRY.values():
+        loader.get()
+    return server.services
+
+
+async def child_memory(args):
+    from model_loader import process_memory
+
+    services = load_services(args.services)
+    if "image" in services:
+        await services["image"].analyse_image(args.image.read_bytes())
+    if "video" in services:
+        await services["video"].analyse_video(args.video)
+    return process_memory()
+
+
+def percentiles(latencies: list) -> dict:
+    ms = 1000.0 * np.array(latencies)
+    return {"p50": round(float(np.percentile(ms, 50)), 1), "p95": round(float(np.percentile(ms, 95)), 1),
+            "max": round(float(ms.max()), 1)}
+
+
+async def drain_pools():
+    """Wait for work the cancelled callers left running (exiting under it aborts)."""
+    from executors import executor_stats
+
+    while any(s["active"] or s["queued"] for s in executor_stats().values() if "active" in s):
+        await asyncio.sleep(0.05)
+
+
+async def child_latency(args):
+    services = load_services("image,video")
+    image, video = services["image"], services["video"]
+    data = args.image.read_bytes()
+
+    async def image_latencies():
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            await image.analyse_image(data)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    await image.analyse_image(data)  # warm-up
+    idle = await image_latencies()
+
+    videos_done = 0
+
+    async def video_loop():
+        nonlocal videos_done
+        while True:
+            await video.analyse_video(args.video)
+            videos_done += 1
+
+    loops = [asyncio.ensure_future(video_loop()) for _ in range(args.video_workers)]
+    await asyncio.sleep(1.0)  # let the video work ramp up
+    start = time.perf_counter()
+    loaded = await image_latencies()
+    elapsed = time.perf_counter() - start
+    for task in loops:
+        task.cancel()
+    await asyncio.gather(*loops, return_exceptions=True)
+    await drain_pools()
+
+    return {
+        "idle": percentiles(idle),
+        "loaded": percentiles(loaded),
+        "videos_per_s": round(videos_done / (elapsed + 1.0), 3),
+    }
+
+
+def run_child(mode: str, args, **env) -> dict:
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_unified_server", "--child", mode,
+        "--image", str(args.image.resolve()), "--video", str(args.video.resolve()),
+        "--requests", str(args.requests), "--video-workers", str(args.video_workers),
+        "--services", env.pop("services", "image,video"),
+    ]
+    child_env = {**os.environ, "RESULT_CACHE_BACKEND": "off", "NEAR_DUP_ENABLED": "0", **env}
+    child_env["PYTHONPATH"] = os.pathsep.join(p for p in (str(BASE_DIR), os.environ.get("PYTHONPATH")) if p)
+    out = subprocess.run(cmd, cwd=args.cwd, env=child_env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{mode} child failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# -------------------
+# MAIN
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", type=Path, required=True)
+    parser.add_argument("--video", type=Path, required=True)
+    parser.add_argument("--requests", type=int, default=30, help="image requests per phase")
+    parser.add_argument("--video-workers", type=int, default=2, help="concurrent video analyses under load")
+    parser.add_argument("--cwd", type=Path, default=BASE_DIR, help="directory the services run from (models/)")
+    parser.add_argument("--child", choices=["memory", "latency"], help=argparse.SUPPRESS)
+    parser.add_argument("--services", default="image,video", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run = child_memory if args.child == "memory" else child_latency
+        print(json.dumps(asyncio.run(run(args))))
+        return
+
+    print("📏 Memory (separate processes vs one server)")
+    mem = {s: run_child("memory", args, services=s) for s in ("image", "video", "image,video")}
+    separate = mem["image"]["peak_rss_mb"] + mem["video"]["peak_rss_mb"]
+    print(f"{'':<24}{'rss MB':>10}{'peak MB':>10}")
+    for name, label in (("image", "image service"), ("video", "video service"), ("image,video", "unified server")):
+        print(f"{label:<24}{mem[name].get('rss_mb', 0):>10.1f}{mem[name]['peak_rss_mb']:>10.1f}")
+    unified = mem["image,video"]["peak_rss_mb"]
+    print(f"{'image + video':<24}{'':>10}{separate:>10.1f}")
+    print(f"{'saved':<24}{'':>10}{separate - unified:>10.1f}  ({100 * (separate - unified) / separate:.1f}%)")
+
+    print(f"\n⏱️  Image latency, {args.requests} requests, {args.video_workers} video analyses running")
+    print(f"{'scheduler':<12}{'idle p50/p95 ms':>20}{'loaded p50/p95 ms':>22}{'loaded max':>12}{'videos/s':>10}")
+    for label, flag in (("priority", "1"), ("fifo", "0")):
+        r = run_child("latency", args, SCHEDULER_PRIORITIES=flag)
+        print(f"{label:<12}{r['idle']['p50']:>11.1f}/{r['idle']['p95']:<8.1f}{r['loaded']['p50']:>13.1f}/"
+              f"{r['loaded']['p95']:<8.1f}{r['loaded']['max']:>12.1f}{r['videos_per_s']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark the sequential frame reader against seek-per-frame.
+
+For each video, samples frame indices the way the video service does
+(FRAMES_PER_VIDEO jittered indices x N passes) and reads them with:
+
+    seek   cap.set(CAP_PROP_POS_FRAMES, i) + cap.read() per index (old path)
+    scan   read_frames(): sorted indices, grab() forward, retrieve() only the
+           wanted frames, seeking only when it decodes fewer frames
+           (keyframes from a packet-only probe; probe time included)
+
+and checks that both return identical frames.
+
+Run (from backend/):
+    python -m benchmarks.bench_video_reader path/to/clip.mp4 [more.mp4 ...]
+    python -m benchmarks.bench_video_reader            # synthetic 2-minute clip
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from training.train_ffpp_video_model import (
+    FRAMES_PER_VIDEO,
+    probe_keyframes,
+    read_frames,
+    read_frames_seeking,
+    sample_frame_indices,
+)
+
+
+def synthetic_video(path: Path, seconds: int = 120, fps: int = 30, size=(640, 360)):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (size[1], size[0] * 2, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for i in range(seconds * fps):
+        x = (i * 3) % size[0]
+        writer.write(np.ascontiguousarray(base[:, x : x + size[0]]))
+    writer.release()
+
+
+def time_seek(path: Path, indices):
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(str(path))
+    frames = read_frames_seeking(cap, indices)
+    cap.release()
+    return frames, 1000.0 * (time.perf_counter() - start)
+
+
+def time_scan(path: Path, indices):
+    start = time.perf_counter()
+    probe = probe_keyframes(path)
+    cap = cv2.VideoCapture(str(path))
+    frames = read_frames(cap, indices, probe[0] if probe else None)
+    cap.release()
+    return frames, 1000.0 * (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="*", type=Path)
+    parser.add_argument("--passes", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    videos = list(args.videos)
+    tmp = None
+    if not videos:
+        tmp = tempfile.TemporaryDirectory()
+        path = Path(tmp.name) / "synthetic.mp4"
+        print("🎞️  Writing a synthetic 2-minute clip...")
+        synthetic_video(path)
+        videos = [path]
+
+    np.random.seed(0)
+    print(f"\n{'video':<28}{'frames':>8}{'GOP':>7}{'seek ms':>10}{'scan ms':>10}{'speed-up':>10}  identical")
+    for path in videos:
+        cap = cv2.VideoCapture(str(path))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        probe = probe_keyframes(path)
+        gop = f"{np.mean(np.diff(probe[0])):.0f}" if probe and len(probe[0]) > 1 else "?"
+
+        seek_ms, scan_ms, same = [], [], True
+        for _ in range(args.repeats):
+            indices = [i for _ in range(args.passes) for i in sample_frame_indices(total, FRAMES_PER_VIDEO)]
+            a, t_seek = time_seek(path, indices)
+            b, t_scan = time_scan(path, indices)
+            seek_ms.append(t_seek)
+            scan_ms.append(t_scan)
+            same &= a.keys() == b.keys() and all(np.array_equal(a[k], b[k]) for k in a)
+
+        seek, scan = np.median(seek_ms), np.median(scan_ms)
+        print(f"{path.name[:27]:<28}{total:>8}{gop:>7}{seek:>10.1f}{scan:>10.1f}{seek / scan:>9.1f}x  {'✅' if same else '❌'}")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
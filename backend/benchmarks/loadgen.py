@@ -0,0 +1,245 @@
+"""
+Load generator for the detection APIs.
+
+Sends synthetic uploads (benchmarks/synthetic.py) at a fixed concurrency,
+either in-process (the app and its lifespan run inside this process, over
+httpx's ASGI transport) or to a running server over HTTP:
+
+    image       POST /detect/image            each image of the manifest in turn
+    video       POST /detect/video            each video in turn
+    timeline    POST /detect/video/timeline
+
+Reports latency p50/p95/p99 of the successful requests, throughput, status
+codes and RSS (in-process: this process; HTTP: the server's /metrics, when
+it exposes detectify_process_*_rss_bytes). Results go to --out as JSON (see
+results.py); --baseline compares against an earlier run and exits 1 on a
+regression.
+
+Identical uploads are answered from the result cache. In-process runs
+disable it (and near-duplicate lookups) unless --cache; for HTTP runs start
+the server with RESULT_CACHE_BACKEND=off NEAR_DUP_ENABLED=0 to measure the
+models rather than the cache.
+
+Needs httpx (pip install httpx).
+
+Run (from backend/):
+    python -m benchmarks.loadgen --app main --kind image --concurrency 8 --requests 200
+    python -m benchmarks.loadgen --app server --kind video --concurrency 2 --duration 60
+    python -m benchmarks.loadgen --url http://localhost:8000 --kind image --concurrency 16 \\
+        --baseline bench_results/load_image_baseline.json
+"""
+
+import argparse
+import asyncio
+import collections
+import importlib
+import mimetypes
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.results import add_result_args, check_baseline, summarize, write_results
+from benchmarks.synthetic import DEFAULT_OUT, load_manifest
+
+# -------------------
+# CONFIG
+# -------------------
+ENDPOINTS = {"image": "/detect/image", "video": "/detect/video", "timeline": "/detect/video/timeline"}
+READY = {"main": "/ready", "main_video": "/ready_video", "server": "/ready_server"}
+READY_TIMEOUT_S = 300.0
+
+
+def payloads(manifest: dict, data_dir: Path, kind: str) -> list:
+    """(name, filename, content type, bytes) per input, read once up front."""
+    items = manifest["images" if kind == "image" else "videos"]
+    if not items:
+        raise SystemExit(f"No synthetic {'images' if kind == 'image' else 'videos'} in {data_dir}")
+    out = []
+    for item in items:
+        path = data_dir / item["path"]
+        content_type = mimetypes.guess_type(path.name)[0] or ("image/jpeg" if kind == "image" else "video/mp4")
+        out.append((item["name"], path.name, content_type, path.read_bytes()))
+    return out
+
+
+# -------------------
+# TARGETS
+# -------------------
+class InProcessTarget:
+    """The app module and its lifespan inside this process."""
+
+    def __init__(self, app_module: str):
+        self.app_module = app_module
+
+    async def __aenter__(self):
+        import httpx
+
+        self.module = importlib.import_module(self.app_module)
+        self._lifespan = self.module.lifespan(self.module.app)
+        await self._lifespan.__aenter__()
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.module.app), base_url="http://loadgen", timeout=None
+        )
+        await wait_ready(self.client, READY[self.app_module])
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self._lifespan.__aexit__(*exc)
+
+    async def memory(self) -> dict:
+        from model_loader import process_memory
+
+        return process_memory()
+
+
+class HttpTarget:
+    def __init__(self, url: str, ready_path: Optional[str]):
+        self.url = url
+        self.ready_path = ready_path
+
+    async def __aenter__(self):
+        import httpx
+
+        self.client = httpx.AsyncClient(base_url=self.url, timeout=None)
+        if self.ready_path:
+            await wait_ready(self.client, self.ready_path)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+
+    async def memory(self) -> dict:
+        """The server's RSS from its /metrics, if it has one."""
+        try:
+            text = (await self.client.get("/metrics")).text
+        except Exception:
+            return {}
+        memory = {}
+        for key, metric in (("rss_mb", "detectify_process_rss_bytes"), ("peak_rss_mb", "detectify_process_peak_rss_bytes")):
+            match = re.search(rf"^{metric} (\S+)$", text, re.MULTILINE)
+            if match:
+                memory[key] = round(float(match.group(1)) / (1024 * 1024), 1)
+        return memory
+
+
+async def wait_ready(client, path: str):
+    deadline = time.monotonic() + READY_TIMEOUT_S
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(path)).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"{path} not ready after {READY_TIMEOUT_S:.0f} s")
+
+
+# -------------------
+# LOAD
+# -------------------
+async def run_load(target, endpoint: str, inputs: list, args) -> dict:
+    latencies = collections.defaultdict(list)  # per input, successful requests only
+    statuses = collections.Counter()
+    counter = iter(range(sys.maxsize))
+    deadline = None
+
+    async def send(i: int):
+        name, filename, content_type, data = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        try:
+            r = await target.client.post(endpoint, files={"file": (filename, data, content_type)})
+            status = r.status_code
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        statuses[str(status)] += 1
+        if status == 200:
+            latencies[name].append(elapsed)
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if (args.requests and i >= args.requests) or (deadline and time.perf_counter() >= deadline):
+                return
+            await send(i)
+
+    for i in range(args.warmup):
+        await send(i)
+    latencies.clear()
+    statuses.clear()
+
+    start = time.perf_counter()
+    if args.duration:
+        deadline = start + args.duration
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [t for ts in latencies.values() for t in ts]
+    results = {f"{args.kind}.all": {**summarize(all_latencies, elapsed), "elapsed_s": round(elapsed, 2),
+                                    "statuses": dict(statuses),
+                                    "error_rate": round(1 - len(all_latencies) / max(1, sum(statuses.values())), 4)}}
+    for name, ts in sorted(latencies.items()):
+        # Latency per input; throughput only makes sense for the run as a whole
+        results[f"{args.kind}[{name}]"] = {k: v for k, v in summarize(ts).items() if k != "throughput_per_s"}
+    return results
+
+
+# -------------------
+# MAIN
+# -------------------
+async def amain(args):
+    manifest = load_manifest(args.data)
+    inputs = payloads(manifest, args.data, args.kind)
+    if args.only:
+        inputs = [p for p in inputs if any(o in p[0] for o in args.only.split(","))]
+    target = HttpTarget(args.url, args.ready) if args.url else InProcessTarget(args.app)
+
+    async with target:
+        results = await run_load(target, ENDPOINTS[args.kind], inputs, args)
+        memory = await target.memory()
+    return results, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", choices=list(ENDPOINTS), default="image")
+    parser.add_argument("--app", choices=list(READY), default="server", help="in-process app module")
+    parser.add_argument("--url", default=None, help="drive a running server instead, e.g. http://localhost:8000")
+    parser.add_argument("--ready", default=None, help="readiness path to wait for with --url (e.g. /ready)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="total requests (0 = until --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="seconds (0 = until --requests)")
+    parser.add_argument("--warmup", type=int, default=2, help="requests sent before measuring")
+    parser.add_argument("--only", default=None, help="comma-separated substrings of input names to use")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache / near-duplicate index (in-process)")
+    parser.add_argument("--data", type=Path, default=DEFAULT_OUT, help="synthetic inputs (generated if missing)")
+    add_result_args(parser, "load.json")
+    args = parser.parse_args()
+    if not args.requests and not args.duration:
+        parser.error("one of --requests / --duration must be set")
+
+    if not args.url and not args.cache:
+        # Before the app modules are imported
+        os.environ.setdefault("RESULT_CACHE_BACKEND", "off")
+        os.environ.setdefault("NEAR_DUP_ENABLED", "0")
+
+    results, memory = asyncio.run(amain(args))
+
+    print(f"\n{'result':<40}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for name, r in results.items():
+        if r.get("n"):
+            print(f"{name:<40}{r['n']:>6}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+                  f"{r.get('throughput_per_s', float('nan')):>9.2f}")
+    overall = results[f"{args.kind}.all"]
+    print(f"statuses {overall['statuses']}  error rate {overall['error_rate']:.2%}  memory {memory}")
+
+    payload = write_results(args.out, f"load-{args.kind}", results, memory, args)
+    sys.exit(0 if check_baseline(payload, args.baseline, args.tolerance) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark results: summaries, JSON files and comparison against a baseline.
+
+Every suite run (bench_stages, loadgen) writes one JSON file:
+
+    {"suite": "stages", "meta": {commit, host, cpus, torch, ..., args},
+     "results": {"image.decode[1080p_q75]": {"n", "mean_ms", "p50_ms", "p95_ms",
+                 "p99_ms", "throughput_per_s", ...}, ...},
+     "memory": {"rss_mb", "peak_rss_mb"}}
+
+compare() flags a result as a regression when its p50 / p95 / peak RSS grew,
+or its throughput dropped, by more than the tolerance versus the baseline.
+p99 is reported but not compared (too few samples in a short run to be
+stable). Store a baseline once, then compare every later run to it:
+
+Run (from backend/):
+    python -m benchmarks.bench_stages --out baseline.json
+    python -m benchmarks.bench_stages --out run.json --baseline baseline.json
+    python -m benchmarks.results run.json baseline.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+
+# -------------------
+# CONFIG
+# -------------------
+DEFAULT_TOLERANCE = 0.10
+# metric -> +1 if higher is worse, -1 if lower is worse
+COMPARED = {"p50_ms": 1, "p95_ms": 1, "throughput_per_s": -1, "peak_rss_mb": 1}
+
+
+# -------------------
+# SUMMARIES
+# -------------------
+def summarize(latencies_s: List[float], elapsed_s: Optional[float] = None, items: int = 1) -> dict:
+    """
+    Latency percentiles (ms) of one result. Throughput is items per second
+    over elapsed_s (wall time of a concurrent run) or, without it, over the
+    summed latencies (back-to-back calls).
+    """
+    if not latencies_s:
+        return {"n": 0}
+    ms = 1000.0 * np.asarray(latencies_s)
+    wall = elapsed_s if elapsed_s is not None else float(np.sum(latencies_s))
+    return {
+        "n": len(latencies_s),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_per_s": round(items * len(latencies_s) / wall, 3) if wall > 0 else 0.0,
+    }
+
+
+def run_metadata(args: Optional[argparse.Namespace] = None) -> dict:
+    """Where and on what a run happened, so results are only compared like for like."""
+    import torch
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "args": {k: str(v) for k, v in vars(args).items()} if args is not None else {},
+    }
+
+
+def write_results(path: Path, suite: str, results: Dict[str, dict], memory: Optional[dict] = None, args=None) -> dict:
+    payload = {"suite": suite, "meta": run_metadata(args), "results": results, "memory": memory or {}}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2))
+    print(f"💾 Results written to {path}")
+    return payload
+
+
+# -------------------
+# BASELINE COMPARISON
+# -------------------
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[dict]:
+    """One row per (result, metric) present in both runs; row["regression"] when worse than tolerance."""
+    rows = []
+    cur_results = {**current["results"], "memory": current.get("memory", {})}
+    base_results = {**baseline["results"], "memory": baseline.get("memory", {})}
+    for name in sorted(set(cur_results) & set(base_results)):
+        for metric, direction in COMPARED.items():
+            new, old = cur_results[name].get(metric), base_results[name].get(metric)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            rows.append({
+                "name": name, "metric": metric, "baseline": old, "current": new,
+                "change": round(change, 4), "regression": direction * change > tolerance,
+            })
+    return rows
+
+
+def print_comparison(rows: List[dict], tolerance: float) -> bool:
+    """Prints the comparison table; True when nothing regressed."""
+    print(f"\n📊 Against baseline (tolerance {100 * tolerance:.0f}%)")
+    print(f"{'result':<44}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+    for row in rows:
+        flag = "  ❌" if row["regression"] else ""
+        print(f"{row['name']:<44}{row['metric']:<18}{row['baseline']:>12.2f}{row['current']:>12.2f}"
+              f"{100 * row['change']:>+9.1f}%{flag}")
+    regressions = [r for r in rows if r["regression"]]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s)")
+    else:
+        print("\n✅ No regressions")
+    return not regressions
+
+
+def check_baseline(payload: dict, baseline_path: Optional[Path], tolerance: float) -> bool:
+    """Compare a finished run against baseline_path (if given); True when it passes."""
+    if baseline_path is None:
+        return True
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("suite") != payload["suite"]:
+        print(f"⚠️ Baseline is a '{baseline.get('suite')}' run, not '{payload['suite']}'; nothing compared")
+        return True
+    return print_comparison(compare(payload, baseline, tolerance), tolerance)
+
+
+def add_result_args(parser: argparse.ArgumentParser, default_out: str):
+    parser.add_argument("--out", type=Path, default=BASE_DIR / "bench_results" / default_out, help="results JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed relative slowdown")
+
+
+# -------------------
+# MAIN
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("current", type=Path)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    current = json.loads(args.current.read_text())
+    ok = check_baseline(current, args.baseline, args.tolerance)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
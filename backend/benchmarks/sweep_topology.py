@@ -0,0 +1,211 @@
+"""
+Find the best worker / core split for this box (see topology.py).
+
+For every candidate layout, starts that many worker processes the way
+uvicorn --workers would, each hosting the service (--service image: main.py,
+video: main_video.py) with its models loaded. Once all are ready, they analyse
+synthetic inputs (benchmarks/synthetic.py) in a closed loop for --duration
+seconds, --concurrency requests in flight across all workers. Candidates
+are worker counts x modes:
+
+    off     TOPOLOGY=off: every worker sizes itself to the whole box (the
+            oversubscribed default)
+    auto    TOPOLOGY=auto: cores split between workers, pools share them
+    split   TOPOLOGY=auto TOPOLOGY_SPLIT_POOLS=1: inference and decode pools
+            pinned to separate cores within each worker
+
+and reports throughput, latency percentiles and summed peak RSS for each. The
+best candidate is the one with the highest throughput, among those within
+--max-p95-ms if given. Result cache and near-duplicate lookups are disabled.
+Results go to --out as JSON (see results.py).
+
+Needs the model checkpoints, like the services.
+
+Run (from backend/):
+    python -m benchmarks.sweep_topology --service image --workers 1,2,4,8 --duration 30
+    python -m benchmarks.sweep_topology --service video --workers 1,2 --modes auto,split --concurrency 4
+    python -m benchmarks.sweep_topology --service image --cores 0-15 --max-p95-ms 800
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.results import add_result_args, check_baseline, summarize, write_results
+from benchmarks.synthetic import DEFAULT_OUT, load_manifest
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+
+# -------------------
+# CONFIG
+# -------------------
+SERVICE_MODULES = {"image": "main", "video": "main_video"}
+MODES = {
+    "off": {"TOPOLOGY": "off"},
+    "auto": {"TOPOLOGY": "auto", "TOPOLOGY_SPLIT_POOLS": "0"},
+    "split": {"TOPOLOGY": "auto", "TOPOLOGY_SPLIT_POOLS": "1"},
+}
+READY_MARK = "@@ready"
+RESULT_MARK = "@@result "
+
+
+# -------------------
+# WORKER PROCESS
+# -------------------
+async def worker_loop(args) -> list:
+    module = importlib.import_module(SERVICE_MODULES[args.service])
+    from model_loader import MODEL_REGISTRY
+
+    for loader in MODEL_REGISTRY.values():
+        loader.get()
+
+    manifest = load_manifest(args.data)
+    if args.service == "image":
+        inputs = [(args.data / item["path"]).read_bytes() for item in manifest["images"]]
+        analyse = module.analyse_image
+    else:
+        inputs = [args.data / item["path"] for item in manifest["videos"]]
+        analyse = module.analyse_video
+    await analyse(inputs[0])  # warm-up
+
+    print(READY_MARK, flush=True)
+    sys.stdin.readline()  # every worker starts together
+
+    latencies = []
+    deadline = time.perf_counter() + args.duration
+
+    async def client(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await analyse(inputs[i % len(inputs)])
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    await asyncio.gather(*(client(c) for c in range(args.per_worker)))
+    return latencies
+
+
+def run_worker(args):
+    from model_loader import process_memory
+    from topology import topology_status
+
+    latencies = asyncio.run(worker_loop(args))
+    print(RESULT_MARK + json.dumps({
+        "latencies": latencies, "memory": process_memory(), "topology": topology_status(),
+    }), flush=True)
+
+
+# -------------------
+# SWEEP
+# -------------------
+def run_candidate(args, workers: int, mode: str) -> dict:
+    per_worker = max(1, args.concurrency // workers)
+    env = {
+        **os.environ, **MODES[mode],
+        "TOPOLOGY_WORKERS": str(workers),
+        "RESULT_CACHE_BACKEND": "off",
+        "NEAR_DUP_ENABLED": "0",
+        "PYTHONPATH": os.pathsep.join(p for p in (str(BASE_DIR), os.environ.get("PYTHONPATH")) if p),
+    }
+    if args.cores:
+        env["TOPOLOGY_CORES"] = args.cores
+    cmd = [
+        sys.executable, "-m", "benchmarks.sweep_topology", "--child", "--service", args.service,
+        "--duration", str(args.duration), "--per-worker", str(per_worker), "--data", str(args.data.resolve()),
+    ]
+    procs = [
+        subprocess.Popen(cmd, cwd=args.cwd, env={**env, "TOPOLOGY_WORKER_INDEX": str(i)},
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for i in range(workers)
+    ]
+    try:
+        for p in procs:
+            for line in p.stdout:
+                if line.strip() == READY_MARK:
+                    break
+            else:
+                raise RuntimeError(f"worker exited before it was ready (code {p.wait()})")
+        for p in procs:
+            p.stdin.write("go\n")
+            p.stdin.flush()
+        outputs = []
+        for p in procs:
+            out = [line for line in p.stdout if line.startswith(RESULT_MARK)]
+            if p.wait() != 0 or not out:
+                raise RuntimeError(f"worker failed (code {p.returncode})")
+            outputs.append(json.loads(out[-1][len(RESULT_MARK):]))
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.kill()
+
+    latencies = [t for o in outputs for t in o["latencies"]]
+    return {
+        **summarize(latencies, args.duration),
+        "workers": workers,
+        "mode": mode,
+        "concurrency": per_worker * workers,
+        "peak_rss_mb": round(sum(o["memory"].get("peak_rss_mb", 0.0) for o in outputs), 1),
+        "layout": [o["topology"] for o in outputs],
+    }
+
+
+# -------------------
+# MAIN
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=list(SERVICE_MODULES), default="image")
+    parser.add_argument("--workers", default="1,2,4", help="worker counts to try")
+    parser.add_argument("--modes", default="off,auto,split", help=f"of {list(MODES)}")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight across all workers")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per candidate")
+    parser.add_argument("--cores", default="", help="cores to split (TOPOLOGY_CORES), default all")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="latency bound for the best candidate")
+    parser.add_argument("--cwd", type=Path, default=BASE_DIR, help="directory the services run from (models/)")
+    parser.add_argument("--data", type=Path, default=DEFAULT_OUT, help="synthetic inputs (generated if missing)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--per-worker", type=int, default=1, help=argparse.SUPPRESS)
+    add_result_args(parser, "topology_sweep.json")
+    args = parser.parse_args()
+
+    if args.child:
+        run_worker(args)
+        return
+
+    load_manifest(args.data)  # generate the inputs once, before the workers race to
+    results = {}
+    print(f"{'candidate':<14}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MB':>10}  layout")
+    for workers in (int(w) for w in args.workers.split(",")):
+        for mode in args.modes.split(","):
+            name = f"w{workers}_{mode}"
+            r = results[name] = run_candidate(args, workers, mode)
+            cores = " | ".join(
+                f"{l['inference_cores']}/{l['cpu_cores']}" if l.get("mode") == "auto" else "all"
+                for l in r["layout"]
+            )
+            print(f"{name:<14}{r['throughput_per_s']:>9.2f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+                  f"{r['p99_ms']:>10.1f}{r['peak_rss_mb']:>10.1f}  {cores}")
+
+    eligible = {n: r for n, r in results.items() if args.max_p95_ms is None or r["p95_ms"] <= args.max_p95_ms}
+    if eligible:
+        best_name, best = max(eligible.items(), key=lambda kv: kv[1]["throughput_per_s"])
+        env = " ".join(f"{k}={v}" for k, v in MODES[best["mode"]].items())
+        print(f"\n🏆 Best: {best_name} ({best['throughput_per_s']:.2f} req/s, p95 {best['p95_ms']:.0f} ms)")
+        print(f"   {env} WEB_CONCURRENCY={best['workers']}" + (f" TOPOLOGY_CORES={args.cores}" if args.cores else ""))
+    else:
+        print(f"\n⚠️ No candidate kept p95 under {args.max_p95_ms:.0f} ms")
+
+    payload = write_results(args.out, f"topology-{args.service}", results, args=args)
+    sys.exit(0 if check_baseline(payload, args.baseline, args.tolerance) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Synthetic benchmark inputs, generated locally and reproducibly.
+
+Images: JPEGs at several resolutions and qualities (smooth gradients, blobs
+and fine texture, like bench_heuristics' stand-ins). Videos: a panning
+textured scene at several lengths, resolutions and codecs. The same seed
+gives the same bytes, so runs on different commits see identical inputs.
+Files already present are reused; manifest.json lists what was generated.
+
+Codecs are OpenCV fourccs (MJPG / XVID in .avi, others in .mp4); ones this
+OpenCV build cannot write are skipped with a warning (avc1 needs an FFmpeg
+build with an H.264 encoder).
+
+Run (from backend/):
+    python -m benchmarks.synthetic                      # into bench_data/
+    python -m benchmarks.synthetic --out /tmp/bench --image-sizes 480p,4k --qualities 90 \\
+        --video-lengths 10 --video-sizes 720p --codecs mp4v,avc1
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+
+# -------------------
+# CONFIG
+# -------------------
+DEFAULT_OUT = BASE_DIR / "bench_data"
+SIZES = {"360p": (640, 360), "480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+DEFAULT_IMAGE_SIZES = ("480p", "1080p", "4k")
+DEFAULT_QUALITIES = (95, 75, 50)
+DEFAULT_VIDEO_LENGTHS = (5, 30)  # seconds
+DEFAULT_VIDEO_SIZES = ("360p", "720p")
+DEFAULT_CODECS = ("mp4v", "avc1", "MJPG")
+CONTAINERS = {"MJPG": ".avi", "XVID": ".avi"}  # everything else goes in .mp4
+VIDEO_FPS = 25
+SEED = 0
+
+
+# -------------------
+# CONTENT
+# -------------------
+def textured_scene(rng, width: int, height: int) -> np.ndarray:
+    """Smooth colour gradients, a few blobs and sensor-like noise (BGR uint8)."""
+    base = cv2.resize(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8), (width, height), interpolation=cv2.INTER_CUBIC)
+    img = base.astype(np.float32)
+    for _ in range(6):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(rng.integers(width // 20, width // 6)), int(rng.integers(height // 20, height // 6)))
+        color = tuple(float(c) for c in rng.integers(0, 256, 3))
+        cv2.ellipse(img, center, axes, float(rng.integers(0, 180)), 0, 360, color, -1, cv2.LINE_AA)
+    img += rng.normal(0, rng.uniform(2, 20), img.shape)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def generate_images(out: Path, sizes=DEFAULT_IMAGE_SIZES, qualities=DEFAULT_QUALITIES) -> List[dict]:
+    out.mkdir(parents=True, exist_ok=True)
+    items = []
+    for i, size in enumerate(sizes):
+        width, height = SIZES[size]
+        scene = None
+        for quality in qualities:
+            path = out / f"img_{size}_q{quality}.jpg"
+            if not path.exists():
+                if scene is None:
+                    scene = textured_scene(np.random.default_rng(SEED + i), width, height)
+                cv2.imwrite(str(path), scene, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            items.append({"name": path.stem, "path": path.name, "size": size, "quality": quality,
+                          "bytes": path.stat().st_size})
+    return items
+
+
+def write_video(path: Path, seconds: int, size: str, codec: str) -> bool:
+    width, height = SIZES[size]
+    # Twice as wide as the frame; the camera pans across it and back
+    scene = textured_scene(np.random.default_rng(SEED), width * 2, height)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*codec), VIDEO_FPS, (width, height))
+    if not writer.isOpened():
+        return False
+    step = max(1, width // (4 * VIDEO_FPS))
+    for i in range(seconds * VIDEO_FPS):
+        x = (i * step) % (2 * width)
+        x = x if x < width else 2 * width - x
+        writer.write(np.ascontiguousarray(scene[:, x : x + width]))
+    writer.release()
+    return path.exists() and path.stat().st_size > 0
+
+
+def generate_videos(out: Path, lengths=DEFAULT_VIDEO_LENGTHS, sizes=DEFAULT_VIDEO_SIZES, codecs=DEFAULT_CODECS) -> List[dict]:
+    out.mkdir(parents=True, exist_ok=True)
+    items = []
+    for codec in codecs:
+        for size in sizes:
+            for seconds in lengths:
+                path = out / f"vid_{seconds}s_{size}_{codec}{CONTAINERS.get(codec, '.mp4')}"
+                if not path.exists() and not write_video(path, seconds, size, codec):
+                    path.unlink(missing_ok=True)
+                    print(f"⚠️ OpenCV cannot write codec '{codec}' here; skipping {path.name}")
+                    break
+                items.append({"name": path.stem, "path": path.name, "seconds": seconds, "size": size,
+                              "codec": codec, "bytes": path.stat().st_size})
+    return items
+
+
+def generate(
+    out: Path = DEFAULT_OUT,
+    image_sizes=DEFAULT_IMAGE_SIZES,
+    qualities=DEFAULT_QUALITIES,
+    video_lengths=DEFAULT_VIDEO_LENGTHS,
+    video_sizes=DEFAULT_VIDEO_SIZES,
+    codecs=DEFAULT_CODECS,
+) -> Dict[str, List[dict]]:
+    """Images and videos in out (reusing existing files); writes and returns the manifest."""
+    manifest = {
+        "images": generate_images(out, image_sizes, qualities),
+        "videos": generate_videos(out, video_lengths, video_sizes, codecs),
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(out: Path = DEFAULT_OUT) -> Dict[str, List[dict]]:
+    """The manifest in out, generating the default set first if there is none."""
+    path = out / "manifest.json"
+    if not path.exists():
+        return generate(out)
+    return json.loads(path.read_text())
+
+
+# -------------------
+# MAIN
+# -------------------
+def _csv(cast=str):
+    return lambda s: tuple(cast(v) for v in s.split(",") if v)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    parser.add_argument("--image-sizes", type=_csv(), default=DEFAULT_IMAGE_SIZES, help=f"of {list(SIZES)}")
+    parser.add_argument("--qualities", type=_csv(int), default=DEFAULT_QUALITIES)
+    parser.add_argument("--video-lengths", type=_csv(int), default=DEFAULT_VIDEO_LENGTHS, help="seconds")
+    parser.add_argument("--video-sizes", type=_csv(), default=DEFAULT_VIDEO_SIZES)
+    parser.add_argument("--codecs", type=_csv(), default=DEFAULT_CODECS, help="OpenCV fourccs")
+    args = parser.parse_args()
+
+    manifest = generate(
+        args.out, image_sizes=args.image_sizes, qualities=args.qualities,
+        video_lengths=args.video_lengths, video_sizes=args.video_sizes, codecs=args.codecs,
+    )
+    for kind, items in manifest.items():
+        print(f"🧪 {len(items)} {kind} in {args.out}")
+        for item in items:
+            print(f"    {item['path']:<32}{item['bytes'] / 1024:>10.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Helpers for bulk endpoints: enumerate uploaded items (plain files or members
+of zip archives) and stream one NDJSON line per item as soon as it finishes.
+
+Memory stays bounded regardless of how many items a request carries:
+multipart uploads are already spooled to disk by Starlette, zip members are
+read one at a time only when a processing slot is free, at most
+max_in_flight items are held in memory, and finished lines wait in a queue of
+the same size, so a slow client applies back-pressure instead of letting
+results pile up.
+
+The uploads are read while the response streams, i.e. after the endpoint has
+returned, so bulk endpoints parse the form themselves (read_bulk_form) and
+stream_ndjson closes it when the stream ends: FastAPI 0.106-0.117 closes
+File(...) parameters as soon as the endpoint returns.
+"""
+
+import asyncio
+import json
+import threading
+import zipfile
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, UploadFile
+from starlette.datastructures import UploadFile as StarletteUploadFile
+
+from executors import PRIORITY_BULK, PoolSaturatedError, cpu_pool
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+BULK_SATURATED_BACKOFF_S = 0.01
+
+# (filename, content_type, read) where read() returns the bytes or raises
+# ValueError; content_type is None for zip members. Items must be read in
+# iteration order, before the iterator is advanced again.
+BulkItem = Tuple[str, Optional[str], Callable[[], bytes]]
+
+
+def is_zip_upload(upload: UploadFile) -> bool:
+    name = (upload.filename or "").lower()
+    return upload.content_type in ZIP_CONTENT_TYPES or name.endswith(".zip")
+
+
+async def read_bulk_form(request: Request, max_items: int, field: str = "files"):
+    """(form, uploads of field); the caller owns the form and must close it.
+
+    Starlette caps a form at 1000 files (and fields) by default; bulk
+    endpoints take up to max_items.
+    """
+    form = await request.form(max_files=max_items, max_fields=max_items)
+    uploads = [v for v in form.getlist(field) if isinstance(v, StarletteUploadFile)]
+    if not uploads:
+        await form.close()
+        raise HTTPException(status_code=422, detail=f"No files in form field '{field}'")
+    return form, uploads
+
+
+def _read_upload(upload: UploadFile, max_bytes: int) -> bytes:
+    upload.file.seek(0)
+    data = upload.file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f"File exceeds {max_bytes} bytes")
+    return data
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int) -> bytes:
+    # Declared sizes can lie (zip bombs), so cap the bytes actually inflated
+    if info.file_size > max_bytes:
+        raise ValueError(f"File exceeds {max_bytes} bytes")
+    with archive.open(info) as f:
+        data = f.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f"File exceeds {max_bytes} bytes")
+    return data
+
+
+def iter_upload_items(uploads: List[UploadFile], max_bytes: int) -> Iterator[BulkItem]:
+    """Yield every item in the request; zip archives are expanded lazily."""
+    for upload in uploads:
+        if not is_zip_upload(upload):
+            yield (
+                upload.filename or "",
+                upload.content_type,
+                lambda u=upload: _read_upload(u, max_bytes),
+            )
+            continue
+
+        try:
+            upload.file.seek(0)
+            archive = zipfile.ZipFile(upload.file)
+        except zipfile.BadZipFile:
+            def bad_zip():
+                raise ValueError("Not a valid zip archive")
+            yield upload.filename or "", None, bad_zip
+            continue
+
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                    continue
+                yield (
+                    f"{upload.filename}/{info.filename}",
+                    None,
+                    lambda i=info: _read_member(archive, i, max_bytes),
+                )
+
+
+def _next_item(iterator: Iterator[BulkItem]):
+    """Advance to the next item and read it: (filename, content_type, bytes or error)."""
+    item = next(iterator, None)
+    if item is None:
+        return None
+    filename, content_type, read = item
+    try:
+        return filename, content_type, read()
+    except ValueError as e:
+        return filename, content_type, e
+
+
+async def stream_ndjson(
+    items: Iterator[BulkItem],
+    handle: Callable[[str, Optional[str], bytes], Awaitable[dict]],
+    max_in_flight: int,
+    max_items: int,
+    on_close: Optional[Callable[[], Awaitable]] = None,
+):
+    """
+    Run handle(filename, content_type, data) for every item with at most
+    max_in_flight concurrently and yield NDJSON lines in completion order:
+        {"index": i, "filename": ..., "result": {...}}
+        {"index": i, "filename": ..., "error": {"status": 400, "detail": ...}}
+    on_close (e.g. the form's close) is awaited once the stream ends, however
+    it ends, and once no pool thread is reading an item any more.
+    """
+    slots = asyncio.Semaphore(max_in_flight)
+    lines: asyncio.Queue = asyncio.Queue(maxsize=max_in_flight)
+    tasks = set()
+    closing = threading.Event()
+    reading: Optional[asyncio.Future] = None
+
+    def read_next(iterator: Iterator[BulkItem]):
+        # Skipped once the stream is closing; a read already running finishes first
+        return None if closing.is_set() else _next_item(iterator)
+
+    async def run_one(index: int, filename: str, content_type, data):
+        try:
+            try:
+                if isinstance(data, Exception):
+                    raise data
+                line = {"index": index, "filename": filename,
+                        "result": await handle(filename, content_type, data)}
+            except HTTPException as e:
+                line = {"index": index, "filename": filename,
+                        "error": {"status": e.status_code, "detail": e.detail}}
+            except PoolSaturatedError as e:
+                line = {"index": index, "filename": filename,
+                        "error": {"status": 503, "detail": str(e)}}
+            except ValueError as e:
+                line = {"index": index, "filename": filename,
+                        "error": {"status": 400, "detail": str(e)}}
+            except Exception as e:
+                line = {"index": index, "filename": filename,
+                        "error": {"status": 500, "detail": str(e)}}
+            await lines.put(json.dumps(line) + "\n")
+        finally:
+            slots.release()
+
+    async def produce():
+        nonlocal reading
+        index = 0
+        iterator = iter(items)
+        try:
+            while True:
+                await slots.acquire()
+                # Items are read in order by this one producer (zip members
+                # must be read before the archive moves on) on the CPU pool,
+                # at bulk priority: interactive requests go first, and a full
+                # bulk queue backs off instead of failing the stream.
+                while True:
+                    try:
+                        # Shielded: the read outlives a cancelled producer until on_close
+                        reading = asyncio.ensure_future(cpu_pool(PRIORITY_BULK).run(read_next, iterator))
+                        item = await asyncio.shield(reading)
+                        break
+                    except PoolSaturatedError:
+                        await asyncio.sleep(BULK_SATURATED_BACKOFF_S)
+                if item is None:
+                    slots.release()
+                    break
+                if index >= max_items:
+                    slots.release()
+                    await lines.put(json.dumps({
+                        "index": index,
+                        "error": {"status": 413, "detail": f"More than {max_items} items; rest skipped"},
+                    }) + "\n")
+                    break
+                task = asyncio.ensure_future(run_one(index, *item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+            if tasks:
+                await asyncio.gather(*list(tasks), return_exceptions=True)
+        except Exception as e:
+            await lines.put(json.dumps({"error": {"status": 500, "detail": str(e)}}) + "\n")
+        await lines.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            yield line
+    finally:
+        # Client went away (or we are done): stop feeding and drop pending work
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
+        closing.set()
+        if reading is not None:
+            await asyncio.gather(reading, return_exceptions=True)
+        if on_close is not None:
+            await on_close()
@@ -0,0 +1,38 @@
+"""
+Inference-side model architectures.
+
+Kept free of any loading side effects so that the API, the export tools and
+the benchmarks can all build the exact network the checkpoints were trained
+with. Backbones are built without pretrained weights by default, so
+startup never touches the network.
+"""
+
+import torch.nn as nn
+from torchvision import models
+from torchvision.models import EfficientNet_B4_Weights
+
+# -------------------
+# IMAGE MODEL (same as training)
+# -------------------
+IMG_SIZE = (380, 380)  # input size the image model was trained at
+
+class DeepfakeDetector(nn.Module):
+    def __init__(self, pretrained: bool = False):
+        # Inference always loads a fine-tuned checkpoint on top, so ImageNet
+        # weights are only worth fetching when starting a new training run
+        super(DeepfakeDetector, self).__init__()
+        self.backbone = models.efficientnet_b4(
+            weights=EfficientNet_B4_Weights.IMAGENET1K_V1 if pretrained else None
+        )
+        num_features = self.backbone.classifier[1].in_features
+        self.backbone.classifier = nn.Sequential(
+            nn.Dropout(0.5),
+            nn.Linear(num_features, 256),
+            nn.BatchNorm1d(256),
+            nn.ReLU(),
+            nn.Dropout(0.3),
+            nn.Linear(256, 1),
+        )
+
+    def forward(self, x):
+        return self.backbone(x)
@@ -0,0 +1,144 @@
+"""
+Per-frame embedding cache for the video model.
+
+VideoDeepfakeModel runs in two stages: the backbone embeds every frame on
+its own (embed_frames, by far the expensive part) and a GRU + classifier
+scores the sequence (classify_sequence). Frames recur a lot: the jittered
+passes of one analysis share frames, overlapping timeline windows share
+half of theirs, and re-analysing an upload in another mode (or after a
+result-cache eviction) sees the same frames again. Embeddings are therefore
+cached by (upload SHA-256, frame index) and only frames not seen before go
+through the backbone; everything else only costs the GRU head.
+
+    cache = build_embedding_cache()                      # None when disabled
+    logits = classify_clips(runtime, clips, keys, digest, cache)
+
+or step by step (cached_features, embed_keys on chunks of the missing
+frames, classify_features) to spread one batch over several pool tasks.
+
+keys are the clip_frame_keys() of each clip (-1 = black padding frame). The
+cache lives in process memory, an LRU capped at VIDEO_EMBED_CACHE_FRAMES
+frames; every other input of a frame's crop (model, image size, face
+tracking) is fixed for the life of the process. With face tracking on, a
+frame's crop can depend on its neighbours in the sampling, so the first
+crop seen of a frame is the one whose embedding is reused.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import torch
+
+# -------------------
+# CONFIG
+# -------------------
+# ~5 KB per frame for EfficientNet-B0 (1280 float32 features); 0 disables
+VIDEO_EMBED_CACHE_FRAMES = int(os.getenv("VIDEO_EMBED_CACHE_FRAMES", "20000"))
+
+
+class EmbeddingCache:
+    def __init__(self, max_frames: int):
+        self.max_frames = max_frames
+        self._data: "OrderedDict[tuple, torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, digest: str, keys: List[int]) -> dict:
+        found = {}
+        with self._lock:
+            for k in keys:
+                feats = self._data.get((digest, k))
+                if feats is not None:
+                    self._data.move_to_end((digest, k))
+                    found[k] = feats
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, digest: str, items: dict):
+        with self._lock:
+            for k, feats in items.items():
+                self._data[(digest, k)] = feats
+                self._data.move_to_end((digest, k))
+            while len(self._data) > self.max_frames:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "frames": len(self),
+            "max_frames": self.max_frames,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_embedding_cache() -> Optional[EmbeddingCache]:
+    if VIDEO_EMBED_CACHE_FRAMES <= 0:
+        return None
+    return EmbeddingCache(VIDEO_EMBED_CACHE_FRAMES)
+
+
+def cached_features(keys: List[List[int]], digest: Optional[str], cache: Optional[EmbeddingCache]):
+    """(features already known, distinct frame keys still to embed)."""
+    unique = list(dict.fromkeys(k for clip_keys in keys for k in clip_keys))
+    feats = {}
+    if cache is not None and digest is not None:
+        feats = cache.get_many(digest, unique)
+    return feats, [k for k in unique if k not in feats]
+
+
+def embed_keys(
+    runtime,
+    clips: torch.Tensor,
+    keys: List[List[int]],
+    wanted: List[int],
+    digest: Optional[str] = None,
+    cache: Optional[EmbeddingCache] = None,
+) -> dict:
+    """Embed the frames `wanted` (keys) from the clips that hold them; {key: features}."""
+    P, T = clips.shape[:2]
+    # First slot holding each frame
+    slot = {}
+    for i, k in enumerate(k for clip_keys in keys for k in clip_keys):
+        slot.setdefault(k, i)
+    frames = clips.reshape(P * T, *clips.shape[2:])
+    new = runtime.embed_frames(frames[[slot[k] for k in wanted]]).cpu()
+    # Own storage per frame, so evicting one frees it
+    new = {k: row.clone() for k, row in zip(wanted, new)}
+    if cache is not None and digest is not None:
+        cache.put_many(digest, new)
+    return new
+
+
+def classify_features(runtime, feats: dict, keys: List[List[int]]) -> torch.Tensor:
+    """Logits from per-frame features looked up by each clip's keys."""
+    seqs = torch.stack([torch.stack([feats[k] for k in clip_keys]) for clip_keys in keys])
+    return runtime.classify_sequence(seqs)
+
+
+def classify_clips(
+    runtime,
+    clips: torch.Tensor,
+    keys: List[List[int]],
+    digest: Optional[str] = None,
+    cache: Optional[EmbeddingCache] = None,
+) -> torch.Tensor:
+    """
+    Logits for a (P, T, C, H, W) batch of clips, embedding each distinct
+    frame once. Without a digest (or cache) frames are still shared within
+    the batch, just not remembered.
+    """
+    feats, missing = cached_features(keys, digest, cache)
+    if missing:
+        feats.update(embed_keys(runtime, clips, keys, missing, digest, cache))
+    return classify_features(runtime, feats, keys)
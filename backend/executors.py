@@ -0,0 +1,324 @@
+"""
+Bounded thread pools that keep blocking work off the asyncio event loop.
+
+Two pools are shared by the image and video services:
+    - "cpu":       image/video decoding, OpenCV heuristics, face extraction
+    - "inference": model forward passes
+
+Each pool caps how much work may be waiting (excess is rejected with
+PoolSaturatedError instead of piling up) and records queue depth and the
+time tasks spend waiting for a worker (also exported on /metrics as
+detectify_pool_wait_seconds).
+
+Waiting tasks start in priority order, then in submission order. When both
+services share a process (server.py), a short image request does not queue
+behind a backlog of video work:
+
+    PRIORITY_INTERACTIVE   single requests a client is waiting on (default)
+    PRIORITY_BULK          bulk image batches
+    PRIORITY_BACKGROUND    video analyses and jobs
+
+    await cpu_pool().run(fn, *args)                          # interactive
+    await inference_pool(PRIORITY_BACKGROUND).run(fn, *args)
+
+A running task is never interrupted, so an interactive task waits at most
+for the forwards already running. The max_queue cap applies to each
+priority on its own, so a full video backlog never rejects image requests.
+"""
+
+import asyncio
+import functools
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import torch
+
+from metrics import POOL_WAIT
+
+# -------------------
+# CONFIG
+# -------------------
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(8, os.cpu_count() or 1))))
+CPU_POOL_MAX_QUEUE = int(os.getenv("CPU_POOL_MAX_QUEUE", "64"))
+
+INFERENCE_POOL_WORKERS = int(os.getenv("INFERENCE_POOL_WORKERS", "1"))
+INFERENCE_POOL_MAX_QUEUE = int(os.getenv("INFERENCE_POOL_MAX_QUEUE", "32"))
+
+# 0 = plain FIFO (every task runs as PRIORITY_INTERACTIVE)
+SCHEDULER_PRIORITIES = os.getenv("SCHEDULER_PRIORITIES", "1") == "1"
+
+# Threads for all blocking work in the process (see apply_thread_budget);
+# 0 = leave the torch / OpenCV defaults alone
+THREAD_BUDGET = int(os.getenv("THREAD_BUDGET", "0"))
+
+# How many recent wait times to keep for the percentile stats
+WAIT_SAMPLES = 1024
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BULK: "bulk",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a pool already has max_queue tasks of that priority waiting."""
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_queue: int, prioritize: bool = SCHEDULER_PRIORITIES, affinity: Optional[set] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.prioritize = prioritize
+        self.affinity = affinity  # CPU cores the worker threads are pinned to (None = inherit)
+
+        # (priority, seq, submitted, future, call): seq keeps FIFO order within
+        # a priority, so the rest of the tuple is never compared
+        self._tasks: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads = []
+        self._lock = threading.Lock()
+
+        self._queued = {p: 0 for p in PRIORITY_NAMES}  # submitted, not yet picked up by a worker
+        self._active = 0      # currently running
+        self._completed = 0
+        self._rejected = 0
+        self._waits = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITY_NAMES}  # seconds
+        self._max_wait = {p: 0.0 for p in PRIORITY_NAMES}
+
+    def with_priority(self, priority: int) -> "PrioritizedExecutor":
+        return PrioritizedExecutor(self, priority)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on this pool and await its result."""
+        return await self.run_prioritized(PRIORITY_INTERACTIVE, fn, *args, **kwargs)
+
+    async def run_prioritized(self, priority: int, fn: Callable, *args, **kwargs) -> Any:
+        if not self.prioritize:
+            priority = PRIORITY_INTERACTIVE
+        with self._lock:
+            if self._queued[priority] >= self.max_queue:
+                self._rejected += 1
+                raise PoolSaturatedError(
+                    f"{self.name} pool is saturated "
+                    f"({self._queued[priority]} {PRIORITY_NAMES[priority]} tasks waiting)"
+                )
+            self._queued[priority] += 1
+            self._start_workers()
+
+        cf = Future()
+        self._tasks.put((
+            priority, next(self._seq), time.perf_counter(), cf,
+            functools.partial(fn, *args, **kwargs),
+        ))
+        try:
+            return await asyncio.wrap_future(cf)
+        except asyncio.CancelledError:
+            # Caller went away: drop the task if no worker has picked it up
+            if cf.cancel():
+                with self._lock:
+                    self._queued[priority] -= 1
+            raise
+
+    def _start_workers(self):
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._worker, name=f"{self.name}-pool_{len(self._threads)}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        if self.affinity:
+            try:
+                os.sched_setaffinity(0, self.affinity)  # this thread (and the torch threads it starts)
+            except OSError as e:
+                print(f"⚠️ Could not pin {self.name} pool to cores {sorted(self.affinity)}: {e}")
+        while True:
+            priority, _, submitted, cf, call = self._tasks.get()
+            if cf is None:
+                return  # shutdown
+            if not cf.set_running_or_notify_cancel():
+                continue  # cancelled while waiting; the caller uncounted it
+
+            wait = time.perf_counter() - submitted
+            with self._lock:
+                self._queued[priority] -= 1
+                self._active += 1
+                self._waits[priority].append(wait)
+                self._max_wait[priority] = max(self._max_wait[priority], wait)
+            POOL_WAIT.labels(pool=self.name, priority=PRIORITY_NAMES[priority]).observe(wait)
+            try:
+                result = call()
+            except BaseException as e:
+                cf.set_exception(e)
+            else:
+                cf.set_result(result)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = {p: sorted(w) for p, w in self._waits.items()}
+            queued = dict(self._queued)
+            active, completed, rejected = self._active, self._completed, self._rejected
+            max_wait = dict(self._max_wait)
+
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "prioritize": self.prioritize,
+            "affinity": sorted(self.affinity) if self.affinity else None,
+            "queued": sum(queued.values()),
+            "active": active,
+            "completed": completed,
+            "rejected": rejected,
+            "wait_ms": _wait_stats(sorted(w for p in waits for w in waits[p]), max(max_wait.values())),
+            "by_priority": {
+                name: {"queued": queued[p], "wait_ms": _wait_stats(waits[p], max_wait[p])}
+                for p, name in PRIORITY_NAMES.items()
+            },
+        }
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._tasks.put((float("inf"), next(self._seq), 0.0, None, None))
+
+
+class PrioritizedExecutor:
+    """A BoundedExecutor whose run() submits at a fixed priority."""
+
+    def __init__(self, executor: BoundedExecutor, priority: int):
+        self.executor = executor
+        self.priority = priority
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self.executor.run_prioritized(self.priority, fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        return self.executor.stats()
+
+
+def _wait_stats(waits: list, max_wait: float) -> dict:
+    """Mean / percentiles in ms of sorted waits (seconds)."""
+    def pct(q: float) -> float:
+        if not waits:
+            return 0.0
+        return waits[min(len(waits) - 1, int(q * len(waits)))]
+
+    return {
+        "mean": round(1000.0 * sum(waits) / len(waits), 3) if waits else 0.0,
+        "p50": round(1000.0 * pct(0.50), 3),
+        "p95": round(1000.0 * pct(0.95), 3),
+        "max": round(1000.0 * max_wait, 3),
+    }
+
+
+# -------------------
+# SHARED POOLS
+# -------------------
+_cpu_pool: Optional[BoundedExecutor] = None
+_inference_pool: Optional[BoundedExecutor] = None
+_pools_lock = threading.Lock()
+
+
+def cpu_pool(priority: int = PRIORITY_INTERACTIVE):
+    global _cpu_pool
+    with _pools_lock:
+        if _cpu_pool is None:
+            _cpu_pool = BoundedExecutor("cpu", CPU_POOL_WORKERS, CPU_POOL_MAX_QUEUE, affinity=_pool_affinity.get("cpu"))
+    return _cpu_pool if priority == PRIORITY_INTERACTIVE else _cpu_pool.with_priority(priority)
+
+
+def inference_pool(priority: int = PRIORITY_INTERACTIVE):
+    global _inference_pool
+    with _pools_lock:
+        if _inference_pool is None:
+            _inference_pool = BoundedExecutor(
+                "inference", INFERENCE_POOL_WORKERS, INFERENCE_POOL_MAX_QUEUE,
+                affinity=_pool_affinity.get("inference"),
+            )
+    return _inference_pool if priority == PRIORITY_INTERACTIVE else _inference_pool.with_priority(priority)
+
+
+def executor_stats() -> dict:
+    stats = {"cpu": cpu_pool().stats(), "inference": inference_pool().stats()}
+    if _thread_plan:
+        stats["thread_budget"] = dict(_thread_plan)
+    return stats
+
+
+# -------------------
+# THREAD BUDGET
+# -------------------
+_thread_plan: Dict[str, int] = {}
+_pool_affinity: Dict[str, set] = {}
+
+
+def apply_thread_budget(budget: int = THREAD_BUDGET) -> dict:
+    """
+    Split one thread budget between the pools and the math libraries, so
+    services sharing a process do not each size themselves to every core:
+
+        inference workers x torch intra-op threads  <= budget
+        cpu pool workers                            <= budget
+        OpenCV                                      single-threaded (the cpu
+                                                    pool is its parallelism)
+
+    The cpu pool's own torch work (MTCNN) uses the same intra-op setting, so
+    this caps each side, not their sum. Must run before the pools are first
+    used and before the models load. topology.py builds on this to split a
+    box's cores between several worker processes.
+    """
+    if budget <= 0:
+        return {}
+    plan = configure_pools(
+        cpu_workers=max(1, min(CPU_POOL_WORKERS, budget)),
+        intra_op=max(1, budget // max(1, INFERENCE_POOL_WORKERS)),
+        budget=budget,
+    )
+    print(f"🧵 Thread budget {budget}: {plan}")
+    return plan
+
+
+def configure_pools(cpu_workers: int, intra_op: int, affinity: Optional[Dict[str, set]] = None, **plan) -> dict:
+    """
+    Thread counts for this process: cpu pool workers, torch intra-op threads
+    per forward (OpenCV single-threaded) and, optionally, the CPU cores each
+    pool's threads are pinned to ({"cpu": {...}, "inference": {...}}). Extra
+    keyword arguments are recorded in the plan shown in executor_stats().
+    """
+    global CPU_POOL_WORKERS
+    if _cpu_pool is not None or _inference_pool is not None:
+        raise RuntimeError("The thread plan must be set before the executor pools are created")
+
+    CPU_POOL_WORKERS = cpu_workers
+    torch.set_num_threads(intra_op)
+    cv2.setNumThreads(1)
+    _pool_affinity.update(affinity or {})
+
+    _thread_plan.update(
+        plan,
+        inference_workers=INFERENCE_POOL_WORKERS,
+        intra_op_threads=intra_op,
+        cpu_workers=CPU_POOL_WORKERS,
+    )
+    return dict(_thread_plan)
+
+
+def intra_op_threads() -> int:
+    """Threads per forward under the thread budget (0 = no budget set)."""
+    return _thread_plan.get("intra_op_threads", 0)
@@ -0,0 +1,119 @@
+"""
+CV heuristics: facial texture, lighting/shadow and pixel-artifact
+scores in one pass over a single grayscale conversion of the face ROI.
+
+Texture (Laplacian variance) and artifact (edge density, blur residual)
+scores measure pixel-scale detail, so they cannot be computed on a
+downsampled ROI without changing their meaning: downsampling a 4K crop to
+512 px moves the texture score by 25 points on average. Instead, once the
+ROI is larger than HEURISTICS_SAMPLE_SIZE x HEURISTICS_SAMPLE_SIZE pixels,
+those two scores are estimated on a fixed pixel budget: a grid of
+full-resolution tiles spread evenly over the ROI, each with a small halo so
+the filters see real neighbours. Lighting only needs means and a standard
+deviation, which cv2 computes exactly at full resolution in one cheap pass.
+
+Compared to the full-resolution implementation (see
+benchmarks/bench_heuristics.py), scores are identical for ROIs within the
+budget; larger ROIs stay within HEURISTICS_TOLERANCE points per score.
+"""
+
+import os
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+# -------------------
+# CONFIG
+# -------------------
+HEURISTICS_SAMPLE_SIZE = int(os.getenv("HEURISTICS_SAMPLE_SIZE", "512"))  # pixel budget side
+TILE = 64  # tile side; the grid has (HEURISTICS_SAMPLE_SIZE // TILE) ** 2 tiles
+HALO = 3   # 5x5 Gaussian needs 2, Canny's Sobel + non-max suppression 2
+
+# Max |score difference| vs. the full-resolution implementation, per score
+# (texture, lighting, pixel artifacts). Measured worst case at the default
+# sample size on 4K photos is (3, 0, 2); see benchmarks/bench_heuristics.py
+HEURISTICS_TOLERANCE = (5, 1, 3)
+
+ROI_FRACTION = 0.7
+
+
+# -------------------
+# ROI + SAMPLING
+# -------------------
+def face_roi_gray(image_bgr: np.ndarray) -> np.ndarray:
+    """Central square covering 70% of the short side, converted to gray once."""
+    h, w = image_bgr.shape[:2]
+    size = int(min(h, w) * ROI_FRACTION)
+    y1 = (h - size) // 2
+    x1 = (w - size) // 2
+    roi = image_bgr[y1 : y1 + size, x1 : x1 + size]
+    if roi.ndim == 2:
+        return roi
+    return cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+
+
+def _tile_mosaic(gray: np.ndarray, grid: int) -> np.ndarray:
+    """(grid * (TILE + 2*HALO))^2 mosaic of evenly spaced full-resolution tiles."""
+    span = TILE + 2 * HALO
+    h, w = gray.shape
+    ys = np.linspace(0, h - span, grid).astype(np.intp)
+    xs = np.linspace(0, w - span, grid).astype(np.intp)
+    offsets = np.arange(span)
+    rows = (ys[:, None] + offsets).ravel()
+    cols = (xs[:, None] + offsets).ravel()
+    return gray[np.ix_(rows, cols)]
+
+
+def _tile_interiors(a: np.ndarray, grid: int) -> np.ndarray:
+    """Drop each tile's halo: (grid, TILE, grid, TILE) view of a mosaic-shaped array."""
+    span = TILE + 2 * HALO
+    return a.reshape(grid, span, grid, span)[:, HALO : HALO + TILE, :, HALO : HALO + TILE]
+
+
+# -------------------
+# SCORES
+# -------------------
+def _to_score(s: float) -> int:
+    return int(float(np.clip(s, 0.0, 1.0)) * 100)
+
+
+def _lighting(gray: np.ndarray) -> int:
+    w = gray.shape[1]
+    mean_left = cv2.mean(gray[:, : w // 2])[0]
+    mean_right = cv2.mean(gray[:, w // 2 :])[0]
+    _, std = cv2.meanStdDev(gray)
+    s1 = abs(mean_left - mean_right) / 50.0
+    s2 = max(0, 1.0 - float(std[0, 0]) / 60.0)
+    return _to_score((s1 + s2) / 2.0)
+
+
+def _detail_scores(gray: np.ndarray, grid: int = 0) -> Tuple[int, int]:
+    """Texture and pixel-artifact scores, on the whole ROI (grid=0) or a tile mosaic."""
+    src = _tile_mosaic(gray, grid) if grid else gray
+    lap = cv2.Laplacian(src, cv2.CV_32F)
+    edges = cv2.Canny(src, 100, 200)
+    blur = cv2.GaussianBlur(src, (5, 5), 0)
+    residual = cv2.absdiff(src, blur)
+    if grid:
+        lap = _tile_interiors(lap, grid)
+        edges = _tile_interiors(edges, grid)
+        residual = _tile_interiors(residual, grid)
+
+    var = float(lap.var(dtype=np.float64))
+    tex = _to_score((var - 10.0) / (300.0 - 10.0))
+
+    edge_density = float(edges.mean(dtype=np.float64)) / 255.0
+    noise_level = float(residual.mean(dtype=np.float64)) / 255.0
+    pix = _to_score((edge_density * 1.5 + noise_level * 2.0) / 2.0)
+    return tex, pix
+
+
+def heuristic_scores(image_bgr: np.ndarray, sample_size: int = HEURISTICS_SAMPLE_SIZE) -> Tuple[int, int, int]:
+    """(facial_texture, lighting_shadow, pixel_artifacts) for one BGR image."""
+    gray = face_roi_gray(image_bgr)
+    light = _lighting(gray)
+    grid = sample_size // TILE if min(gray.shape) > sample_size else 0
+    tex, pix = _detail_scores(gray, grid)
+    return tex, light, pix
+
@@ -0,0 +1,148 @@
+"""
+Single-decode image preprocessing.
+
+Every upload is decoded exactly once into a BGR uint8 array. That array feeds
+both the OpenCV heuristics (EXIF orientation applied, as cv2.imdecode did for
+them before) and the model (stored orientation, as PIL gave it in training;
+resized, then normalized by a fused lookup-table step that also swaps
+BGR->RGB and HWC->CHW while writing straight into a reusable float32 batch
+buffer).
+
+Matches the training transform
+    Resize(IMG_SIZE) -> ToTensor() -> Normalize(IMAGENET_MEAN, IMAGENET_STD)
+up to resampling differences between PIL and OpenCV (INTER_AREA when
+shrinking, INTER_LINEAR when enlarging).
+"""
+
+import threading
+from io import BytesIO
+from typing import List, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# Keep PIL's behaviour for the model (training used Image.open, which ignores
+# EXIF rotation); the heuristics get the rotation back via apply_exif_orientation()
+CV2_DECODE_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+# EXIF orientation -> ops that bring the stored pixels upright
+_ORIENTATION_OPS = {
+    2: lambda img: cv2.flip(img, 1),
+    3: lambda img: cv2.rotate(img, cv2.ROTATE_180),
+    4: lambda img: cv2.flip(img, 0),
+    5: cv2.transpose,
+    6: lambda img: cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda img: cv2.flip(cv2.transpose(img), -1),
+    8: lambda img: cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE),
+}
+
+
+def _build_lut(mean: Sequence[float], std: Sequence[float]) -> np.ndarray:
+    """(3, 256) table: lut[c, v] = (v / 255 - mean[c]) / std[c], c in RGB order."""
+    v = np.arange(256, dtype=np.float32) / 255.0
+    return np.stack([(v - m) / s for m, s in zip(mean, std)]).astype(np.float32)
+
+
+NORMALIZE_LUT = _build_lut(IMAGENET_MEAN, IMAGENET_STD)
+
+
+# -------------------
+# DECODE / RESIZE
+# -------------------
+def decode_image(file_bytes: bytes) -> np.ndarray:
+    """Decode an upload into an (H, W, 3) BGR uint8 array."""
+    arr = np.frombuffer(file_bytes, np.uint8)
+    img_bgr = cv2.imdecode(arr, CV2_DECODE_FLAGS)
+    if img_bgr is not None:
+        return img_bgr
+
+    # Formats OpenCV cannot read (e.g. GIF) still go through PIL
+    try:
+        image = Image.open(BytesIO(file_bytes)).convert("RGB")
+    except Exception as e:
+        raise ValueError(f"Could not decode image: {e}")
+    return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+
+def exif_orientation(file_bytes: bytes) -> int:
+    """EXIF orientation tag of an upload (1 = upright, also when absent or unreadable)."""
+    try:
+        # Image.open only parses the header; no pixels are decoded here
+        return int(Image.open(BytesIO(file_bytes)).getexif().get(EXIF_ORIENTATION_TAG, 1))
+    except Exception:
+        return 1
+
+
+def apply_exif_orientation(img_bgr: np.ndarray, file_bytes: bytes) -> np.ndarray:
+    """
+    Rotate/flip a decode_image() result the way cv2.imdecode(IMREAD_COLOR)
+    would have, so the heuristics see rotated phone photos upright.
+    """
+    op = _ORIENTATION_OPS.get(exif_orientation(file_bytes))
+    return img_bgr if op is None else op(img_bgr)
+
+
+def resize_for_model(img_bgr: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Resize to (H, W) = size, keeping BGR uint8 layout."""
+    h, w = size
+    if img_bgr.shape[0] == h and img_bgr.shape[1] == w:
+        return img_bgr
+    shrinking = img_bgr.shape[0] * img_bgr.shape[1] > h * w
+    interp = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+    return cv2.resize(img_bgr, (w, h), interpolation=interp)
+
+
+def prepare_image(file_bytes: bytes, size: Tuple[int, int]):
+    """
+    Decode once; return (full-res BGR for heuristics, EXIF orientation applied,
+    resized BGR for the model, stored orientation).
+    """
+    img_bgr = decode_image(file_bytes)
+    return apply_exif_orientation(img_bgr, file_bytes), resize_for_model(img_bgr, size)
+
+
+# -------------------
+# FUSED NORMALIZATION
+# -------------------
+def normalize_into(img_bgr: np.ndarray, out: np.ndarray, lut: np.ndarray = NORMALIZE_LUT):
+    """
+    Write one resized BGR uint8 image into out (3, H, W) float32 as a
+    normalized RGB CHW tensor. One table lookup per channel does the scale,
+    mean/std normalization, channel swap and transpose together.
+    """
+    for c in range(3):
+        np.take(lut[c], img_bgr[:, :, 2 - c], out=out[c], mode="clip")
+
+
+class TensorBatchBuffer:
+    """
+    Reusable (max_batch, 3, H, W) float32 input buffer, one per thread.
+
+    The returned tensor shares memory with the buffer, so it must be consumed
+    (forward pass finished) before the same thread calls fill() again.
+    """
+
+    def __init__(self, size: Tuple[int, int], max_batch: int):
+        self.size = size
+        self.max_batch = max_batch
+        self._local = threading.local()
+
+    def _buffer(self, n: int) -> np.ndarray:
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n:
+            buf = np.empty((max(n, self.max_batch), 3, *self.size), dtype=np.float32)
+            self._local.buf = buf
+        return buf
+
+    def fill(self, images: List[np.ndarray]) -> torch.Tensor:
+        buf = self._buffer(len(images))
+        for i, img in enumerate(images):
+            normalize_into(img, buf[i])
+        return torch.from_numpy(buf[: len(images)])
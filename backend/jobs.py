@@ -0,0 +1,407 @@
+"""
+Durable background jobs for long-running detections.
+
+Instead of holding an HTTP connection open for the whole analysis, a client
+submits a job and gets its id back straight away, then polls (or long-polls)
+for the result. Jobs are stored in SQLite next to their input file, so work
+that was queued, or running when the process died, is picked up again after
+a restart.
+
+    store = JobStore(path)                         # one per job kind
+    queue = JobQueue("video", store, handler, workers=2, max_queued=1000)
+    await queue.start() / await queue.stop()       # from the app lifespan
+    job = await queue.submit(input_path, params)    # -> job dict, status "queued"
+    job = await queue.wait(job_id, timeout_s)       # long-poll
+
+handler(job) is an async function returning a JSON-serialisable dict; an
+HTTPException (or any exception) marks the job "failed" with its status
+code and detail. At most `workers` jobs run at once per process. Several
+processes may share a store: a job is claimed with a conditional UPDATE,
+so exactly one worker runs it.
+
+A running job holds a lease (JOB_LEASE_S) that its worker renews every
+quarter of that. Any worker sharing the store requeues a job whose lease
+has expired (the process died, or the container restarted; pids and
+hostnames say nothing about that) and a job only finishes if its worker
+still holds it. A job whose lease expired JOB_MAX_ATTEMPTS times fails.
+
+Every job records when it was submitted, started and finished, so its queue
+wait and run time are reported with the result.
+
+JobStore is synchronous (each call is a SQLite transaction); JobQueue makes
+every store call, and every input file removal, on a worker thread so the
+event loop never waits on disk or on the store's lock.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from uploads import remove_quietly
+
+# -------------------
+# CONFIG
+# -------------------
+JOB_DIR = Path(os.getenv("JOB_DIR", Path(__file__).resolve().parent / "jobs"))
+JOB_RESULT_TTL_S = float(os.getenv("JOB_RESULT_TTL_S", str(24 * 3600)))  # finished jobs kept this long
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # runs interrupted by a crash count too
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "60"))  # a running job without a heartbeat this long is requeued
+JOB_POLL_INTERVAL_S = 1.0   # idle workers / long-polls re-check the store (other processes)
+JOB_PURGE_INTERVAL_S = 60.0
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+TERMINAL = (DONE, FAILED)
+
+_HOST = socket.gethostname()
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised by submit() when max_queued jobs are already waiting."""
+
+
+# -------------------
+# STORE
+# -------------------
+class JobStore:
+    def __init__(self, path: Path, lease_s: float = JOB_LEASE_S):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_s = lease_s
+        # Unique per store instance: a restarted server may get the same pid
+        self.owner = f"{_HOST}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " input_path TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " owner TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL,"
+                " started REAL,"
+                " finished REAL,"
+                " lease_until REAL)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "lease_until" not in columns:  # store created before leases
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created)"
+            )
+
+    def create(self, input_path: Optional[Path], params: dict) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, params, input_path, created) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(params), str(input_path) if input_path else None, time.time()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def claim(self) -> Optional[dict]:
+        """Move the oldest queued job to running and return it (None if idle or raced)."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Another process sharing the store may have claimed it meanwhile
+            now = time.time()
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, started = ?, lease_until = ?, attempts = attempts + 1"
+                " WHERE id = ? AND status = ?",
+                (RUNNING, self.owner, now, now + self.lease_s, row["id"], QUEUED),
+            )
+            if cur.rowcount == 0:
+                return None
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return _row_to_job(row)
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Renew this store's lease on a running job; False if it was lost."""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = ?",
+                (time.time() + self.lease_s, job_id, self.owner, RUNNING),
+            )
+        return cur.rowcount == 1
+
+    def finish(self, job_id: str, result: dict) -> bool:
+        """Record the result; False (nothing written) if this store no longer holds the job."""
+        return self._complete(job_id, DONE, "result", result)
+
+    def fail(self, job_id: str, status_code: int, detail) -> bool:
+        return self._complete(job_id, FAILED, "error", {"status": status_code, "detail": detail})
+
+    def _complete(self, job_id: str, status: str, column: str, value: dict) -> bool:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                f"UPDATE jobs SET status = ?, {column} = ?, finished = ?, lease_until = NULL"
+                " WHERE id = ? AND owner = ? AND status = ?",
+                (status, json.dumps(value), time.time(), job_id, self.owner, RUNNING),
+            )
+        return cur.rowcount == 1
+
+    def requeue_expired(self) -> int:
+        """Running jobs whose lease expired go back to the queue (or fail after JOB_MAX_ATTEMPTS)."""
+        now = time.time()
+        requeued = 0
+        with self._lock, self._conn:
+            # Rows from before leases existed have none: judge them by their start
+            rows = self._conn.execute(
+                "SELECT id, attempts FROM jobs WHERE status = ? AND COALESCE(lease_until, started + ?) < ?",
+                (RUNNING, self.lease_s, now),
+            ).fetchall()
+            for row in rows:
+                if row["attempts"] >= JOB_MAX_ATTEMPTS:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished = ?, lease_until = NULL"
+                        " WHERE id = ? AND status = ?",
+                        (FAILED, json.dumps({"status": 500, "detail": "Worker died while running this job"}),
+                         now, row["id"], RUNNING),
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner = NULL, started = NULL, lease_until = NULL"
+                        " WHERE id = ? AND status = ?",
+                        (QUEUED, row["id"], RUNNING),
+                    )
+                    requeued += 1
+        return requeued
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs (and leftover input files) older than `older_than`."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, input_path FROM jobs WHERE status IN (?, ?) AND finished < ?",
+                (DONE, FAILED, older_than),
+            ).fetchall()
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(r["id"],) for r in rows])
+        for r in rows:
+            if r["input_path"]:
+                remove_quietly(Path(r["input_path"]))
+        return len(rows)
+
+    def position(self, job: dict) -> int:
+        """Queued jobs ahead of this one."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created < ?",
+                (QUEUED, job["submitted_at"]),
+            ).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    created, started, finished = row["created"], row["started"], row["finished"]
+    timings = {}
+    if started is not None:
+        timings["queue_wait_s"] = round(started - created, 3)
+    if started is not None and finished is not None:
+        timings["run_s"] = round(finished - started, 3)
+    if finished is not None:
+        timings["total_s"] = round(finished - created, 3)
+    return {
+        "job_id": row["id"],
+        "status": row["status"],
+        "params": json.loads(row["params"]),
+        "input_path": row["input_path"],
+        "attempts": row["attempts"],
+        "submitted_at": created,
+        "started_at": started,
+        "finished_at": finished,
+        "timings": timings,
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": json.loads(row["error"]) if row["error"] else None,
+    }
+
+
+def public_view(job: dict) -> dict:
+    """The job as returned to clients (no server-side paths)."""
+    return {k: v for k, v in job.items() if k != "input_path"}
+
+
+# -------------------
+# WORKERS
+# -------------------
+class JobQueue:
+    def __init__(
+        self,
+        name: str,
+        store: JobStore,
+        handler: Callable[[dict], Awaitable[dict]],
+        workers: int,
+        max_queued: int,
+    ):
+        self.name = name
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._last_purge = 0.0
+        self._last_requeue = 0.0
+        self.heartbeat_s = store.lease_s / 4
+
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self):
+        await self._requeue_expired()
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        # Running jobs stay "running" in the store and are requeued once their lease expires
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, input_path: Optional[Path], params: dict) -> dict:
+        if (await self._store(self.store.counts)).get(QUEUED, 0) >= self.max_queued:
+            raise JobQueueFullError(f"{self.name} job queue is full ({self.max_queued} jobs waiting)")
+        job = await self._store(self.store.create, input_path, params)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self._store(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        if job is not None and job["status"] == QUEUED:
+            job["queue_position"] = self.store.position(job)
+        return job
+
+    async def _store(self, fn: Callable, *args):
+        """fn(*args) (a blocking JobStore call) on a worker thread."""
+        return await run_in_threadpool(fn, *args)
+
+    async def wait(self, job_id: str, timeout_s: float) -> Optional[dict]:
+        """Return the job once it is finished, or as it is after timeout_s."""
+        deadline = time.monotonic() + timeout_s
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        try:
+            while True:
+                job = await self.get(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job["status"] in TERMINAL or remaining <= 0:
+                    return job
+                try:
+                    # Woken by our own workers; the timeout also catches jobs
+                    # finished by another process sharing the store
+                    await asyncio.wait_for(event.wait(), min(remaining, JOB_POLL_INTERVAL_S))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if not event.is_set():
+                self._finished.pop(job_id, None)
+
+    async def _worker(self):
+        while True:
+            job = await self._store(self.store.claim)
+            if job is None:
+                await self._maybe_requeue()
+                await self._maybe_purge()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL_S)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_s)
+            if not await self._store(self.store.heartbeat, job_id):
+                print(f"⚠️ {self.name} job {job_id} lost its lease; another worker may rerun it")
+                return
+
+    async def _run(self, job: dict):
+        heartbeat = asyncio.ensure_future(self._heartbeat(job["job_id"]))
+        try:
+            result = await self.handler(job)
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            recorded = await self._store(self.store.fail, job["job_id"], e.status_code, e.detail)
+            self.failed += 1
+        except Exception as e:
+            recorded = await self._store(self.store.fail, job["job_id"], 500, str(e))
+            self.failed += 1
+        else:
+            recorded = await self._store(self.store.finish, job["job_id"], result)
+            self.completed += 1
+        finally:
+            heartbeat.cancel()
+        # A job requeued under us belongs to its new worker, input file included
+        if recorded and job["input_path"]:
+            await self._store(remove_quietly, Path(job["input_path"]))
+
+        event = self._finished.pop(job["job_id"], None)
+        if event is not None:
+            event.set()
+
+    async def _requeue_expired(self):
+        requeued = await self._store(self.store.requeue_expired)
+        if requeued:
+            print(f"🔁 {self.name} jobs: requeued {requeued} interrupted job(s)")
+
+    async def _maybe_requeue(self):
+        now = time.time()
+        if now - self._last_requeue < self.heartbeat_s:
+            return
+        self._last_requeue = now
+        await self._requeue_expired()
+
+    async def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge < JOB_PURGE_INTERVAL_S:
+            return
+        self._last_purge = now
+        await self._store(self.store.purge, now - JOB_RESULT_TTL_S)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "jobs": self.store.counts(),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
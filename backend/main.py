@@ -1,23 +1,45 @@
+import asyncio
+import copy
 import os
 import time
-from io import BytesIO
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-import cv2
 import numpy as np
 import torch
-import torch.nn as nn
-from torchvision import transforms, models
-from torchvision.models import EfficientNet_B4_Weights
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from PIL import Image
+
+from batching import MicroBatcher
+from bulk import iter_upload_items, read_bulk_form, stream_ndjson
+from detectors import DeepfakeDetector, IMG_SIZE as DETECTOR_IMG_SIZE
+from executors import PRIORITY_BULK, PRIORITY_INTERACTIVE, PoolSaturatedError, cpu_pool, executor_stats, inference_pool
+from heuristics import heuristic_scores
+from image_pipeline import TensorBatchBuffer, prepare_image
+from metrics import CONTENT_TYPE, MODEL_BATCH_SIZE, render as render_metrics, stage_timer, track_request
+from model_loader import MODEL_PRELOAD, ModelLoader, load_checkpoint_model
+from near_duplicate import build_near_duplicate_index, phash
+from profiling import add_profiling_routes, capture as profile_capture
+from result_cache import build_result_cache, hash_bytes, make_namespace, model_fingerprint
+from runtimes import default_artifact_path, describe_runtime, load_runtime, resolve_precision
+from topology import apply_topology, topology_status
+from verdicts import (
+    DEEPFAKE_THRESHOLD,
+    FILTER_MEDIUM_THRESHOLD,
+    FILTER_MIN_INDICATORS,
+    FILTER_STRONG_THRESHOLD,
+    UNCERTAIN_BAND,
+    build_verdict,
+    looks_like_filtered,
+)
 
 # -------------------
 # CONFIG
 # -------------------
-IMG_SIZE = (380, 380)
+IMG_SIZE = DETECTOR_IMG_SIZE  # must match training
 MODEL_PATH = os.path.join("models", "image", "image_model.pth")
 
 if not os.path.exists(MODEL_PATH):
@@ -27,58 +49,128 @@ if not os.path.exists(MODEL_PATH):
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print(f"Using device: {device}")
 
-# How strict we are when calling something "deepfake"
-DEEPFAKE_THRESHOLD = 0.9   # require very high fake probability
-UNCERTAIN_BAND = 0.10      # around 0.5 → treat as uncertain, favor authentic
+# This worker's cores and thread counts (TOPOLOGY / THREAD_BUDGET, see
+# topology.py); before the pools below are created and the model loads
+apply_topology()
+
+# Serving backend: eager | torchscript | onnx (see runtimes.py)
+IMAGE_RUNTIME = os.getenv("IMAGE_RUNTIME", "eager")
+IMAGE_RUNTIME_PATH = os.getenv("IMAGE_RUNTIME_PATH") or default_artifact_path(
+    MODEL_PATH, IMAGE_RUNTIME
+)
+
+# Eager runtime numerics: fp32 | bf16 | auto (bf16 where the CPU has native
+# support), optionally channels_last (see runtimes.py); resolved up front so
+# the result cache is namespaced by what actually runs
+IMAGE_PRECISION = resolve_precision(os.getenv("IMAGE_PRECISION", "fp32"), device)
+IMAGE_CHANNELS_LAST = os.getenv("IMAGE_CHANNELS_LAST", "0") == "1"
+
+# Deepfake / filter thresholds and the verdict itself live in verdicts.py
+
+# Dynamic micro-batching of concurrent /detect/image requests
+MAX_BATCH_SIZE = int(os.getenv("IMAGE_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("IMAGE_MAX_BATCH_WAIT_MS", "5"))
+
+# Bulk /detect/images: larger batches, bounded in-flight items per request
+BULK_MAX_BATCH_SIZE = int(os.getenv("IMAGE_BULK_MAX_BATCH_SIZE", "32"))
+BULK_MAX_BATCH_WAIT_MS = float(os.getenv("IMAGE_BULK_MAX_BATCH_WAIT_MS", "20"))
+BULK_MAX_IN_FLIGHT = int(os.getenv("IMAGE_BULK_MAX_IN_FLIGHT", "32"))
+BULK_MAX_ITEMS = int(os.getenv("IMAGE_BULK_MAX_ITEMS", "10000"))
+BULK_MAX_ITEM_BYTES = int(os.getenv("IMAGE_BULK_MAX_ITEM_BYTES", str(25 * 1024 * 1024)))
+
+# Image preprocessing (must match training): Resize -> ToTensor -> Normalize,
+# fused into one step writing into a reusable per-thread input buffer
+input_buffer = TensorBatchBuffer(IMG_SIZE, MAX_BATCH_SIZE)
 
-# Thresholds for “filter-like manipulation”
-FILTER_STRONG_THRESHOLD = 80  # very strong weirdness
-FILTER_MEDIUM_THRESHOLD = 70  # medium weirdness
-FILTER_MIN_INDICATORS = 2     # how many scores must be high to call it filtered
+# Per-stage latency histograms on /metrics (metrics.py)
+image_stage = stage_timer("image")
 
 # -------------------
-# MODEL ARCHITECTURE (same as training)
+# LOAD MODEL (background thread, see model_loader.py)
 # -------------------
-class DeepfakeDetector(nn.Module):
-    def __init__(self):
-        super(DeepfakeDetector, self).__init__()
-        self.backbone = models.efficientnet_b4(
-            weights=EfficientNet_B4_Weights.IMAGENET1K_V1
-        )
-        num_features = self.backbone.classifier[1].in_features
-        self.backbone.classifier = nn.Sequential(
-            nn.Dropout(0.5),
-            nn.Linear(num_features, 256),
-            nn.BatchNorm1d(256),
-            nn.ReLU(),
-            nn.Dropout(0.3),
-            nn.Linear(256, 1),
+def load_image_model(stage):
+    # No ImageNet weights: the fine-tuned checkpoint overwrites them anyway
+    build_eager = lambda: load_checkpoint_model(DeepfakeDetector, MODEL_PATH, device, stage)
+    print(f"Loading image model ({IMAGE_RUNTIME} runtime, {IMAGE_PRECISION}"
+          f"{', channels_last' if IMAGE_CHANNELS_LAST else ''})...")
+    with stage("load_runtime"):
+        return load_runtime(
+            IMAGE_RUNTIME, build_eager, device, IMAGE_RUNTIME_PATH, IMAGE_PRECISION, IMAGE_CHANNELS_LAST
         )
 
-    def forward(self, x):
-        return self.backbone(x)
-
-# Load model
-print("Loading PyTorch model...")
-model = DeepfakeDetector()
-model.load_state_dict(torch.load(MODEL_PATH, map_location=device))
-model.to(device)
-model.eval()
-print("Model loaded successfully.")
-
-# Image preprocessing (must match training)
-transform = transforms.Compose(
-    [
-        transforms.Resize(IMG_SIZE),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
-    ]
+def warmup_image_model(m):
+    blank = np.zeros((*IMG_SIZE, 3), dtype=np.uint8)
+    m(input_buffer.fill([blank]))
+
+image_model = ModelLoader("image_model", load_image_model, warmup_image_model)
+
+# -------------------
+# BATCHED INFERENCE
+# -------------------
+def predict_batch(images: List[np.ndarray]) -> List[float]:
+    """Run one forward over resized BGR uint8 images, return p_fake for each."""
+    model = image_model.get()
+    MODEL_BATCH_SIZE.labels(model="image").observe(len(images))
+    with image_stage("preprocess"):
+        x = input_buffer.fill(images)
+    with image_stage("forward"):
+        logits = model(x).view(-1)
+        p_real = torch.sigmoid(logits)
+
+    # Labels: fake=0, real=1
+    return (1.0 - p_real).cpu().tolist()
+
+batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_BATCH_WAIT_MS,
+    name="image_model",
+    executor=inference_pool(),
+)
+
+# Bulk requests get their own queue so they run big batches without making
+# interactive requests wait for a 32-image batch to fill
+bulk_batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=BULK_MAX_BATCH_SIZE,
+    max_wait_ms=BULK_MAX_BATCH_WAIT_MS,
+    name="image_model_bulk",
+    executor=inference_pool(PRIORITY_BULK),
 )
 
+# -------------------
+# RESULT CACHE
+# -------------------
+# Keyed by upload hash; namespaced by everything else the verdict depends on
+result_cache = build_result_cache(
+    "image",
+    make_namespace(
+        model=model_fingerprint(MODEL_PATH),
+        runtime=IMAGE_RUNTIME,
+        runtime_artifact=model_fingerprint(IMAGE_RUNTIME_PATH) if IMAGE_RUNTIME_PATH else None,
+        precision=(IMAGE_PRECISION, IMAGE_CHANNELS_LAST),
+        img_size=IMG_SIZE,
+        deepfake_threshold=DEEPFAKE_THRESHOLD,
+        uncertain_band=UNCERTAIN_BAND,
+        filter_strong_threshold=FILTER_STRONG_THRESHOLD,
+        filter_medium_threshold=FILTER_MEDIUM_THRESHOLD,
+        filter_min_indicators=FILTER_MIN_INDICATORS,
+    ),
+)
+
+# Perceptual-hash index: re-encoded reposts reuse a prior verdict
+near_dup_index = build_near_duplicate_index()
+
 # -------------------
 # FASTAPI APP
 # -------------------
-app = FastAPI(title="Detectify Image Deepfake API (PyTorch)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MODEL_PRELOAD:
+        image_model.start()
+    yield
+
+app = FastAPI(title="Detectify Image Deepfake API (PyTorch)", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -109,137 +201,46 @@ class DetectionResponse(BaseModel):
     detection_details: DetectionDetails
     analysis_summary: AnalysisSummary
     reasons: List[str]
+    near_duplicate: bool = False                   # verdict reused from a near-identical upload
+    near_duplicate_distance: Optional[int] = None  # pHash Hamming distance to that upload
+    degraded: bool = False                         # heuristics failed (neutral scores); never cached
 
 # -------------------
 # PREPROCESSING
 # -------------------
-def preprocess_for_model(file_bytes: bytes) -> torch.Tensor:
-    """Convert uploaded image to model-ready tensor."""
-    image = Image.open(BytesIO(file_bytes)).convert("RGB")
-    tensor = transform(image).unsqueeze(0)  # Add batch dimension
-    return tensor
+def preprocess_for_model(file_bytes: bytes):
+    """Decode the upload once; return (full-res BGR image, model-size BGR image)."""
+    return prepare_image(file_bytes, IMG_SIZE)
+
+def decode_for_analysis(file_bytes: bytes):
+    """preprocess_for_model() plus the perceptual hash for near-duplicate lookup."""
+    with image_stage("decode"):
+        img_bgr, model_input = preprocess_for_model(file_bytes)
+    image_hash = None
+    if near_dup_index is not None:
+        with image_stage("phash"):
+            image_hash = phash(img_bgr)
+    return img_bgr, model_input, image_hash
 
 # -------------------
 # CV HEURISTICS
 # -------------------
-def compute_face_roi(image_bgr: np.ndarray) -> np.ndarray:
-    h, w, _ = image_bgr.shape
-    size = int(min(h, w) * 0.7)
-    y1 = (h - size) // 2
-    x1 = (w - size) // 2
-    return image_bgr[y1 : y1 + size, x1 : x1 + size]
-
-def texture_score(face_roi: np.ndarray) -> int:
-    gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
-    lap = cv2.Laplacian(gray, cv2.CV_64F)
-    var = lap.var()
-    min_v, max_v = 10.0, 300.0
-    s = (var - min_v) / (max_v - min_v)
-    s = float(np.clip(s, 0.0, 1.0))
-    return int(s * 100)
-
-def lighting_score(face_roi: np.ndarray) -> int:
-    gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
-    left = gray[:, : w // 2]
-    right = gray[:, w // 2 :]
-    mean_left = float(left.mean())
-    mean_right = float(right.mean())
-    diff = abs(mean_left - mean_right)
-    std_dev = float(gray.std())
-    max_diff = 50.0
-    s1 = diff / max_diff
-    s2 = max(0, 1.0 - std_dev / 60.0)
-    s = (s1 + s2) / 2.0
-    s = float(np.clip(s, 0.0, 1.0))
-    return int(s * 100)
-
-def pixel_artifact_score(face_roi: np.ndarray) -> int:
-    gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 100, 200)
-    edge_density = edges.mean() / 255.0
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    diff = cv2.absdiff(gray, blur)
-    noise_level = diff.mean() / 255.0
-    s = (edge_density * 1.5 + noise_level * 2.0) / 2.0
-    s = float(np.clip(s, 0.0, 1.0))
-    return int(s * 100)
-
 def analyse_image_for_explanations(image_bgr: np.ndarray):
-    face = compute_face_roi(image_bgr)
-    tex = texture_score(face)
-    light = lighting_score(face)
-    pix = pixel_artifact_score(face)
-    return tex, light, pix
+    """(tex, light, pix) scores; one gray conversion, fixed pixel budget (heuristics.py)."""
+    with image_stage("heuristics"):
+        return heuristic_scores(image_bgr)
 
 # -------------------
-# FILTER / HEAVY-MANIPULATION HEURISTIC
+# RESPONSE
 # -------------------
-def looks_like_filtered(p_fake: float, tex: int, light: int, pix: int) -> bool:
-    if p_fake >= DEEPFAKE_THRESHOLD:
-        # Model already strongly believes it's a deepfake → don't override
-        return False
-
-    # Count how many indicators are very high
-    strong_indicators = sum(
-        score >= FILTER_STRONG_THRESHOLD for score in (tex, light, pix)
-    )
-
-    # Also treat as filtered if all three are above medium threshold
-    medium_all = all(score >= FILTER_MEDIUM_THRESHOLD for score in (tex, light, pix))
-
-    # Only consider "filtered" primarily when model leans real
-    if p_fake < 0.5 and (strong_indicators >= FILTER_MIN_INDICATORS or medium_all):
-        return True
-
-    return False
-
-def build_verdict(p_fake: float, is_filtered: bool):
-    # First, strong deepfake
-    if p_fake >= DEEPFAKE_THRESHOLD:
-        return (
-            "deepfake",
-            "Deepfake Detected",
-            "Strong indicators of facial manipulation consistent with deepfake generation techniques were detected.",
-        )
-
-    # If heuristics say "looks like a filter / heavy effect"
-    if is_filtered:
-        return (
-            "filtered",
-            "Filtered / Visually Manipulated",
-            "The image shows strong signs of filters or heavy visual effects, but not classic deepfake-style face swapping.",
-        )
-
-    # Close to 0.5 → uncertain, but do NOT call deepfake
-    if abs(p_fake - 0.5) <= UNCERTAIN_BAND:
-        return (
-            "suspicious",
-            "Inconclusive Analysis",
-            "Analysis results are borderline. Additional verification is recommended.",
-        )
-
-    # Moderately high fake probability but below deepfake threshold
-    if p_fake >= 0.6:
-        return (
-            "suspicious",
-            "Suspicious Content",
-            "Notable visual inconsistencies detected. Manual verification is recommended.",
-        )
-
-    # Otherwise, treat as authentic
-    return (
-        "authentic",
-        "Authentic Media",
-        "No strong signs of deepfake-style facial manipulation detected.",
-    )
-
 def build_response(
     p_fake: float,
     tex: int,
     light: int,
     pix: int,
     processing_time: float,
+    near_duplicate_distance: Optional[int] = None,
+    degraded: bool = False,
 ) -> DetectionResponse:
     is_filtered = looks_like_filtered(p_fake, tex, light, pix)
     verdict, title, message = build_verdict(p_fake, is_filtered)
@@ -316,64 +317,205 @@ def build_response(
         detection_details=details,
         analysis_summary=summary,
         reasons=reasons,
+        near_duplicate=near_duplicate_distance is not None,
+        near_duplicate_distance=near_duplicate_distance,
+        degraded=degraded,
     )
 
 # -------------------
 # ROUTES
 # -------------------
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 only once the model is loaded and warmed up."""
+    image_model.start()
+    status = image_model.status()
+    if not image_model.ready:
+        raise HTTPException(status_code=503, detail=status)
+    return {"ready": True, **status}
+
 @app.get("/health")
 def health():
     return {
         "status": "ok",
-        "model_loaded": True,
+        "model_loaded": image_model.ready,
         "framework": "PyTorch",
         "device": str(device),
+        "runtime": describe_runtime(image_model.get()) if image_model.ready else None,
+        "startup": image_model.status(),
         "deepfake_threshold": DEEPFAKE_THRESHOLD,
         "uncertain_band": UNCERTAIN_BAND,
         "filter_strong_threshold": FILTER_STRONG_THRESHOLD,
+        "batching": batcher.stats(),
+        "bulk_batching": bulk_batcher.stats(),
+        "executors": executor_stats(),
+        "topology": topology_status(),
+        "result_cache": result_cache.stats(),
+        "near_duplicate": near_dup_index.stats() if near_dup_index else {"enabled": False},
     }
 
-@app.post("/detect/image", response_model=DetectionResponse)
-async def detect_image(file: UploadFile = File(...)):
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=400, detail="Please upload an image file."
-        )
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (metrics.py)."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+# /admin/profile: on-demand request profiling (profiling.py, off by default)
+add_profiling_routes(app)
+
+async def analyse_image(
+    file_bytes: bytes, model_batcher: MicroBatcher = batcher, priority: int = PRIORITY_INTERACTIVE
+) -> dict:
+    """Full analysis of one uploaded image; returns the response as a dict.
 
+    priority applies to the CPU pool work; model_batcher carries the
+    inference priority (bulk_batcher for bulk requests).
+    """
     start_time = time.time()
-    file_bytes = await file.read()
 
-    # 1) Model prediction
+    # 0) Single decode shared by the model and the heuristics
     try:
-        x = preprocess_for_model(file_bytes).to(device)
+        img_bgr, model_input, image_hash = await cpu_pool(priority).run(
+            decode_for_analysis, file_bytes
+        )
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Could not decode image.")
+
+    # Near-identical image seen before → reuse its scores, skip the model
+    if near_dup_index is not None:
+        match = near_dup_index.lookup([image_hash])
+        if match is not None:
+            (p_fake, tex, light, pix), distance = match
+            response = build_response(
+                p_fake, tex, light, pix, time.time() - start_time,
+                near_duplicate_distance=int(distance),
+            )
+            return jsonable_encoder(response)
+
+    # CV heuristics run on the CPU pool while the model path is in flight
+    heuristics = asyncio.ensure_future(
+        cpu_pool(priority).run(analyse_image_for_explanations, img_bgr)
+    )
 
-        with torch.no_grad():
-            output = model(x).squeeze()
-            p_real = torch.sigmoid(output).item()
+    # 1) Model prediction (waits for startup if the model is still loading)
+    try:
+        await image_model.wait()
+    except Exception as e:
+        heuristics.cancel()
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {str(e)}")
 
-        # Labels: fake=0, real=1
-        p_fake = 1.0 - p_real
+    try:
+        p_fake = await model_batcher.submit(model_input)
 
+    except PoolSaturatedError as e:
+        heuristics.cancel()
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
+        heuristics.cancel()
         raise HTTPException(
             status_code=500, detail=f"Model prediction failed: {str(e)}"
         )
 
     # 2) CV heuristics
+    degraded = False
     try:
-        arr = np.frombuffer(file_bytes, np.uint8)
-        img_bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img_bgr is None:
-            raise HTTPException(
-                status_code=400, detail="Could not decode image."
-            )
-        tex, light, pix = analyse_image_for_explanations(img_bgr)
+        tex, light, pix = await heuristics
     except Exception as e:
+        # Neutral scores for this answer only: neither the result cache nor
+        # the near-duplicate index keeps it
         print(f"CV analysis warning: {e}")
         tex, light, pix = 50, 50, 50
+        degraded = True
 
     processing_time = time.time() - start_time
 
+    if near_dup_index is not None and not degraded:
+        near_dup_index.add([image_hash], (p_fake, tex, light, pix))
+
     # 3) Build response
-    response = build_response(p_fake, tex, light, pix, processing_time)
-    return response
+    response = build_response(p_fake, tex, light, pix, processing_time, degraded=degraded)
+    return jsonable_encoder(response)
+
+@app.post("/detect/image", response_model=DetectionResponse)
+async def detect_image(request: Request, response: Response, file: UploadFile = File(...)):
+    async with track_request("image", "/detect/image") as req, \
+            profile_capture(request, response, "image", "/detect/image"):
+        if not file.content_type.startswith("image/"):
+            raise HTTPException(
+                status_code=400, detail="Please upload an image file."
+            )
+
+        with image_stage("upload_read"):
+            file_bytes = await file.read()
+        result = await detect_cached(file_bytes)
+        req.verdict = result["verdict"]
+        return result
+
+def hash_file_bytes(file_bytes: bytes) -> str:
+    with image_stage("hash"):
+        return hash_bytes(file_bytes)
+
+async def detect_cached(
+    file_bytes: bytes, model_batcher: MicroBatcher = batcher, priority: int = PRIORITY_INTERACTIVE
+) -> dict:
+    """analyse_image() behind the result cache and single-flight."""
+    start_time = time.time()
+
+    try:
+        digest = await cpu_pool(priority).run(hash_file_bytes, file_bytes)
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # Identical uploads share one cached / in-flight analysis
+    result, source = await result_cache.get_or_compute(
+        result_cache.key_for(digest), lambda: analyse_image(file_bytes, model_batcher, priority)
+    )
+
+    if source != "miss":
+        # Shared result: copy before reporting this request's own timing
+        result = copy.deepcopy(result)
+        result["analysis_summary"]["processing_time"] = round(time.time() - start_time, 2)
+    return result
+
+# Multipart "files" field, documented by hand: the endpoint parses the form
+# itself so the uploads stay open while the response streams (see bulk.py)
+BULK_FILES_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["files"],
+            "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+        }}},
+    }
+}
+
+@app.post("/detect/images", openapi_extra=BULK_FILES_SCHEMA)
+async def detect_images(request: Request):
+    """
+    Bulk detection over many image files and/or zip archives of images.
+    Streams one NDJSON line per item as soon as it is done (completion order):
+        {"index": 0, "filename": "a.jpg", "result": <DetectionResponse>}
+        {"index": 1, "filename": "b.txt", "error": {"status": 400, "detail": "..."}}
+    """
+    form, files = await read_bulk_form(request, BULK_MAX_ITEMS)
+
+    async def handle(filename: str, content_type: Optional[str], data: bytes) -> dict:
+        async with track_request("image", "/detect/images") as req:
+            if content_type is not None and not content_type.startswith("image/"):
+                raise HTTPException(status_code=400, detail="Not an image file.")
+            result = await detect_cached(data, bulk_batcher, PRIORITY_BULK)
+            req.verdict = result["verdict"]
+            return result
+
+    return StreamingResponse(
+        stream_ndjson(
+            iter_upload_items(files, BULK_MAX_ITEM_BYTES),
+            handle,
+            max_in_flight=BULK_MAX_IN_FLIGHT,
+            max_items=BULK_MAX_ITEMS,
+            on_close=form.close,
+        ),
+        media_type="application/x-ndjson",
+    )
@@ -4,24 +4,67 @@ Uses trained model from:
     backend/models/testing/video_best_model.pth
 """
 
+import asyncio
+import copy
+import itertools
 import os
 import time
 import uuid
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
+from typing import List, Optional
 
 import torch
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from facenet_pytorch import MTCNN
-from torchvision import transforms
 from pydantic import BaseModel
 
+from model_loader import MODEL_PRELOAD, ModelLoader, load_checkpoint_model
+from embedding_cache import (
+    build_embedding_cache,
+    cached_features,
+    classify_clips,
+    classify_features,
+    embed_keys,
+)
+from executors import PRIORITY_BACKGROUND, PoolSaturatedError, cpu_pool, executor_stats, inference_pool
+from jobs import JOB_DIR, JobQueue, JobQueueFullError, JobStore, public_view
+from metrics import CONTENT_TYPE, MODEL_BATCH_SIZE, STAGE_SECONDS, render as render_metrics, stage_timer, track_request
+from near_duplicate import build_near_duplicate_index, video_keyframe_hashes
+from profiling import add_profiling_routes, capture as profile_capture
+from result_cache import build_result_cache, make_namespace, model_fingerprint
+from runtimes import default_artifact_path, describe_runtime, load_runtime, resolve_precision, supports_stages
+from progressive import (
+    EARLY_EXIT_MARGIN,
+    EARLY_EXIT_MIN_PASSES,
+    EARLY_EXIT_Z,
+    VIDEO_PROGRESSIVE,
+    ProgressiveEstimate,
+)
+from timeline import (
+    VIDEO_TIMELINE_BATCH,
+    VIDEO_TIMELINE_CHUNK_FRAMES,
+    VIDEO_TIMELINE_TOP_K,
+    VIDEO_TIMELINE_WINDOW_S,
+    segment,
+    suspicious_intervals,
+)
+from topology import apply_topology, topology_status
+from uploads import remove_quietly, staged_upload, sweep_scratch_dir
+from verdicts import VIDEO_DEEPFAKE_THRESHOLD, VIDEO_N_PASSES, VIDEO_UNCERTAIN_BAND, video_verdict
+
 # -----------------------------------------------------------
 # IMPORT FROM TRAINING PIPELINE FOR PERFECT CONSISTENCY
 # -----------------------------------------------------------
 from training.train_ffpp_video_model import (
     VideoDeepfakeModel,
-    load_video_frames_face_only,
+    iter_video_clips,
+    iter_video_windows,
+    load_video_clips_face_only,
     IMG_SIZE as TRAIN_IMG_SIZE,
     FRAMES_PER_VIDEO as TRAIN_FRAMES,
 )
@@ -41,53 +84,108 @@ if not MODEL_PATH.exists():
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print("Using device:", device)
 
+# This worker's cores and thread counts (TOPOLOGY / THREAD_BUDGET, see
+# topology.py); before the executor pools are created and the models load
+apply_topology()
+
+# Serving backend: eager | torchscript | onnx (see runtimes.py)
+VIDEO_RUNTIME = os.getenv("VIDEO_RUNTIME", "eager")
+env_runtime_path = os.getenv("VIDEO_RUNTIME_PATH")
+VIDEO_RUNTIME_PATH = (
+    Path(env_runtime_path) if env_runtime_path
+    else default_artifact_path(MODEL_PATH, VIDEO_RUNTIME)
+)
+
+# Eager runtime numerics: fp32 | bf16 | auto (bf16 where the CPU has native
+# support), optionally channels_last (see runtimes.py); resolved up front so
+# the result cache is namespaced by what actually runs
+VIDEO_PRECISION = resolve_precision(os.getenv("VIDEO_PRECISION", "fp32"), device)
+VIDEO_CHANNELS_LAST = os.getenv("VIDEO_CHANNELS_LAST", "0") == "1"
+
 # MUST match training exactly
 IMG_SIZE = TRAIN_IMG_SIZE
 FRAMES_PER_VIDEO = TRAIN_FRAMES
 
-# How many times to resample frames & average predictions
-N_PASSES = 3  # increase for more stability (with more latency)
+# How many times to resample frames & average predictions (verdicts.py)
+N_PASSES = VIDEO_N_PASSES
 
-# -----------------------------------------------------------
-# TRANSFORMS (MATCH TRAINING)
-# -----------------------------------------------------------
-frame_transform = transforms.Compose([
-    transforms.Resize(IMG_SIZE),
-    transforms.ToTensor(),
-    transforms.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225],
-    ),
-])
+# Detect-then-track: MTCNN on a few anchor frames, faces tracked in between
+# (detect_face_boxes_tracked in the training pipeline)
+VIDEO_FACE_TRACKING = os.getenv("VIDEO_FACE_TRACKING", "0") == "1"
 
-# -----------------------------------------------------------
-# LOAD MODEL
-# -----------------------------------------------------------
-print(f"Loading video deepfake model from: {MODEL_PATH}")
+# Progressive mode (see progressive.py) scores one pass at a time and may stop
+# early; it never scores more than this many passes
+VIDEO_PROGRESSIVE_MAX_PASSES = int(os.getenv("VIDEO_PROGRESSIVE_MAX_PASSES", str(N_PASSES)))
+
+# Video work yields to image requests when both share a process (server.py)
+VIDEO_PRIORITY = PRIORITY_BACKGROUND
+
+# Backbone frames per inference task (eager runtime), so image requests can
+# run between the chunks of a long video batch; 0 = the whole batch at once
+VIDEO_EMBED_CHUNK_FRAMES = int(os.getenv("VIDEO_EMBED_CHUNK_FRAMES", "8"))
 
-model = VideoDeepfakeModel()
-state_dict = torch.load(MODEL_PATH, map_location=device)
-model.load_state_dict(state_dict)
-model.to(device)
-model.eval()
+# Per-stage latency histograms on /metrics (metrics.py)
+video_stage = stage_timer("video")
 
-print("Model loaded successfully.")
+# Uploads are streamed to UPLOAD_SCRATCH_DIR (see uploads.py), never held in memory
+VIDEO_MAX_UPLOAD_BYTES = int(os.getenv("VIDEO_MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+
+# Background jobs (POST /jobs/video, see jobs.py)
+VIDEO_JOB_WORKERS = int(os.getenv("VIDEO_JOB_WORKERS", "2"))        # jobs analysed at once
+VIDEO_JOB_MAX_QUEUED = int(os.getenv("VIDEO_JOB_MAX_QUEUED", "1000"))
+VIDEO_JOB_MAX_WAIT_S = float(os.getenv("VIDEO_JOB_MAX_WAIT_S", "30"))  # long-poll cap
+VIDEO_JOB_FILES_DIR = JOB_DIR / "video_files"  # inputs must outlive a restart, unlike scratch uploads
+
+# Appended to "Error processing video: ..." by every analysis endpoint
+VIDEO_ERROR_HINT = "Check that the video contains clear faces, uses a supported codec, and is not corrupt."
 
 # -----------------------------------------------------------
-# MTCNN (MATCH TRAINING SETTINGS)
+# LOAD MODEL + MTCNN (background thread, see model_loader.py)
 # -----------------------------------------------------------
-mtcnn = MTCNN(
-    image_size=IMG_SIZE[0],
-    margin=0,
-    keep_all=False,
-    post_process=False,
-    device=device,
-)
+def load_video_models(stage):
+    print(f"Loading video deepfake model from: {MODEL_PATH} ({VIDEO_RUNTIME} runtime, {VIDEO_PRECISION}"
+          f"{', channels_last' if VIDEO_CHANNELS_LAST else ''})")
+
+    # No ImageNet weights: the fine-tuned checkpoint overwrites them anyway
+    build_eager = lambda: load_checkpoint_model(
+        partial(VideoDeepfakeModel, pretrained=False), MODEL_PATH, device, stage
+    )
+    with stage("load_runtime"):
+        model = load_runtime(
+            VIDEO_RUNTIME, build_eager, device, VIDEO_RUNTIME_PATH, VIDEO_PRECISION, VIDEO_CHANNELS_LAST
+        )
+
+    # MTCNN (MATCH TRAINING SETTINGS)
+    with stage("mtcnn"):
+        mtcnn = MTCNN(
+            image_size=IMG_SIZE[0],
+            margin=0,
+            keep_all=False,
+            post_process=False,
+            device=device,
+        )
+    return model, mtcnn
+
+def warmup_video_models(models):
+    model, _ = models
+    model(torch.zeros(1, FRAMES_PER_VIDEO, 3, *IMG_SIZE))
+
+video_models = ModelLoader("video_model", load_video_models, warmup_video_models)
 
 # -----------------------------------------------------------
 # FASTAPI APP
 # -----------------------------------------------------------
-app = FastAPI(title="Detectify Video Deepfake API (PyTorch)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweep_scratch_dir()
+    sweep_scratch_dir(VIDEO_JOB_FILES_DIR)  # half-received job uploads only
+    if MODEL_PRELOAD:
+        video_models.start()
+    await video_jobs.start()
+    yield
+    await video_jobs.stop()
+
+app = FastAPI(title="Detectify Video Deepfake API (PyTorch)", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -105,121 +203,532 @@ class VideoResponse(BaseModel):
     confidence: float      # percentage 0-100
     message: str
     processing_time: float # seconds
+    near_duplicate: bool = False                     # verdict reused from a near-identical upload
+    near_duplicate_distance: Optional[float] = None  # mean keyframe pHash Hamming distance
+    progressive: bool = False       # scored with early exit
+    passes_used: Optional[int] = None  # sampled clips behind the score (None if not scored)
+    frames_used: Optional[int] = None  # sampled frames behind the score; progressive mode counts face frames only
+
+class TimelineSegment(BaseModel):
+    start_s: float
+    end_s: float
+    prob_fake: float
+
+class SuspiciousInterval(BaseModel):
+    start_s: float
+    end_s: float
+    peak_prob_fake: float
+    mean_prob_fake: float
+    segments: int          # merged windows
+
+class VideoTimelineResponse(VideoResponse):
+    # Verdict / confidence come from the most suspicious window
+    duration_s: float
+    window_s: float
+    segments: List[TimelineSegment]
+    suspicious_intervals: List[SuspiciousInterval]
 
 # -----------------------------------------------------------
 # CLASSIFICATION CONFIGURATION
 # -----------------------------------------------------------
-# High threshold: require very strong evidence to call "deepfake"
-DEEPFAKE_THRESHOLD = 0.9
+# Deepfake threshold and uncertain band (verdicts.py, shared with tools)
+DEEPFAKE_THRESHOLD = VIDEO_DEEPFAKE_THRESHOLD
+UNCERTAIN_BAND = VIDEO_UNCERTAIN_BAND
 
-# Around 0.5, treat as "uncertain but likely real"
-UNCERTAIN_BAND = 0.15  # e.g., prob_fake in [0.35, 0.65]
+# Timeline windows above the uncertain band are reported as suspicious
+TIMELINE_SUSPICIOUS_THRESHOLD = 0.5 + UNCERTAIN_BAND
 
 # -----------------------------------------------------------
-# ENDPOINT
+# RESULT CACHE
 # -----------------------------------------------------------
-@app.post("/detect/video", response_model=VideoResponse)
-async def detect_video(file: UploadFile = File(...)):
-    if not file.content_type or not file.content_type.startswith("video/"):
-        raise HTTPException(status_code=400, detail="Please upload a valid video file.")
+# Keyed by upload hash; namespaced by everything else the verdict depends on
+result_cache = build_result_cache(
+    "video",
+    make_namespace(
+        model=model_fingerprint(MODEL_PATH),
+        runtime=VIDEO_RUNTIME,
+        runtime_artifact=model_fingerprint(VIDEO_RUNTIME_PATH) if VIDEO_RUNTIME_PATH else None,
+        precision=(VIDEO_PRECISION, VIDEO_CHANNELS_LAST),
+        img_size=IMG_SIZE,
+        frames_per_video=FRAMES_PER_VIDEO,
+        n_passes=N_PASSES,
+        face_tracking=VIDEO_FACE_TRACKING,
+        timeline=(VIDEO_TIMELINE_WINDOW_S, VIDEO_TIMELINE_TOP_K, TIMELINE_SUSPICIOUS_THRESHOLD),
+        deepfake_threshold=DEEPFAKE_THRESHOLD,
+        uncertain_band=UNCERTAIN_BAND,
+        progressive_max_passes=VIDEO_PROGRESSIVE_MAX_PASSES,
+        early_exit=(EARLY_EXIT_MARGIN, EARLY_EXIT_Z, EARLY_EXIT_MIN_PASSES),
+    ),
+)
 
-    start = time.time()
+# Perceptual-hash index over keyframes: re-encoded reposts reuse a prior verdict
+near_dup_index = build_near_duplicate_index()
+
+# Backbone features per (upload, frame): repeated / overlapping frames only
+# run the GRU head (see embedding_cache.py; eager runtime only)
+embedding_cache = build_embedding_cache()
+
+# -----------------------------------------------------------
+# BLOCKING HELPERS (run on the shared executor pools)
+# -----------------------------------------------------------
+def predict_clips(clips: torch.Tensor, keys: Optional[List[List[int]]] = None, digest: Optional[str] = None) -> List[float]:
+    """
+    Run the model once on a (P, T, C, H, W) batch of clips, return p_real per
+    clip. With the clips' frame keys, each distinct frame is embedded once
+    and embeddings are reused across calls for the same upload digest.
+    """
+    model, _ = video_models.get()
+    MODEL_BATCH_SIZE.labels(model="video").observe(len(clips))
+    with video_stage("forward"):
+        if keys is not None and supports_stages(model):
+            logits = classify_clips(model, clips, keys, digest, embedding_cache).view(-1)
+        else:
+            logits = model(clips).view(-1)
+
+    # Training convention: 1 = real, 0 = fake
+    return torch.sigmoid(logits).cpu().tolist()
+
+def embed_chunk(clips: torch.Tensor, keys: List[List[int]], wanted: List[int], digest: Optional[str]) -> dict:
+    model, _ = video_models.get()
+    MODEL_BATCH_SIZE.labels(model="video_backbone").observe(len(wanted))
+    with video_stage("embed"):
+        return embed_keys(model, clips, keys, wanted, digest, embedding_cache)
+
+def classify_embedded(feats: dict, keys: List[List[int]]) -> List[float]:
+    """p_real per clip from already embedded frames (GRU head only)."""
+    model, _ = video_models.get()
+    MODEL_BATCH_SIZE.labels(model="video").observe(len(keys))
+    with video_stage("classify"):
+        logits = classify_features(model, feats, keys).view(-1)
+        return torch.sigmoid(logits).cpu().tolist()
+
+def keyframe_hashes_for(temp_path: Path) -> list:
+    with video_stage("near_dup"):
+        return video_keyframe_hashes(temp_path)
+
+async def score_clips(clips: torch.Tensor, keys: List[List[int]], digest: Optional[str] = None) -> List[float]:
+    """
+    predict_clips() on the inference pool. The backbone runs
+    VIDEO_EMBED_CHUNK_FRAMES frames per pool task, so a long video batch
+    never holds the pool for more than one chunk at a time.
+    """
+    model, _ = video_models.get()
+    if VIDEO_EMBED_CHUNK_FRAMES <= 0 or not supports_stages(model):
+        return await inference_pool(VIDEO_PRIORITY).run(predict_clips, clips, keys, digest)
+
+    feats, missing = cached_features(keys, digest, embedding_cache)
+    for i in range(0, len(missing), VIDEO_EMBED_CHUNK_FRAMES):
+        feats.update(await inference_pool(VIDEO_PRIORITY).run(
+            embed_chunk, clips, keys, missing[i : i + VIDEO_EMBED_CHUNK_FRAMES], digest
+        ))
+    return await inference_pool(VIDEO_PRIORITY).run(classify_embedded, feats, keys)
+
+# -----------------------------------------------------------
+# DECISION LOGIC
+# -----------------------------------------------------------
+def build_video_response(
+    prob_fake: float,
+    processing_time: float,
+    near_duplicate_distance: Optional[float] = None,
+    progressive: bool = False,
+    passes_used: Optional[int] = None,
+    frames_used: Optional[int] = None,
+) -> VideoResponse:
+    verdict, confidence, message = video_verdict(prob_fake)
+
+    return VideoResponse(
+        verdict=verdict,
+        confidence=round(confidence * 100.0, 2),
+        message=message,
+        processing_time=processing_time,
+        near_duplicate=near_duplicate_distance is not None,
+        near_duplicate_distance=near_duplicate_distance,
+        progressive=progressive,
+        passes_used=passes_used,
+        frames_used=frames_used,
+    )
+
+# -----------------------------------------------------------
+# ENDPOINT
+# -----------------------------------------------------------
+async def score_full(temp_path: Path, mtcnn, digest: Optional[str] = None):
+    """(prob_fake, passes, frames) averaged over all N_PASSES samplings."""
+    # All N_PASSES jittered samplings (P, T, C, H, W) using same logic as
+    # training; frames shared between passes are decoded once and all
+    # of them go through MTCNN in batches (extract_faces)
+    clips, keys = await cpu_pool(VIDEO_PRIORITY).run(
+        load_video_clips_face_only,
+        temp_path,
+        FRAMES_PER_VIDEO,
+        N_PASSES,
+        mtcnn,
+        track=VIDEO_FACE_TRACKING,
+        return_keys=True,
+        stage=video_stage,
+    )
 
-    # Save temporary video file
-    video_bytes = await file.read()
-    temp_filename = f"temp_{uuid.uuid4().hex}.mp4"
-    temp_path = BASE_DIR / temp_filename
+    # One forward over every pass
+    p_real_list = await score_clips(clips, keys, digest)
+    prob_fake_list = [1.0 - p_real for p_real in p_real_list]
 
-    with open(temp_path, "wb") as f:
-        f.write(video_bytes)
+    # Average probabilities over passes
+    prob_fake = float(sum(prob_fake_list) / len(prob_fake_list))
+    return prob_fake, len(prob_fake_list), len(prob_fake_list) * FRAMES_PER_VIDEO
 
+async def score_progressive(temp_path: Path, mtcnn, digest: Optional[str] = None):
+    """(prob_fake, passes, frames) from one pass at a time until confident."""
+    clips = iter_video_clips(
+        temp_path, FRAMES_PER_VIDEO, VIDEO_PROGRESSIVE_MAX_PASSES, mtcnn,
+        track=VIDEO_FACE_TRACKING, return_keys=True, stage=video_stage,
+    )
+    estimate = ProgressiveEstimate(DEEPFAKE_THRESHOLD, UNCERTAIN_BAND)
+    full_clips, full_keys = [], []
     try:
-        prob_real_list = []
-        prob_fake_list = []
+        while True:
+            step = await cpu_pool(VIDEO_PRIORITY).run(next, clips, None)
+            if step is None:
+                break
+            clip, face_clip, face_frames, keys, face_keys = step
+            full_clips.append(clip)
+            full_keys.append(keys)
+            if face_clip is None:
+                estimate.add(None, 0)  # no face in this sampling: does not count
+                continue
+            p_real = (await score_clips(face_clip.unsqueeze(0), [face_keys], digest))[0]
+            estimate.add(1.0 - p_real, face_frames)
+            if estimate.confident():
+                break
+    finally:
+        try:
+            clips.close()  # releases the capture
+        except ValueError:
+            pass  # still running on a worker after cancellation; released when collected
+
+    if estimate.passes == 0:
+        # No face anywhere: score the full-frame clips like the full run does
+        p_real_list = await score_clips(torch.stack(full_clips), full_keys, digest)
+        prob_fake = float(sum(1.0 - p for p in p_real_list) / len(p_real_list))
+        return prob_fake, len(p_real_list), len(p_real_list) * FRAMES_PER_VIDEO
+    return estimate.prob_fake, estimate.passes, estimate.frames
+
+async def analyse_video(temp_path: Path, progressive: bool = False, digest: Optional[str] = None) -> dict:
+    """
+    Full analysis of one staged video file; returns the response as a dict.
+    digest (the upload's SHA-256) lets it reuse cached frame embeddings.
+    """
+    start = time.time()
 
-        for _ in range(N_PASSES):
-            # Extract frames (T, C, H, W) using same logic as training
-            frames = load_video_frames_face_only(
-                temp_path,
-                FRAMES_PER_VIDEO,
-                mtcnn,
-                frame_transform,
-            )
+    # Waits for startup if the models are still loading
+    try:
+        _, mtcnn = await video_models.wait()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {str(e)}")
 
-            # Add batch dimension -> (1, T, C, H, W)
-            frames = frames.unsqueeze(0).to(device)
+    # Scores are only shared between full analyses: a progressive result
+    # must say how many passes it used, and a full one must not be cut short
+    use_near_dup = near_dup_index is not None and not progressive
 
-            with torch.no_grad():
-                logits = model(frames)
-                logit = logits.squeeze().item()
+    try:
+        # Near-identical video seen before → reuse its score, skip the model
+        keyframe_hashes = []
+        if use_near_dup:
+            keyframe_hashes = await cpu_pool(VIDEO_PRIORITY).run(keyframe_hashes_for, temp_path)
+            match = near_dup_index.lookup(keyframe_hashes)
+            if match is not None:
+                prob_fake, distance = match
+                return jsonable_encoder(build_video_response(
+                    prob_fake,
+                    round(time.time() - start, 2),
+                    near_duplicate_distance=round(distance, 2),
+                ))
+
+        score = score_progressive if progressive else score_full
+        prob_fake, passes_used, frames_used = await score(temp_path, mtcnn, digest)
+
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-                # Training convention: 1 = real, 0 = fake
-                p_real = torch.sigmoid(torch.tensor(logit)).item()
-                p_fake = 1.0 - p_real
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=(
+                f"Error processing video: {str(e)}. {VIDEO_ERROR_HINT}"
+            ),
+        )
 
-            prob_real_list.append(p_real)
-            prob_fake_list.append(p_fake)
+    if use_near_dup:
+        near_dup_index.add(keyframe_hashes, prob_fake)
 
-        # Average probabilities over passes
-        prob_real = float(sum(prob_real_list) / len(prob_real_list))
-        prob_fake = float(sum(prob_fake_list) / len(prob_fake_list))
+    processing_time = round(time.time() - start, 2)
+    return jsonable_encoder(build_video_response(
+        prob_fake,
+        processing_time,
+        progressive=progressive,
+        passes_used=passes_used,
+        frames_used=frames_used,
+    ))
+
+def _take(iterator, n: int) -> list:
+    return list(itertools.islice(iterator, n))
+
+async def analyse_video_timeline(temp_path: Path, digest: Optional[str] = None) -> dict:
+    """Score every window of the video (see timeline.py); returns the response as a dict."""
+    start = time.time()
+    try:
+        _, mtcnn = await video_models.wait()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model unavailable: {str(e)}")
+
+    windows = iter_video_windows(
+        temp_path,
+        VIDEO_TIMELINE_WINDOW_S,
+        FRAMES_PER_VIDEO,
+        mtcnn,
+        VIDEO_TIMELINE_CHUNK_FRAMES,
+        VIDEO_FACE_TRACKING,
+        return_keys=True,
+        stage=video_stage,
+    )
+    segments = []
+    pending = None
+    try:
+        # Decode + crop the next batch of windows while the model scores this one
+        pending = asyncio.ensure_future(cpu_pool(VIDEO_PRIORITY).run(_take, windows, VIDEO_TIMELINE_BATCH))
+        while pending is not None:
+            batch = await pending
+            pending = None
+            if not batch:
+                break
+            if len(batch) == VIDEO_TIMELINE_BATCH:
+                pending = asyncio.ensure_future(cpu_pool(VIDEO_PRIORITY).run(_take, windows, VIDEO_TIMELINE_BATCH))
+            # Overlapping windows share frames: each is embedded once
+            p_real_list = await score_clips(torch.stack([w[3] for w in batch]), [w[4] for w in batch], digest)
+            for (first, last, fps, _, _), p_real in zip(batch, p_real_list):
+                segments.append(segment(first, last, fps, 1.0 - p_real))
+
+    except PoolSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=(
-                f"Error processing video: {str(e)}. "
-                "Check that the video contains clear faces, "
-                "uses a supported codec, and is not corrupt."
+                f"Error processing video: {str(e)}. {VIDEO_ERROR_HINT}"
             ),
         )
 
     finally:
-        # Clean up temp file
+        if pending is not None:
+            pending.cancel()
         try:
-            temp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+            windows.close()  # releases the capture
+        except ValueError:
+            pass  # still running on a worker after cancellation; released when collected
+
+    prob_fake = max(s["prob_fake"] for s in segments)
+    response = build_video_response(prob_fake, round(time.time() - start, 2))
+    return jsonable_encoder(VideoTimelineResponse(
+        **response.dict(),
+        duration_s=segments[-1]["end_s"],
+        window_s=VIDEO_TIMELINE_WINDOW_S,
+        segments=segments,
+        suspicious_intervals=suspicious_intervals(segments, TIMELINE_SUSPICIOUS_THRESHOLD),
+    ))
+
+async def analyse_video_mode(temp_path: Path, mode: str, digest: Optional[str] = None) -> dict:
+    """mode: "full" (N_PASSES clips), "progressive" (early exit) or "timeline"."""
+    if mode == "timeline":
+        return await analyse_video_timeline(temp_path, digest)
+    return await analyse_video(temp_path, mode == "progressive", digest)
+
+async def analyse_staged_video(temp_path: Path, mode: str = "full", digest: Optional[str] = None) -> dict:
+    """analyse_video_mode() that deletes the file afterwards (it owns the upload)."""
+    try:
+        return await analyse_video_mode(temp_path, mode, digest)
+    finally:
+        remove_quietly(temp_path)
+
+def video_cache_key(digest: str, mode: str) -> str:
+    # Each mode answers differently for the same upload; never mix them
+    return result_cache.key_for(digest if mode == "full" else f"{digest}:{mode}")
+
+def request_mode(progressive: Optional[bool]) -> str:
+    if progressive is None:
+        progressive = VIDEO_PROGRESSIVE
+    return "progressive" if progressive else "full"
+
+# Same multipart "file" field as before; declared by hand because the body
+# is streamed by staged_upload() instead of being parsed by FastAPI
+VIDEO_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    }
+}
 
-    processing_time = round(time.time() - start, 2)
+async def detect_staged_video(request: Request, mode: str) -> dict:
+    start = time.time()
 
-    # Decision logic with threshold + uncertain zone
-    if prob_fake >= DEEPFAKE_THRESHOLD:
-        verdict = "deepfake"
-        confidence = prob_fake
-        message = "Video likely manipulated (deepfake)."
-    elif abs(prob_fake - 0.5) <= UNCERTAIN_BAND:
-        # In the "uncertain" zone around 0.5 → favor real, but warn
-        verdict = "real"
-        confidence = prob_real
-        message = "Video appears real, but the model is not very confident."
-    else:
-        verdict = "real"
-        confidence = prob_real
-        message = "Video appears authentic."
+    # Streamed to UPLOAD_SCRATCH_DIR and hashed chunk by chunk, never in memory
+    async with staged_upload(
+        request,
+        VIDEO_MAX_UPLOAD_BYTES,
+        accept=("video/",),
+        suffix=".mp4",
+        type_error="Please upload a valid video file.",
+    ) as upload:
+        STAGE_SECONDS.labels(service="video", stage="upload").observe(time.time() - start)
+        # Identical uploads share one cached / in-flight analysis. The
+        # analysis may outlive this request (other callers can be waiting on
+        # it), so it takes over the file and deletes it itself.
+        result, source = await result_cache.get_or_compute(
+            video_cache_key(upload.digest, mode),
+            lambda: analyse_staged_video(upload.detach(), mode, upload.digest),
+        )
 
-    return VideoResponse(
-        verdict=verdict,
-        confidence=round(confidence * 100.0, 2),
-        message=message,
-        processing_time=processing_time,
-    )
+    if source != "miss":
+        # Shared result: copy before reporting this request's own timing
+        result = copy.deepcopy(result)
+        result["processing_time"] = round(time.time() - start, 2)
+    return result
+
+@app.post("/detect/video", response_model=VideoResponse, openapi_extra=VIDEO_UPLOAD_OPENAPI)
+async def detect_video(request: Request, response: Response, progressive: Optional[bool] = None):
+    """?progressive=true|false overrides VIDEO_PROGRESSIVE for this request."""
+    async with track_request("video", "/detect/video") as req, \
+            profile_capture(request, response, "video", "/detect/video"):
+        result = await detect_staged_video(request, request_mode(progressive))
+        req.verdict = result["verdict"]
+        return result
+
+@app.post("/detect/video/timeline", response_model=VideoTimelineResponse, openapi_extra=VIDEO_UPLOAD_OPENAPI)
+async def detect_video_timeline(request: Request, response: Response):
+    """Long videos: prob_fake per VIDEO_TIMELINE_WINDOW_S window plus the most suspicious intervals."""
+    async with track_request("video", "/detect/video/timeline") as req, \
+            profile_capture(request, response, "video", "/detect/video/timeline"):
+        result = await detect_staged_video(request, "timeline")
+        req.verdict = result["verdict"]
+        return result
+
+# -----------------------------------------------------------
+# JOBS (submit now, poll for the result)
+# -----------------------------------------------------------
+async def run_video_job(job: dict) -> dict:
+    """Job handler: the same cached analysis as /detect/video."""
+    params = job["params"]
+    mode = params.get("mode") or request_mode(params["progressive"])
+    async with track_request("video", "job") as req:
+        result, _ = await result_cache.get_or_compute(
+            video_cache_key(params["digest"], mode),
+            lambda: analyse_video_mode(Path(job["input_path"]), mode, params["digest"]),
+        )
+        req.verdict = result["verdict"]
+        return result
+
+video_jobs = JobQueue(
+    "video",
+    JobStore(JOB_DIR / "video_jobs.sqlite3"),
+    run_video_job,
+    workers=VIDEO_JOB_WORKERS,
+    max_queued=VIDEO_JOB_MAX_QUEUED,
+)
+
+@app.post("/jobs/video", status_code=202, openapi_extra=VIDEO_UPLOAD_OPENAPI)
+async def submit_video_job(request: Request, progressive: Optional[bool] = None, timeline: bool = False):
+    """Queue a video for analysis and return its job id immediately (?timeline=true for a timeline)."""
+    mode = "timeline" if timeline else request_mode(progressive)
+
+    async with staged_upload(
+        request,
+        VIDEO_MAX_UPLOAD_BYTES,
+        accept=("video/",),
+        suffix=".mp4",
+        type_error="Please upload a valid video file.",
+        directory=VIDEO_JOB_FILES_DIR,
+    ) as upload:
+        # Same directory, so this is a rename; the job now owns the file
+        input_path = VIDEO_JOB_FILES_DIR / f"job_{uuid.uuid4().hex}.mp4"
+        os.replace(upload.detach(), input_path)
+
+    try:
+        job = await video_jobs.submit(input_path, {"digest": upload.digest, "progressive": mode == "progressive", "mode": mode})
+    except JobQueueFullError as e:
+        remove_quietly(input_path)
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**public_view(job), "status_url": f"/jobs/video/{job['job_id']}"}
+
+@app.get("/jobs/video/{job_id}")
+async def get_video_job(job_id: str, wait: float = Query(0.0, ge=0.0)):
+    """Job status and, once done, its result. ?wait=S long-polls up to VIDEO_JOB_MAX_WAIT_S."""
+    if wait > 0:
+        job = await video_jobs.wait(job_id, min(wait, VIDEO_JOB_MAX_WAIT_S))
+    else:
+        job = await video_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return public_view(job)
 
 # -----------------------------------------------------------
 # HEALTH CHECK
 # -----------------------------------------------------------
+@app.get("/ready_video")
+def ready_video():
+    """Readiness probe: 200 only once the model is loaded and warmed up."""
+    video_models.start()
+    status = video_models.status()
+    if not video_models.ready:
+        raise HTTPException(status_code=503, detail=status)
+    return {"ready": True, **status}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (metrics.py)."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+# /admin/profile: on-demand request profiling (profiling.py, off by default)
+add_profiling_routes(app)
+
 @app.get("/health_video")
 def health_video():
     return {
         "status": "ok",
-        "model_loaded": True,
+        "model_loaded": video_models.ready,
         "device": str(device),
         "frames_per_video": FRAMES_PER_VIDEO,
         "img_size": IMG_SIZE,
         "model_path": str(MODEL_PATH),
+        "max_upload_bytes": VIDEO_MAX_UPLOAD_BYTES,
+        "runtime": describe_runtime(video_models.get()[0]) if video_models.ready else None,
+        "startup": video_models.status(),
         "n_passes": N_PASSES,
+        "face_tracking": VIDEO_FACE_TRACKING,
+        "progressive": {
+            "default": VIDEO_PROGRESSIVE,
+            "max_passes": VIDEO_PROGRESSIVE_MAX_PASSES,
+            "min_passes": EARLY_EXIT_MIN_PASSES,
+            "margin": EARLY_EXIT_MARGIN,
+            "z": EARLY_EXIT_Z,
+        },
+        "timeline": {
+            "window_s": VIDEO_TIMELINE_WINDOW_S,
+            "batch": VIDEO_TIMELINE_BATCH,
+            "chunk_frames": VIDEO_TIMELINE_CHUNK_FRAMES,
+            "top_k": VIDEO_TIMELINE_TOP_K,
+            "suspicious_threshold": TIMELINE_SUSPICIOUS_THRESHOLD,
+        },
         "deepfake_threshold": DEEPFAKE_THRESHOLD,
         "uncertain_band": UNCERTAIN_BAND,
+        "executors": executor_stats(),
+        "topology": topology_status(),
+        "result_cache": result_cache.stats(),
+        "embedding_cache": embedding_cache.stats() if embedding_cache else {"enabled": False},
+        "embed_chunk_frames": VIDEO_EMBED_CHUNK_FRAMES,
+        "jobs": video_jobs.stats(),
+        "near_duplicate": near_dup_index.stats() if near_dup_index else {"enabled": False},
     }
 
 # -----------------------------------------------------------
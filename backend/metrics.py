@@ -0,0 +1,208 @@
+"""
+Prometheus metrics for the image and video services (prometheus_client),
+served on GET /metrics by both services. In the single-process server both
+services share one registry.
+
+    detectify_stage_seconds{service,stage}             per-stage latency
+    detectify_requests_total{service,endpoint,verdict} finished requests
+    detectify_errors_total{service,endpoint,status}    failed requests
+    detectify_in_flight_requests{service,endpoint}
+    detectify_request_seconds{service,endpoint}        end-to-end latency
+    detectify_model_batch_size{model}                  items per model call
+    detectify_request_rss_bytes{service,endpoint}      process RSS when a request ends
+    detectify_request_peak_rss_growth_bytes{...}       how far a request raised the
+                                                       process's peak RSS
+    detectify_pool_wait_seconds{pool,priority}         executor queueing (executors.py)
+    detectify_process_rss_bytes                        RSS (summed over workers)
+    detectify_process_peak_rss_bytes                   peak RSS (largest worker)
+
+With several uvicorn workers (WEB_CONCURRENCY > 1, see topology.py) each
+scrape reaches one random worker, so set PROMETHEUS_MULTIPROC_DIR to an
+empty directory shared by the workers (wipe it before every server start):
+every worker then writes its samples there and /metrics on any worker
+aggregates all of them (prometheus_client multiprocess mode). Files of
+workers that have exited are cleaned up when a worker starts.
+
+Stages are timed where the work runs, so queueing for a pool worker shows
+up in detectify_pool_wait_seconds and not in the stage itself:
+
+    image_stage = stage_timer("image")
+    with image_stage("decode"):
+        ...
+
+    async with track_request("image", "/detect/image") as req:
+        result = ...
+        req.verdict = result["verdict"]
+
+Peak RSS cannot be attributed exactly when requests overlap; the growth
+histogram shows which requests push the process's high-water mark up.
+"""
+
+import asyncio
+import os
+import re
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from model_loader import process_memory
+from uploads import pid_alive
+
+# -------------------
+# CONFIG
+# -------------------
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+MEMORY_BUCKETS = tuple(float(2 ** n) * 1024 * 1024 for n in range(4, 15))  # 16 MB .. 16 GB
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+if not PROMETHEUS_MULTIPROC_DIR and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+    print("⚠️ WEB_CONCURRENCY > 1 without PROMETHEUS_MULTIPROC_DIR: /metrics shows one random worker per scrape")
+
+
+# -------------------
+# METRICS
+# -------------------
+STAGE_SECONDS = Histogram(
+    "detectify_stage_seconds", "Time spent in one processing stage.", ("service", "stage"),
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "detectify_request_seconds", "End-to-end request latency.", ("service", "endpoint"),
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "detectify_requests_total", "Requests that returned a verdict.", ("service", "endpoint", "verdict")
+)
+ERRORS = Counter(
+    "detectify_errors_total", "Requests that failed, by HTTP status (499 = client went away).",
+    ("service", "endpoint", "status"),
+)
+IN_FLIGHT = Gauge(
+    "detectify_in_flight_requests", "Requests currently being processed.", ("service", "endpoint"),
+    multiprocess_mode="livesum",
+)
+MODEL_BATCH_SIZE = Histogram(
+    "detectify_model_batch_size", "Items per model call (images, clips or frames).", ("model",),
+    buckets=BATCH_BUCKETS,
+)
+REQUEST_RSS = Histogram(
+    "detectify_request_rss_bytes", "Process resident set size when a request finished.",
+    ("service", "endpoint"), buckets=MEMORY_BUCKETS,
+)
+REQUEST_PEAK_RSS_GROWTH = Histogram(
+    "detectify_request_peak_rss_growth_bytes", "Increase of the process's peak RSS during a request.",
+    ("service", "endpoint"), buckets=(0,) + MEMORY_BUCKETS,
+)
+POOL_WAIT = Histogram(
+    "detectify_pool_wait_seconds", "Time tasks waited for an executor worker.", ("pool", "priority"),
+    buckets=LATENCY_BUCKETS,
+)
+PROCESS_RSS = Gauge(
+    "detectify_process_rss_bytes", "Process resident set size (summed over workers).",
+    multiprocess_mode="livesum",
+)
+PROCESS_PEAK_RSS = Gauge(
+    "detectify_process_peak_rss_bytes", "Peak process resident set size (largest worker).",
+    multiprocess_mode="livemax",
+)
+
+
+def _memory_bytes() -> Dict[str, float]:
+    """{"rss", "peak"} in bytes (either may be missing on this platform)."""
+    names = {"rss_mb": "rss", "peak_rss_mb": "peak"}
+    return {names[k]: v * 1024 * 1024 for k, v in process_memory().items()}
+
+
+def _update_memory_gauges(memory: Dict[str, float]):
+    if "rss" in memory:
+        PROCESS_RSS.set(memory["rss"])
+    if "peak" in memory:
+        PROCESS_PEAK_RSS.set(memory["peak"])
+
+
+def _reap_dead_workers():
+    """Drop the live-gauge files of workers that exited without cleaning up."""
+    pids = set()
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        match = re.search(r"_(\d+)\.db$", name)
+        if match:
+            pids.add(int(match.group(1)))
+    for pid in pids:
+        if pid != os.getpid() and not pid_alive(pid):
+            multiprocess.mark_process_dead(pid, PROMETHEUS_MULTIPROC_DIR)
+
+
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    _reap_dead_workers()
+
+
+def render() -> bytes:
+    """Every metric in the Prometheus text format (all workers in multiprocess mode)."""
+    _update_memory_gauges(_memory_bytes())
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, PROMETHEUS_MULTIPROC_DIR)
+    return generate_latest(registry)
+
+
+# -------------------
+# HELPERS
+# -------------------
+def stage_timer(service: str) -> Callable:
+    """stage(name): context manager recording the wrapped block as one stage."""
+    @contextmanager
+    def stage(name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.labels(service=service, stage=name).observe(time.perf_counter() - start)
+
+    return stage
+
+
+class RequestOutcome:
+    verdict: Optional[str] = None
+
+
+@asynccontextmanager
+async def track_request(service: str, endpoint: str):
+    """In-flight gauge, latency, verdict / error counters and RSS for one request."""
+    labels = {"service": service, "endpoint": endpoint}
+    outcome = RequestOutcome()
+    peak_before = _memory_bytes().get("peak", 0.0)
+    start = time.perf_counter()
+    IN_FLIGHT.labels(**labels).inc()
+    try:
+        yield outcome
+    except BaseException as e:
+        status = getattr(e, "status_code", None) or (499 if isinstance(e, asyncio.CancelledError) else 500)
+        ERRORS.labels(status=str(status), **labels).inc()
+        raise
+    else:
+        REQUESTS.labels(verdict=outcome.verdict or "none", **labels).inc()
+    finally:
+        IN_FLIGHT.labels(**labels).dec()
+        REQUEST_SECONDS.labels(**labels).observe(time.perf_counter() - start)
+        memory = _memory_bytes()
+        if "rss" in memory:
+            REQUEST_RSS.labels(**labels).observe(memory["rss"])
+        REQUEST_PEAK_RSS_GROWTH.labels(**labels).observe(max(0.0, memory.get("peak", 0.0) - peak_before))
+        _update_memory_gauges(memory)
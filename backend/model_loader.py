@@ -0,0 +1,196 @@
+"""
+Lazy, measured model startup.
+
+Importing a service no longer loads its model. A ModelLoader builds it in a
+background thread (started when the app starts, or on the first request,
+whichever comes first), records how long each stage took and runs a few
+warm-up forwards before reporting ready. Requests that arrive earlier simply
+wait for the load to finish; the /ready endpoints report 503 until then so
+orchestrators only route traffic to warm replicas.
+
+Checkpoints are loaded into an architecture built without pretrained
+weights. Where PyTorch supports it the architecture is even built on the
+"meta" device, so no memory is allocated or randomly initialised for weights
+that the checkpoint overwrites straight away.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import torch
+import torch.nn as nn
+
+# -------------------
+# CONFIG
+# -------------------
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "1") == "1"     # 0 = load on first request
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", "2"))
+
+# load_state_dict(assign=True) is needed to materialise meta-device modules
+_SUPPORTS_ASSIGN = "assign" in inspect.signature(nn.Module.load_state_dict).parameters
+
+# Every ModelLoader by name, so a process hosting several services
+# (server.py) can start, probe and report all of its models together
+MODEL_REGISTRY: Dict[str, "ModelLoader"] = {}
+
+
+class ModelLoader:
+    """
+    load(stage) builds and returns the model; warmup(model, stage) is
+    optional. Both receive stage(name), a context manager that records the
+    duration of the wrapped block under `name`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable,
+        warmup: Optional[Callable] = None,
+        warmup_runs: int = MODEL_WARMUP_RUNS,
+    ):
+        self.name = name
+        self._load = load
+        self._warmup = warmup
+        self.warmup_runs = warmup_runs
+        self.timings_ms: Dict[str, float] = {}
+        self._future: Future = Future()
+        self._started = False
+        self._lock = threading.Lock()
+        MODEL_REGISTRY[name] = self
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings_ms[name] = round(1000.0 * (time.perf_counter() - start), 1)
+
+    def start(self):
+        """Begin loading in a background thread (idempotent)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name=f"{self.name}-loader", daemon=True).start()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            model = self._load(self.stage)
+            if self._warmup is not None:
+                with self.stage("warmup"):
+                    for _ in range(self.warmup_runs):
+                        self._warmup(model)
+        except BaseException as e:
+            print(f"❌ {self.name} failed to load: {e}")
+            self._future.set_exception(e)
+            return
+        self.timings_ms["total"] = round(1000.0 * (time.perf_counter() - start), 1)
+        print(f"✅ {self.name} ready in {self.timings_ms['total']:.0f} ms {self.timings_ms}")
+        self._future.set_result(model)
+
+    @property
+    def ready(self) -> bool:
+        return self._future.done() and self._future.exception() is None
+
+    @property
+    def failed(self) -> bool:
+        return self._future.done() and self._future.exception() is not None
+
+    def get(self, timeout: Optional[float] = None):
+        """Block until the model is ready (from a worker thread)."""
+        self.start()
+        return self._future.result(timeout)
+
+    async def wait(self):
+        """Await the model without blocking the event loop."""
+        self.start()
+        return await asyncio.wrap_future(self._future)
+
+    def status(self) -> dict:
+        if self.ready:
+            state = "ready"
+        elif self.failed:
+            state = "failed"
+        elif self._started:
+            state = "loading"
+        else:
+            state = "idle"
+        info = {"state": state, "timings_ms": dict(self.timings_ms)}
+        if self.failed:
+            info["error"] = str(self._future.exception())
+        return info
+
+
+def registry_status() -> Dict[str, dict]:
+    return {name: loader.status() for name, loader in MODEL_REGISTRY.items()}
+
+
+def process_memory() -> Dict[str, float]:
+    """Resident set size of this process now and at its peak, in MB."""
+    info = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    info["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith("VmHWM:"):
+                    info["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        import resource
+        import sys
+
+        # ru_maxrss is in bytes on macOS, KB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        info["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return info
+
+
+def load_checkpoint_model(
+    build: Callable[[], nn.Module],
+    checkpoint_path,
+    device: torch.device,
+    stage=None,
+) -> nn.Module:
+    """
+    Build an architecture (without pretrained weights) and load a fine-tuned
+    state dict into it, timing each step when a ModelLoader stage is given.
+    """
+    if stage is None:
+        stage = lambda name: _null_stage()
+
+    use_meta = _SUPPORTS_ASSIGN
+    with stage("construct"):
+        if use_meta:
+            with torch.device("meta"):
+                model = build()
+        else:
+            model = build()
+
+    with stage("read_checkpoint"):
+        state_dict = torch.load(checkpoint_path, map_location=device)
+
+    with stage("load_state_dict"):
+        if use_meta:
+            model.load_state_dict(state_dict, assign=True)
+            # Tensors the checkpoint does not cover (non-persistent buffers)
+            # would stay on meta; rebuild normally in that rare case.
+            if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+                model = build()
+                model.load_state_dict(state_dict)
+        else:
+            model.load_state_dict(state_dict)
+
+    return model.to(device).eval()
+
+
+@contextmanager
+def _null_stage():
+    yield
@@ -0,0 +1,255 @@
+"""
+Perceptual-hash index for near-duplicate uploads.
+
+Re-compressed, resized or lightly edited copies of the same media have
+different bytes (so the result cache misses) but nearly identical perceptual
+hashes. Each item is described by one or more 64-bit pHashes (one for an
+image, a few fixed-position keyframes for a video) and stored in a
+multi-index hash table: every hash is split into 3 chunks of ~21 bits, each
+chunk indexes its own table, and by the pigeonhole principle any hash within
+Hamming distance r of the query shares at least one chunk within r // 3 of
+the query's. Lookups therefore only probe a handful of small buckets, which
+keeps them well under a millisecond even with millions of entries.
+
+Off by default (NEAR_DUP_ENABLED=1 turns it on): a global pHash barely moves
+when only a face is swapped, so a face-swapped copy of media already judged
+authentic would inherit that verdict without the model ever seeing it. Only
+enable it where uploads are known re-encodes of each other (e.g. replaying a
+moderation backlog).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# -------------------
+# CONFIG
+# -------------------
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "0") == "1"  # see the module docstring
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "6"))  # bits out of 64
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "1000000"))
+NEAR_DUP_VIDEO_KEYFRAMES = int(os.getenv("NEAR_DUP_VIDEO_KEYFRAMES", "5"))
+
+HASH_BITS = 64
+
+
+# -------------------
+# PERCEPTUAL HASHES
+# -------------------
+def _gray(img_bgr: np.ndarray) -> np.ndarray:
+    if img_bgr.ndim == 2:
+        return img_bgr
+    return cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for b in bits.ravel():
+        value = (value << 1) | int(b)
+    return value
+
+
+def phash(img_bgr: np.ndarray) -> int:
+    """64-bit DCT hash: low-frequency 8x8 DCT block compared to its median."""
+    small = cv2.resize(_gray(img_bgr), (32, 32), interpolation=cv2.INTER_AREA)
+    dct = cv2.dct(small.astype(np.float32))[:8, :8]
+    return _bits_to_int(dct > np.median(dct))
+
+
+def video_keyframe_hashes(video_path, num_keyframes: int = NEAR_DUP_VIDEO_KEYFRAMES) -> List[int]:
+    """pHashes of frames at fixed relative positions (robust to fps/length re-encodes)."""
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        return []
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total <= 0:
+            return []
+        hashes = []
+        for i in range(num_keyframes):
+            idx = int((i + 0.5) / num_keyframes * (total - 1))
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if not ret:
+                return []
+            hashes.append(phash(frame))
+        return hashes
+    finally:
+        cap.release()
+
+
+if hasattr(int, "bit_count"):
+    def hamming(a: int, b: int) -> int:
+        return (a ^ b).bit_count()
+else:
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+
+# -------------------
+# MULTI-INDEX HASHING
+# -------------------
+class MultiIndexHash:
+    """
+    Set of fixed-width hashes supporting Hamming-radius search. Each hash is
+    split into near-equal chunks; chunks of ~21 bits (3 per 64-bit hash) keep
+    buckets nearly empty at millions of entries while a radius-6 query only
+    probes radius 2 per chunk.
+    """
+
+    def __init__(self, bits: int = HASH_BITS, num_chunks: int = 3):
+        base, extra = divmod(bits, num_chunks)
+        self.widths = [base + (1 if i < extra else 0) for i in range(num_chunks)]
+        self.shifts = [sum(self.widths[:i]) for i in range(num_chunks)]
+        self.num_chunks = num_chunks
+        # chunk value -> hash, or list of hashes once a bucket is shared
+        self._tables: List[dict] = [{} for _ in range(num_chunks)]
+        self._flips: Dict[Tuple[int, int], List[int]] = {}
+
+    def _chunks(self, h: int) -> List[int]:
+        return [(h >> s) & ((1 << w) - 1) for s, w in zip(self.shifts, self.widths)]
+
+    def _flip_masks(self, width: int, radius: int) -> List[int]:
+        # All width-bit masks with at most `radius` bits set
+        key = (width, radius)
+        if key not in self._flips:
+            masks = [0]
+            for r in range(1, radius + 1):
+                for pos in combinations(range(width), r):
+                    m = 0
+                    for p in pos:
+                        m |= 1 << p
+                    masks.append(m)
+            self._flips[key] = masks
+        return self._flips[key]
+
+    def add(self, h: int):
+        for table, c in zip(self._tables, self._chunks(h)):
+            bucket = table.get(c)
+            if bucket is None:
+                table[c] = h
+            elif isinstance(bucket, list):
+                bucket.append(h)
+            else:
+                table[c] = [bucket, h]
+
+    def remove(self, h: int):
+        for table, c in zip(self._tables, self._chunks(h)):
+            bucket = table.get(c)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                if h in bucket:
+                    bucket.remove(h)
+                if len(bucket) == 1:
+                    table[c] = bucket[0]
+            elif bucket == h:
+                del table[c]
+
+    def search(self, h: int, radius: int) -> List[int]:
+        """All stored hashes within Hamming distance `radius` of h."""
+        chunk_radius = radius // self.num_chunks
+        found = set()
+        for table, c, w in zip(self._tables, self._chunks(h), self.widths):
+            probes = {c ^ m for m in self._flip_masks(w, chunk_radius)}
+            # Set intersection runs in C and iterates over the smaller side
+            for key in table.keys() & probes:
+                bucket = table[key]
+                if isinstance(bucket, list):
+                    found.update(bucket)
+                else:
+                    found.add(bucket)
+        return [x for x in found if hamming(x, h) <= radius]
+
+
+class NearDuplicateIndex:
+    """
+    Maps perceptual signatures (a fixed-length tuple of hashes) to a stored
+    payload. The oldest entries are evicted once max_entries is reached.
+    """
+
+    def __init__(self, max_distance: int = NEAR_DUP_MAX_DISTANCE, max_entries: int = NEAR_DUP_MAX_ENTRIES):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._mih = MultiIndexHash()
+        self._items: "OrderedDict[int, Tuple[Tuple[int, ...], Any]]" = OrderedDict()
+        self._refs: Dict[int, List[int]] = {}  # hash -> ids of items containing it
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.matches = 0
+
+    def lookup(self, hashes: Sequence[int]) -> Optional[Tuple[Any, float]]:
+        """
+        Return (payload, distance) of the closest stored item whose mean
+        per-hash Hamming distance is <= max_distance, else None.
+        """
+        if not hashes:
+            return None
+        hashes = tuple(hashes)
+        with self._lock:
+            self.lookups += 1
+
+            # An item within mean distance r has at least one hash within r
+            candidates = set()
+            for q in hashes:
+                for h in self._mih.search(q, self.max_distance):
+                    candidates.update(self._refs[h])
+
+            best = None
+            for item_id in candidates:
+                stored, payload = self._items[item_id]
+                if len(stored) != len(hashes):
+                    continue
+                dist = sum(hamming(a, b) for a, b in zip(stored, hashes)) / len(hashes)
+                if dist <= self.max_distance and (best is None or dist < best[1]):
+                    best = (payload, dist)
+
+            if best is not None:
+                self.matches += 1
+            return best
+
+    def add(self, hashes: Sequence[int], payload: Any):
+        if not hashes:
+            return
+        hashes = tuple(hashes)
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+            self._items[item_id] = (hashes, payload)
+            for h in set(hashes):
+                refs = self._refs.get(h)
+                if refs is None:
+                    self._refs[h] = [item_id]
+                    self._mih.add(h)
+                else:
+                    refs.append(item_id)
+
+            while len(self._items) > self.max_entries:
+                old_id, (old_hashes, _) = self._items.popitem(last=False)
+                for h in set(old_hashes):
+                    refs = self._refs[h]
+                    refs.remove(old_id)
+                    if not refs:
+                        del self._refs[h]
+                        self._mih.remove(h)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "entries": len(self._items),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "lookups": self.lookups,
+            "matches": self.matches,
+        }
+
+
+def build_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    return NearDuplicateIndex() if NEAR_DUP_ENABLED else None
@@ -0,0 +1,316 @@
+"""
+On-demand profiling of live detection requests.
+
+Off by default (PROFILING_ENABLED=0): capture() then returns a shared no-op
+context manager and the admin routes answer 404, so leaving it compiled in
+costs one flag check per request. When enabled, a request is profiled if
+    - an admin armed the next N requests:   POST /admin/profile?requests=N[&endpoint=/detect/video]
+    - or it carries the header              X-Profile: 1
+Both, and the admin routes, need X-Profile-Token: <PROFILE_TOKEN>. Captures
+hold the stacks of whatever else the process was running, i.e. other users'
+requests, so PROFILING_ENABLED=1 without a PROFILE_TOKEN leaves profiling
+off (with a warning).
+
+A profiled request runs under
+    - torch.profiler (CPU ops on every thread, incl. the executor pools;
+      CUDA kernels too on a GPU)    -> <id>.trace.json  (chrome://tracing, Perfetto)
+    - a Python stack sampler over all threads at PROFILE_SAMPLE_HZ
+                                    -> <id>.folded      (flamegraph.pl, speedscope)
+    - a summary of both             -> <id>.txt
+in PROFILE_DIR. The response carries X-Profile-Id: <id>; GET /admin/profile
+lists the captures and GET /admin/profile/{file} downloads one.
+
+Overhead is capped: one capture at a time (requests arriving meanwhile run
+unprofiled), at most PROFILE_MAX_REQUESTS armed at once, profilers stopped
+after PROFILE_MAX_S even if the request is still running, and only the
+newest PROFILE_KEEP captures kept on disk. The profilers are process-wide,
+so other requests running at the same time show up in the capture too. A
+request answered from the result cache profiles the cache hit only.
+
+    async with capture(request, response, "image", "/detect/image"):
+        ...
+"""
+
+import asyncio
+import collections
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import Optional
+
+import torch
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+# -------------------
+# CONFIG
+# -------------------
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path(__file__).resolve().parent / "profiles"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_MAX_REQUESTS = int(os.getenv("PROFILE_MAX_REQUESTS", "20"))
+PROFILE_MAX_S = float(os.getenv("PROFILE_MAX_S", "60"))
+PROFILE_SAMPLE_HZ = float(os.getenv("PROFILE_SAMPLE_HZ", "100"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+if PROFILING_ENABLED and not PROFILE_TOKEN:
+    print("⚠️ PROFILING_ENABLED=1 without PROFILE_TOKEN: profiling stays off")
+    PROFILING_ENABLED = False
+
+ARTIFACT_SUFFIXES = (".trace.json", ".folded", ".txt")
+
+# Innermost frames of threads that are only waiting (idle pool workers, the
+# event loop in select()); those samples are dropped
+_IDLE_FRAMES = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select")}
+
+_NO_CAPTURE = nullcontext()
+
+
+# -------------------
+# STACK SAMPLER
+# -------------------
+class StackSampler:
+    """Samples every thread's Python stack at hz into folded-stack counts."""
+
+    def __init__(self, hz: float):
+        self.interval = 1.0 / max(1.0, hz)
+        self.counts: "collections.Counter[str]" = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((os.path.basename(code.co_filename), code.co_name, frame.f_lineno))
+                    frame = frame.f_back
+                if not stack or stack[0][:2] in _IDLE_FRAMES:
+                    continue
+                path = [names.get(ident, str(ident))] + [f"{fn}:{name}:{line}" for fn, name, line in reversed(stack)]
+                self.counts[";".join(path)] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+    def top_functions(self, limit: int = 30) -> list:
+        """(self samples, innermost frame) of the hottest functions."""
+        leaves: "collections.Counter[str]" = collections.Counter()
+        for stack, n in self.counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        return [(n, leaf) for leaf, n in leaves.most_common(limit)]
+
+
+# -------------------
+# CAPTURES
+# -------------------
+def _torch_profiler():
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    try:
+        # Forwards run on the inference pool, not on the thread starting the profiler
+        config = torch._C._profiler._ExperimentalConfig(profile_all_threads=True)
+        return torch.profiler.profile(activities=activities, experimental_config=config)
+    except (AttributeError, TypeError):
+        print("⚠️ torch.profiler cannot record other threads in this torch version; traces cover the event loop only")
+        return torch.profiler.profile(activities=activities)
+
+
+class Capture:
+    def __init__(self, capture_id: str, service: str, endpoint: str, trigger: str):
+        self.capture_id = capture_id
+        self.meta = {"id": capture_id, "service": service, "endpoint": endpoint, "trigger": trigger}
+        self.prof = _torch_profiler()
+        self.sampler = StackSampler(PROFILE_SAMPLE_HZ)
+        self.stopped_early = False
+        self._running = False
+
+    def start(self):
+        self._start = time.perf_counter()
+        self.prof.start()
+        self.sampler.start()
+        self._running = True
+
+    def stop(self, early: bool = False):
+        """Idempotent; must run on the thread that called start() (torch.profiler)."""
+        if not self._running:
+            return
+        self._running = False
+        self.stopped_early = early
+        self.sampler.stop()
+        self.prof.stop()
+        self.meta["profiled_s"] = round(time.perf_counter() - self._start, 3)
+
+    def write(self, directory: Path) -> list:
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / self.capture_id
+        self.prof.export_chrome_trace(str(base) + ".trace.json")
+        Path(str(base) + ".folded").write_text(self.sampler.folded())
+
+        meta = {**self.meta, "stopped_early": self.stopped_early, "samples": self.sampler.samples}
+        lines = [json.dumps(meta), "", "Python samples (self, innermost frame):"]
+        lines += [f"{n:>8}  {leaf}" for n, leaf in self.sampler.top_functions()]
+        lines += ["", "torch ops:", self.prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=30)]
+        Path(str(base) + ".txt").write_text("\n".join(lines) + "\n")
+        return [self.capture_id + s for s in ARTIFACT_SUFFIXES]
+
+
+class ProfileController:
+    def __init__(self, directory: Path = PROFILE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._armed = 0
+        self._armed_endpoint: Optional[str] = None
+        self._active = False
+        self.captured = 0
+
+    def authorized(self, request: Request) -> bool:
+        return bool(PROFILE_TOKEN) and hmac.compare_digest(request.headers.get("x-profile-token", ""), PROFILE_TOKEN)
+
+    def arm(self, requests: int, endpoint: Optional[str] = None) -> dict:
+        with self._lock:
+            self._armed = max(0, min(requests, PROFILE_MAX_REQUESTS))
+            self._armed_endpoint = endpoint
+        return self.status()
+
+    def _claim(self, request: Request, endpoint: str) -> Optional[str]:
+        """How this request is to be profiled ("armed" / "header"), or None."""
+        wanted = request.headers.get("x-profile") == "1"
+        with self._lock:
+            if self._active:
+                return None
+            if wanted and self.authorized(request):
+                trigger = "header"
+            elif self._armed > 0 and self._armed_endpoint in (None, endpoint):
+                self._armed -= 1
+                trigger = "armed"
+            else:
+                return None
+            self._active = True
+            return trigger
+
+    def capture(self, request: Request, response, service: str, endpoint: str):
+        trigger = self._claim(request, endpoint)
+        if trigger is None:
+            return _NO_CAPTURE
+        return self._run(response, service, endpoint, trigger)
+
+    @asynccontextmanager
+    async def _run(self, response, service: str, endpoint: str, trigger: str):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        capture = Capture(f"{stamp}_{service}_{endpoint.strip('/').replace('/', '-')}_{uuid.uuid4().hex[:6]}",
+                          service, endpoint, trigger)
+        loop = asyncio.get_running_loop()
+        deadline = None
+        try:
+            capture.start()
+            deadline = loop.call_later(PROFILE_MAX_S, capture.stop, True)
+            yield capture
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+            capture.stop()
+            try:
+                files = await loop.run_in_executor(None, capture.write, self.directory)
+                response.headers["X-Profile-Id"] = capture.capture_id
+                print(f"🔬 Profiled {endpoint} ({trigger}): {files}")
+            except Exception as e:
+                print(f"⚠️ Could not write profile {capture.capture_id}: {e}")
+            finally:
+                with self._lock:
+                    self._active = False
+                    self.captured += 1
+                self.prune()
+
+    def captures(self) -> list:
+        if not self.directory.is_dir():
+            return []
+        ids = {p.name[: -len(".txt")] for p in self.directory.glob("*.txt")}
+        return sorted(ids, reverse=True)
+
+    def prune(self):
+        for capture_id in self.captures()[PROFILE_KEEP:]:
+            for suffix in ARTIFACT_SUFFIXES:
+                try:
+                    (self.directory / (capture_id + suffix)).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": PROFILING_ENABLED,
+                "armed": self._armed,
+                "armed_endpoint": self._armed_endpoint,
+                "active": self._active,
+                "captured": self.captured,
+                "directory": str(self.directory),
+            }
+
+
+profiler = ProfileController()
+
+
+def capture(request: Request, response, service: str, endpoint: str):
+    """Async context manager profiling this request if it was selected, else a no-op."""
+    if not PROFILING_ENABLED:
+        return _NO_CAPTURE
+    return profiler.capture(request, response, service, endpoint)
+
+
+# -------------------
+# ADMIN ROUTES (see add_profiling_routes)
+# -------------------
+def _check_admin(request: Request):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.authorized(request):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token.")
+
+
+def arm_profile(request: Request, requests: int = Query(1, ge=0), endpoint: Optional[str] = None):
+    """Profile the next `requests` detections (of `endpoint` only, if given); 0 disarms."""
+    _check_admin(request)
+    return profiler.arm(requests, endpoint)
+
+
+def profile_status(request: Request):
+    _check_admin(request)
+    return {**profiler.status(), "captures": profiler.captures()}
+
+
+def download_profile(request: Request, filename: str):
+    _check_admin(request)
+    capture_id = next((filename[: -len(s)] for s in ARTIFACT_SUFFIXES if filename.endswith(s)), None)
+    if capture_id not in profiler.captures():
+        raise HTTPException(status_code=404, detail="Unknown profile artifact.")
+    return FileResponse(profiler.directory / filename)
+
+
+def add_profiling_routes(app: FastAPI):
+    """Registers /admin/profile on a service app (plain routes, so server.py picks them up)."""
+    app.add_api_route("/admin/profile", arm_profile, methods=["POST"])
+    app.add_api_route("/admin/profile", profile_status, methods=["GET"])
+    app.add_api_route("/admin/profile/{filename}", download_profile, methods=["GET"])
@@ -0,0 +1,90 @@
+"""
+Early-exit ("progressive") video scoring.
+
+The video model scores a fixed-length clip of FRAMES_PER_VIDEO frames, and
+the full run averages N_PASSES independently jittered clips. In progressive
+mode the clips are decoded, face-cropped and scored one at a time, and
+scoring stops as soon as the running prob_fake estimate is confidently on
+one side of every decision boundary (DEEPFAKE_THRESHOLD and both edges of
+the UNCERTAIN_BAND), i.e. more clips could not change the verdict or its
+message.
+
+"Confidently" means the whole interval mean +/- half_width lies inside one
+decision region, where half_width is the larger of EARLY_EXIT_MARGIN and
+EARLY_EXIT_Z standard errors of the clip scores seen so far.
+
+Only frames with a detected face count: in progressive mode a clip is built
+from its face frames alone (no-face frames are replaced by neighbouring face
+frames), and a clip without any face is not scored at all. If no sampled
+frame has a face, the full-frame clips are scored as in the full run.
+
+The stopping rule is evaluated offline against the full run by
+training/evaluate_early_exit.py.
+"""
+
+import math
+import os
+from typing import List, Optional
+
+# -------------------
+# CONFIG
+# -------------------
+VIDEO_PROGRESSIVE = os.getenv("VIDEO_PROGRESSIVE", "0") == "1"  # default mode; ?progressive= overrides
+EARLY_EXIT_MIN_PASSES = int(os.getenv("EARLY_EXIT_MIN_PASSES", "1"))
+EARLY_EXIT_MARGIN = float(os.getenv("EARLY_EXIT_MARGIN", "0.05"))  # prob_fake distance to any boundary
+EARLY_EXIT_Z = float(os.getenv("EARLY_EXIT_Z", "2.0"))
+
+
+def decision_boundaries(threshold: float, band: float) -> List[float]:
+    """prob_fake values where the verdict or its message changes (see build_video_response)."""
+    return sorted([0.5 - band, 0.5 + band, threshold])
+
+
+class ProgressiveEstimate:
+    """Running mean of per-clip prob_fake with the early-exit rule."""
+
+    def __init__(
+        self,
+        threshold: float,
+        band: float,
+        margin: float = EARLY_EXIT_MARGIN,
+        z: float = EARLY_EXIT_Z,
+        min_passes: int = EARLY_EXIT_MIN_PASSES,
+    ):
+        self.boundaries = decision_boundaries(threshold, band)
+        self.margin = margin
+        self.z = z
+        self.min_passes = max(1, min_passes)
+        self.scores: List[float] = []
+        self.frames = 0    # face frames behind the counted scores
+        self.skipped = 0   # clips without any face
+
+    def add(self, prob_fake: Optional[float], face_frames: int):
+        """Record one clip; clips without a face (face_frames == 0) do not count."""
+        if face_frames <= 0 or prob_fake is None:
+            self.skipped += 1
+            return
+        self.scores.append(float(prob_fake))
+        self.frames += face_frames
+
+    @property
+    def passes(self) -> int:
+        return len(self.scores)
+
+    @property
+    def prob_fake(self) -> Optional[float]:
+        return sum(self.scores) / len(self.scores) if self.scores else None
+
+    def half_width(self) -> float:
+        n = len(self.scores)
+        if n < 2:
+            return self.margin
+        mean = self.prob_fake
+        std = math.sqrt(sum((s - mean) ** 2 for s in self.scores) / (n - 1))
+        return max(self.margin, self.z * std / math.sqrt(n))
+
+    def confident(self) -> bool:
+        if self.passes < self.min_passes:
+            return False
+        mean, h = self.prob_fake, self.half_width()
+        return not any(mean - h < b <= mean + h for b in self.boundaries)
@@ -0,0 +1,259 @@
+"""
+Content-addressed cache for detection results.
+
+Keys are the SHA-256 of the uploaded bytes, namespaced by the model
+checkpoint identity and the decision thresholds, so swapping the model or
+retuning a threshold never serves a stale verdict. Identical uploads that
+arrive while the first one is still being analysed share that single
+in-flight computation (single-flight).
+
+Backends:
+    - "memory": in-process LRU with TTL and an entry cap (default)
+    - "sqlite": on-disk LRU with TTL and an entry cap, survives restarts
+    - "off":    no caching (single-flight still applies)
+
+Results marked "degraded": true (a partial answer after a transient
+failure) are returned to everyone waiting on them but never stored. SQLite
+lookups and writes run on the cpu pool, off the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+from executors import PoolSaturatedError, cpu_pool
+
+# -------------------
+# CONFIG
+# -------------------
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")  # memory | sqlite | off
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "100000"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", str(7 * 24 * 3600)))
+RESULT_CACHE_DIR = Path(
+    os.getenv("RESULT_CACHE_DIR", Path(__file__).resolve().parent / "cache")
+)
+
+
+# -------------------
+# KEYS
+# -------------------
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def model_fingerprint(path) -> str:
+    """Cheap checkpoint identity: file name, size and modification time."""
+    st = os.stat(path)
+    return f"{Path(path).name}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def make_namespace(**parts) -> str:
+    """Stable short hash of everything (other than the upload) a result depends on."""
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+# -------------------
+# BACKENDS
+# -------------------
+class MemoryCacheBackend:
+    name = "memory"
+    blocking = False  # cheap enough to call on the event loop
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if time.time() - created > self.ttl_s:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: Path, max_entries: int, ttl_s: float):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+            )
+            self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl_s:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._count -= 1
+                return None
+            self._conn.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(value)
+
+    def set(self, key: str, value: dict):
+        now = time.time()
+        with self._lock, self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            if exists is None:
+                self._count += 1
+            excess = self._count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN"
+                    " (SELECT key FROM results ORDER BY accessed ASC LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+
+    def __len__(self):
+        return self._count
+
+
+# -------------------
+# CACHE + SINGLE-FLIGHT
+# -------------------
+class ResultCache:
+    def __init__(self, backend=None, namespace: str = ""):
+        self.backend = backend
+        self.namespace = namespace
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def key_for(self, digest: str) -> str:
+        return f"{self.namespace}:{digest}"
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[dict]]
+    ) -> Tuple[dict, str]:
+        """
+        Return (result, source) where source is "hit", "coalesced" or "miss".
+        compute() must return a JSON-serialisable dict. Exceptions are not
+        cached; they propagate to the caller and every coalesced waiter.
+        """
+        if self.backend is not None:
+            cached = await self._backend_call(self.backend.get, key)
+            if cached is not None:
+                self.hits += 1
+                return cached, "hit"
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending), "coalesced"
+
+        # The computation runs as its own task so that a caller disconnecting
+        # does not cancel the work other coalesced callers are waiting on.
+        self.misses += 1
+        task = asyncio.ensure_future(self._compute_and_store(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(key, None))
+        return await asyncio.shield(task), "miss"
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        # Stored before the key leaves _inflight, so no caller misses in between
+        result = await compute()
+        if self.backend is not None and not result.get("degraded"):
+            await self._backend_call(self.backend.set, key, result)
+        return result
+
+    async def _backend_call(self, fn, *args):
+        """fn(*args) on the cpu pool for blocking backends; a full pool skips the cache."""
+        if not getattr(self.backend, "blocking", False):
+            return fn(*args)
+        try:
+            return await cpu_pool().run(fn, *args)
+        except PoolSaturatedError:
+            return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": self.backend.name if self.backend is not None else "off",
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "max_entries": getattr(self.backend, "max_entries", 0),
+            "ttl_s": getattr(self.backend, "ttl_s", 0),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_result_cache(name: str, namespace: str) -> ResultCache:
+    """Create the cache configured by RESULT_CACHE_* for one service."""
+    kind = RESULT_CACHE_BACKEND.lower()
+    if kind == "memory":
+        backend = MemoryCacheBackend(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_S)
+    elif kind == "sqlite":
+        backend = SQLiteCacheBackend(
+            RESULT_CACHE_DIR / f"{name}_results.sqlite3",
+            RESULT_CACHE_MAX_ENTRIES,
+            RESULT_CACHE_TTL_S,
+        )
+    elif kind in ("off", "none", ""):
+        backend = None
+    else:
+        raise RuntimeError(f"Unknown RESULT_CACHE_BACKEND: {RESULT_CACHE_BACKEND}")
+    return ResultCache(backend, namespace)
@@ -0,0 +1,255 @@
+"""
+Interchangeable inference runtimes for the detectors.
+
+Every runtime is a callable mapping a float32 input tensor to the model's
+logits tensor, so the services can switch between eager PyTorch, a
+TorchScript artifact or an ONNX Runtime session (CPU execution provider)
+from config alone. Only the eager runtime also exposes a model's separate
+stages (embed_frames / classify_sequence), see supports_stages():
+
+    eager        build the nn.Module and load the .pth checkpoint
+    torchscript  torch.jit.load(<checkpoint>.ts.pt)
+    onnx         onnxruntime.InferenceSession(<checkpoint>.onnx)
+    int8         torch.jit.load(<checkpoint>.int8.ts.pt), CPU only
+
+Artifacts are produced by training/export_models.py (torchscript, onnx) and
+training/quantize_image_model.py (int8).
+
+The eager runtime can also run in a lower precision and / or memory layout
+(IMAGE_PRECISION / VIDEO_PRECISION, IMAGE_CHANNELS_LAST / VIDEO_CHANNELS_LAST):
+
+    fp32           as trained
+    bf16           autocast to bfloat16; falls back to fp32 (with a warning)
+                   when the device has no bf16 kernels
+    auto           bf16 where the CPU computes it natively (AVX512-BF16 / AMX,
+                   or a bf16-capable GPU), fp32 elsewhere
+    channels_last  NHWC weights and inputs for the convolutions
+
+Outputs are always float32. training/check_precision_parity.py checks that a
+mode keeps p_fake and the verdicts of the fp32 model.
+"""
+
+import os
+import zipfile
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, Optional
+
+import torch
+import torch.nn as nn
+
+from executors import intra_op_threads
+
+RUNTIMES = ("eager", "torchscript", "onnx", "int8")
+PRECISIONS = ("fp32", "bf16", "auto")
+
+ARTIFACT_SUFFIXES = {
+    "torchscript": ".ts.pt",
+    "onnx": ".onnx",
+    "int8": ".int8.ts.pt",
+}
+
+# 0 = the thread budget's share (executors.apply_thread_budget), else let ONNX Runtime decide
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+
+
+def default_artifact_path(checkpoint_path, kind: str) -> Optional[Path]:
+    """models/image/image_model.pth -> models/image/image_model.onnx etc."""
+    if kind == "eager":
+        return None
+    checkpoint_path = Path(checkpoint_path)
+    return checkpoint_path.with_name(checkpoint_path.stem + ARTIFACT_SUFFIXES[kind])
+
+
+def cpu_has_native_bf16() -> bool:
+    """AVX512-BF16 or AMX: bf16 convolutions run faster than fp32, not just correctly."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def bf16_supported(device: torch.device) -> bool:
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def resolve_precision(requested: str, device: torch.device) -> str:
+    """fp32 | bf16 | auto -> the precision this device will actually run (fp32 | bf16)."""
+    if requested not in PRECISIONS:
+        raise RuntimeError(f"Unknown precision '{requested}', expected one of {PRECISIONS}")
+    if requested == "fp32":
+        return "fp32"
+    if not bf16_supported(device):
+        if requested == "bf16":
+            print(f"⚠️ bf16 is not supported on {device} (no AVX512 / bf16 kernels); running fp32")
+        return "fp32"
+    if requested == "auto" and device.type == "cpu" and not cpu_has_native_bf16():
+        return "fp32"  # emulated bf16 is slower than fp32
+    return "bf16"
+
+
+class EagerRuntime:
+    kind = "eager"
+
+    def __init__(self, model: nn.Module, device: torch.device, precision: str = "fp32", channels_last: bool = False):
+        self.model = model.to(device).eval()
+        if channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+        self.device = device
+        self.precision = precision  # already resolved: fp32 | bf16
+        self.channels_last = channels_last
+        self.artifact = None
+
+    def _autocast(self):
+        if self.precision == "bf16":
+            return torch.autocast(self.device.type, dtype=torch.bfloat16)
+        return nullcontext()
+
+    def _input(self, x: torch.Tensor) -> torch.Tensor:
+        x = x.to(self.device)
+        if self.channels_last and x.dim() == 4:
+            x = x.contiguous(memory_format=torch.channels_last)
+        return x
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad(), self._autocast():
+            return self.model(self._input(x)).float()
+
+    def embed_frames(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad(), self._autocast():
+            return self.model.embed_frames(self._input(x)).float()
+
+    def classify_sequence(self, feats: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad(), self._autocast():
+            return self.model.classify_sequence(feats.to(self.device)).float()
+
+
+class TorchScriptRuntime:
+    kind = "torchscript"
+
+    def __init__(self, path: Path, device: torch.device):
+        self.model = torch.jit.load(str(path), map_location=device).eval()
+        self.device = device
+        self.artifact = Path(path)
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return self.model(x.to(self.device))
+
+
+def read_quant_engine(path) -> str:
+    """Quantization engine recorded in a TorchScript archive's extra files."""
+    with zipfile.ZipFile(str(path)) as archive:
+        for name in archive.namelist():
+            if name.endswith("/extra/quant_engine"):
+                return archive.read(name).decode()
+    return ""
+
+
+class Int8Runtime(TorchScriptRuntime):
+    """Quantized TorchScript module; quantized kernels only run on CPU."""
+
+    kind = "int8"
+
+    def __init__(self, path: Path):
+        # Packed INT8 weights are rebuilt at load time for the current engine,
+        # so select the one the model was calibrated for before loading it
+        engine = read_quant_engine(path)
+        if engine:
+            if engine not in torch.backends.quantized.supported_engines:
+                raise RuntimeError(
+                    f"INT8 model was quantized for '{engine}', which this build of "
+                    f"PyTorch does not support {torch.backends.quantized.supported_engines}"
+                )
+            torch.backends.quantized.engine = engine
+        self.engine = engine or torch.backends.quantized.engine
+        super().__init__(path, torch.device("cpu"))
+
+
+class OnnxRuntime:
+    kind = "onnx"
+
+    def __init__(self, path: Path):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError(
+                "The onnx runtime needs the onnxruntime package (pip install onnxruntime)."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = ORT_INTRA_OP_THREADS or intra_op_threads()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.device = torch.device("cpu")
+        self.artifact = Path(path)
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        feed = {self.input_name: x.detach().cpu().contiguous().numpy()}
+        return torch.from_numpy(self.session.run(None, feed)[0])
+
+
+def load_runtime(
+    kind: str,
+    build_eager: Callable[[], nn.Module],
+    device: torch.device,
+    artifact_path=None,
+    precision: str = "fp32",
+    channels_last: bool = False,
+):
+    """
+    kind:          one of RUNTIMES
+    build_eager:   returns the nn.Module with its checkpoint already loaded
+    artifact_path: exported artifact for torchscript / onnx
+    precision:     resolve_precision() result; with channels_last, eager only
+    """
+    if kind not in RUNTIMES:
+        raise RuntimeError(f"Unknown runtime '{kind}', expected one of {RUNTIMES}")
+    if kind == "eager":
+        return EagerRuntime(build_eager(), device, precision, channels_last)
+    if precision != "fp32" or channels_last:
+        print(f"⚠️ Precision / channels_last only apply to the eager runtime; {kind} runs as exported")
+
+    if artifact_path is None or not Path(artifact_path).exists():
+        raise RuntimeError(
+            f"{kind} artifact not found at {artifact_path}. "
+            "Run training/export_models.py (or training/quantize_image_model.py "
+            "for int8) first."
+        )
+    if kind == "torchscript":
+        return TorchScriptRuntime(artifact_path, device)
+    if kind == "int8":
+        return Int8Runtime(artifact_path)
+    return OnnxRuntime(artifact_path)
+
+
+def supports_stages(runtime) -> bool:
+    """Whether the runtime's model splits into embed_frames() / classify_sequence()."""
+    return (
+        isinstance(runtime, EagerRuntime)
+        and hasattr(runtime.model, "embed_frames")
+        and hasattr(runtime.model, "classify_sequence")
+    )
+
+
+def describe_runtime(runtime) -> dict:
+    return {
+        "kind": runtime.kind,
+        "artifact": str(runtime.artifact) if runtime.artifact else None,
+        "device": str(runtime.device),
+        "precision": getattr(runtime, "precision", "int8" if runtime.kind == "int8" else "fp32"),
+        "channels_last": getattr(runtime, "channels_last", False),
+    }
@@ -0,0 +1,111 @@
+"""
+Single-process server hosting the image and video detectors.
+
+Deployed as two processes, main.py and main_video.py each load their own
+torch runtime, thread pools and libraries, and they compete for the same
+cores without coordinating. This server imports both services into one
+process instead:
+
+    - one model registry (model_loader.MODEL_REGISTRY): /ready_server is 200
+      once every hosted model is warm, /models reports each of them
+    - one cpu pool and one inference pool (executors.py), whose scheduler
+      starts interactive image requests before bulk images and video work
+    - one thread budget / CPU layout per process (TOPOLOGY or THREAD_BUDGET,
+      see topology.py)
+
+Each service keeps its own routes (/detect/image, /detect/video,
+/jobs/video, /health, /health_video, ...) and lifespan. SERVER_SERVICES
+picks the services to host. benchmarks/bench_unified_server.py measures
+the memory saved and image latency while video work is running.
+
+Run (from backend/):
+    uvicorn server:app --host 0.0.0.0 --port 8000
+"""
+
+import importlib
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
+
+from executors import executor_stats
+from model_loader import MODEL_REGISTRY, process_memory, registry_status
+from topology import apply_topology, topology_status
+
+# -------------------
+# CONFIG
+# -------------------
+SERVICE_MODULES = {"image": "main", "video": "main_video"}
+SERVER_SERVICES = [
+    s.strip() for s in os.getenv("SERVER_SERVICES", "image,video").split(",") if s.strip()
+]
+
+# Before any pool starts or model loads
+apply_topology()
+
+services = {}
+for name in SERVER_SERVICES:
+    if name not in SERVICE_MODULES:
+        raise RuntimeError(f"Unknown service '{name}' in SERVER_SERVICES, expected {list(SERVICE_MODULES)}")
+    services[name] = importlib.import_module(SERVICE_MODULES[name])
+
+# -------------------
+# FASTAPI APP
+# -------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with AsyncExitStack() as stack:
+        for module in services.values():
+            await stack.enter_async_context(module.lifespan(app))
+        yield
+
+app = FastAPI(title="Detectify Deepfake API (PyTorch)", lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # tighten in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# The services' own endpoints, unchanged (their docs routes are left out)
+for module in services.values():
+    app.router.routes.extend(r for r in module.app.routes if isinstance(r, APIRoute))
+
+# -------------------
+# ROUTES
+# -------------------
+@app.get("/models")
+def models():
+    return registry_status()
+
+@app.get("/ready_server")
+def ready_server():
+    """Readiness probe: 200 only once every hosted model is loaded and warmed up."""
+    for loader in MODEL_REGISTRY.values():
+        loader.start()
+    if not all(loader.ready for loader in MODEL_REGISTRY.values()):
+        raise HTTPException(status_code=503, detail=registry_status())
+    return {"ready": True, "models": registry_status()}
+
+@app.get("/health_server")
+def health_server():
+    return {
+        "status": "ok",
+        "services": list(services),
+        "models": registry_status(),
+        "executors": executor_stats(),
+        "topology": topology_status(),
+        "memory": process_memory(),
+    }
+
+# -------------------
+# RUN (for local testing)
+# -------------------
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def _double_all(calls: list):
+    def run_batch(items):
+        calls.append(list(items))
+        return [2 * x for x in items]
+    return run_batch
+
+
+def test_concurrent_items_share_one_batch_and_get_their_own_results():
+    calls = []
+    batcher = MicroBatcher(_double_all(calls), max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+    assert batcher.stats()["batch_size_histogram"] == {"5": 1}
+
+
+def test_full_batch_flushes_without_waiting():
+    calls = []
+    batcher = MicroBatcher(_double_all(calls), max_batch_size=4, max_wait_ms=10_000)
+
+    async def run():
+        start = time.monotonic()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(8)))
+        return results, time.monotonic() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == [2 * i for i in range(8)]
+    assert calls == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert elapsed < 5  # never waited out max_wait_ms
+
+
+def test_partial_batch_flushes_after_max_wait():
+    calls = []
+    batcher = MicroBatcher(_double_all(calls), max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        start = time.monotonic()
+        result = await batcher.submit(21)
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == 42
+    assert calls == [[21]]
+    assert 0.04 <= elapsed < 2
+
+
+def test_batch_error_reaches_every_caller_and_batcher_keeps_running():
+    def run_batch(items):
+        if "bad" in items:
+            raise ValueError("boom")
+        return items
+
+    batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        failed = await asyncio.gather(batcher.submit("ok"), batcher.submit("bad"), return_exceptions=True)
+        return failed, await batcher.submit("after")
+
+    failed, after = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in failed)
+    assert after == "after"
+
+
+def test_wrong_number_of_results_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:1], max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+
+
+def test_cancelled_caller_is_dropped_from_the_batch():
+    calls = []
+    batcher = MicroBatcher(_double_all(calls), max_batch_size=8, max_wait_ms=100)
+
+    async def run():
+        gone = asyncio.ensure_future(batcher.submit(1))
+        stays = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0.01)
+        gone.cancel()
+        return await stays
+
+    assert asyncio.run(run()) == 4
+    assert calls == [[2]]
+
+
+def test_max_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda items: items, max_batch_size=0)
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from starlette.requests import Request
+
+import executors
+from bulk import read_bulk_form, stream_ndjson
+from executors import PRIORITY_BULK, BoundedExecutor, cpu_pool
+
+
+@pytest.fixture
+def one_worker_cpu_pool(monkeypatch):
+    """cpu_pool() with one worker and room for one waiting task per priority."""
+    pool = BoundedExecutor("cpu", max_workers=1, max_queue=1, prioritize=True)
+    monkeypatch.setattr(executors, "_cpu_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_interactive_request_served_ahead_of_bulk_stream(one_worker_cpu_pool):
+    order = []
+    release = threading.Event()
+
+    def read(i: int) -> bytes:
+        order.append(f"read {i}")
+        return b"x"
+
+    async def handle(filename, content_type, data):
+        return {"verdict": "authentic"}
+
+    async def run():
+        # The only worker is busy with earlier bulk work
+        busy = asyncio.ensure_future(cpu_pool(PRIORITY_BULK).run(release.wait, 5))
+        await asyncio.sleep(0.05)
+
+        # A bulk stream starts and queues its next read behind it
+        items = [(f"{i}.jpg", "image/jpeg", lambda i=i: read(i)) for i in range(10)]
+        consumer = asyncio.ensure_future(_collect(stream_ndjson(iter(items), handle, max_in_flight=4, max_items=100)))
+        await asyncio.sleep(0.05)
+
+        # An interactive request is neither rejected by the bulk backlog nor queued behind it
+        interactive = asyncio.ensure_future(cpu_pool().run(order.append, "interactive"))
+        await asyncio.sleep(0.05)
+        release.set()
+        await busy
+        await interactive
+        return await consumer
+
+    lines = asyncio.run(run())
+
+    assert order[0] == "interactive"
+    assert order[1:] == [f"read {i}" for i in range(10)]
+    assert sorted(line["index"] for line in lines) == list(range(10))
+    assert all("result" in line for line in lines)
+
+
+def test_form_stays_open_until_the_running_read_finishes(one_worker_cpu_pool):
+    events = []
+    reading = threading.Event()
+
+    def slow_read() -> bytes:
+        reading.set()
+        time.sleep(0.2)
+        events.append("read done")
+        return b"x"
+
+    async def handle(filename, content_type, data):
+        return {}
+
+    async def close():
+        events.append("closed")
+
+    async def run():
+        items = [("0.jpg", "image/jpeg", slow_read)]
+        stream = stream_ndjson(iter(items), handle, max_in_flight=1, max_items=10, on_close=close)
+        consumer = asyncio.ensure_future(_collect(stream))
+        await asyncio.get_running_loop().run_in_executor(None, reading.wait, 5)
+        consumer.cancel()  # the client goes away mid-read
+        await asyncio.gather(consumer, return_exceptions=True)
+
+    asyncio.run(run())
+    assert events == ["read done", "closed"]
+
+
+def test_bulk_form_takes_more_than_starlettes_default_file_limit():
+    n = 1500  # Starlette's default max_files is 1000
+    body = b"".join(
+        b'--b\r\nContent-Disposition: form-data; name="files"; filename="%d.jpg"\r\n'
+        b"Content-Type: image/jpeg\r\n\r\nx\r\n" % i
+        for i in range(n)
+    ) + b"--b--\r\n"
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def run():
+        request = Request({
+            "type": "http", "method": "POST", "path": "/detect/images", "query_string": b"",
+            "headers": [(b"content-type", b"multipart/form-data; boundary=b")],
+        }, receive)
+        form, uploads = await read_bulk_form(request, max_items=10000)
+        await form.close()
+        return len(uploads)
+
+    assert asyncio.run(run()) == n
+
+
+async def _collect(stream) -> list:
+    return [json.loads(line) async for line in stream]
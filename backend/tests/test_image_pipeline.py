@@ -0,0 +1,41 @@
+from io import BytesIO
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from heuristics import heuristic_scores
+from image_pipeline import EXIF_ORIENTATION_TAG, prepare_image
+
+
+def _jpeg(orientation=None) -> bytes:
+    rng = np.random.default_rng(0)
+    rgb = cv2.GaussianBlur(rng.integers(0, 256, (120, 200, 3), dtype=np.uint8), (9, 9), 0)
+    rgb[10:40, 10:90] = (255, 0, 0)  # asymmetric, so every flip/rotation differs
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[EXIF_ORIENTATION_TAG] = orientation
+    buf = BytesIO()
+    Image.fromarray(rgb).save(buf, "JPEG", quality=90, exif=exif)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("orientation", [None, *range(1, 9)])
+def test_heuristics_input_is_oriented_like_cv2_imdecode(orientation):
+    data = _jpeg(orientation)
+    # What the heuristics were given before the single-decode pipeline
+    upright = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    heuristics_input, model_input = prepare_image(data, (60, 100))
+
+    assert np.array_equal(heuristics_input, upright)
+    assert heuristic_scores(heuristics_input) == heuristic_scores(upright)
+    # The model keeps the stored orientation, as PIL's Image.open gave it in training
+    assert model_input.shape == (60, 100, 3)
+    assert np.array_equal(model_input, prepare_image(_jpeg(), (60, 100))[1])
+
+
+def test_undecodable_upload_raises_value_error():
+    with pytest.raises(ValueError):
+        prepare_image(b"not an image", (60, 100))
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+from jobs import DONE, FAILED, JOB_MAX_ATTEMPTS, QUEUED, RUNNING, JobQueue, JobStore
+
+LEASE_S = 0.2
+
+
+def test_restart_with_same_pid_requeues_after_lease(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    before = JobStore(path, lease_s=LEASE_S)
+    job = before.create(None, {})
+    assert before.claim()["job_id"] == job["job_id"]
+
+    # The "restarted" server is this very process: same host, same pid
+    after = JobStore(path, lease_s=LEASE_S)
+    assert after.requeue_expired() == 0  # lease still valid
+    assert after.get(job["job_id"])["status"] == RUNNING
+
+    time.sleep(LEASE_S * 1.5)
+    assert after.requeue_expired() == 1
+    assert after.get(job["job_id"])["status"] == QUEUED
+    assert after.claim()["job_id"] == job["job_id"]
+
+
+def test_heartbeat_keeps_lease(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3", lease_s=LEASE_S)
+    job = store.create(None, {})
+    store.claim()
+    for _ in range(3):
+        time.sleep(LEASE_S / 2)
+        assert store.heartbeat(job["job_id"])
+        assert store.requeue_expired() == 0
+    assert store.get(job["job_id"])["status"] == RUNNING
+
+
+def test_stale_worker_cannot_finish_requeued_job(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    stale = JobStore(path, lease_s=LEASE_S)
+    job = stale.create(None, {})
+    stale.claim()
+    time.sleep(LEASE_S * 1.5)
+
+    fresh = JobStore(path, lease_s=LEASE_S)
+    fresh.requeue_expired()
+    fresh.claim()
+    assert not stale.heartbeat(job["job_id"])
+    assert not stale.finish(job["job_id"], {"by": "stale"})
+    assert fresh.finish(job["job_id"], {"by": "fresh"})
+    assert fresh.get(job["job_id"])["result"] == {"by": "fresh"}
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3", lease_s=LEASE_S)
+    job = store.create(None, {})
+    for _ in range(JOB_MAX_ATTEMPTS):
+        store.claim()
+        time.sleep(LEASE_S * 1.5)
+        store.requeue_expired()
+    assert store.get(job["job_id"])["status"] == FAILED
+
+
+def test_queue_reruns_job_interrupted_by_restart(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+
+    async def hang(job):
+        await asyncio.sleep(3600)
+
+    async def succeed(job):
+        return {"ok": True}
+
+    async def scenario():
+        first = JobQueue("test", JobStore(path, lease_s=LEASE_S), hang, workers=1, max_queued=10)
+        await first.start()
+        job = await first.submit(None, {})
+        while (await first.get(job["job_id"]))["status"] != RUNNING:
+            await asyncio.sleep(0.01)
+        await first.stop()  # the process "dies" mid-job
+
+        second = JobQueue("test", JobStore(path, lease_s=LEASE_S), succeed, workers=1, max_queued=10)
+        await second.start()
+        try:
+            return await second.wait(job["job_id"], timeout_s=5)
+        finally:
+            await second.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == DONE
+    assert job["result"] == {"ok": True}
+    assert job["attempts"] == 2
+
+
+def test_queue_keeps_store_calls_off_the_event_loop(tmp_path):
+    threads = set()
+
+    class RecordingLock:
+        """The store's lock, noting which threads take it (every store call does)."""
+
+        def __init__(self):
+            self._lock = threading.Lock()
+
+        def __enter__(self):
+            threads.add(threading.get_ident())
+            return self._lock.__enter__()
+
+        def __exit__(self, *exc):
+            return self._lock.__exit__(*exc)
+
+    async def succeed(job):
+        return {"ok": True}
+
+    async def scenario():
+        store = JobStore(tmp_path / "jobs.sqlite3", lease_s=LEASE_S)
+        store._lock = RecordingLock()
+        queue = JobQueue("test", store, succeed, workers=1, max_queued=10)
+        await queue.start()
+        try:
+            job = await queue.submit(None, {})
+            return threading.get_ident(), await queue.wait(job["job_id"], timeout_s=5)
+        finally:
+            await queue.stop()
+
+    loop_thread, job = asyncio.run(scenario())
+    assert job["status"] == DONE
+    assert threads and loop_thread not in threads
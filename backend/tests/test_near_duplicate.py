@@ -0,0 +1,102 @@
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+from near_duplicate import HASH_BITS, MultiIndexHash, NearDuplicateIndex, hamming, phash
+
+
+def _flip(h: int, bits: int, rng: random.Random) -> int:
+    for pos in rng.sample(range(HASH_BITS), bits):
+        h ^= 1 << pos
+    return h
+
+
+@pytest.fixture
+def stored_hashes():
+    """Random hashes plus near neighbours (1..9 bits away) of the first few."""
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(HASH_BITS) for _ in range(2000)]
+    for h in hashes[:50]:
+        hashes += [_flip(h, k, rng) for k in range(1, 10)]
+    return hashes
+
+
+def test_chunks_cover_every_bit_once():
+    mih = MultiIndexHash()
+    assert sum(mih.widths) == HASH_BITS
+    h = random.Random(1).getrandbits(HASH_BITS)
+    rebuilt = 0
+    for chunk, shift in zip(mih._chunks(h), mih.shifts):
+        rebuilt |= chunk << shift
+    assert rebuilt == h
+
+
+@pytest.mark.parametrize("radius", [0, 2, 3, 5, 6, 8])
+def test_search_matches_brute_force(stored_hashes, radius):
+    mih = MultiIndexHash()
+    for h in stored_hashes:
+        mih.add(h)
+
+    rng = random.Random(radius)
+    queries = stored_hashes[:50] + [_flip(h, 3, rng) for h in stored_hashes[:50]]
+    for q in queries:
+        expected = {h for h in stored_hashes if hamming(h, q) <= radius}
+        assert set(mih.search(q, radius)) == expected
+
+
+def test_remove_keeps_hashes_sharing_a_bucket():
+    mih = MultiIndexHash()
+    a = 0
+    b = 1 << 63  # same low chunks as a
+    mih.add(a)
+    mih.add(b)
+    mih.remove(a)
+    assert mih.search(a, 0) == []
+    assert mih.search(b, 0) == [b]
+    mih.remove(b)
+    assert all(not table for table in mih._tables)
+
+
+def test_index_returns_the_closest_item_within_mean_distance():
+    rng = random.Random(2)
+    index = NearDuplicateIndex(max_distance=6, max_entries=100)
+    base = [rng.getrandbits(HASH_BITS) for _ in range(3)]
+    index.add(base, "base")
+    index.add([_flip(h, 4, rng) for h in base], "farther")
+
+    query = [_flip(h, 2, rng) for h in base]
+    payload, distance = index.lookup(query)
+    assert payload == "base"
+    assert distance == 2
+
+    # Mean distance over the signature, not the best single hash
+    assert index.lookup([base[0], _flip(base[1], 20, rng), _flip(base[2], 20, rng)]) is None
+    # Signatures of another length (e.g. an image vs a video) never match
+    assert index.lookup(base[:1]) is None
+    assert index.stats()["matches"] == 1
+
+
+def test_index_evicts_oldest_entries():
+    rng = random.Random(3)
+    index = NearDuplicateIndex(max_distance=0, max_entries=2)
+    items = [[rng.getrandbits(HASH_BITS)] for _ in range(3)]
+    for i, hashes in enumerate(items):
+        index.add(hashes, i)
+    assert index.lookup(items[0]) is None
+    assert index.lookup(items[1]) == (1, 0)
+    assert index.lookup(items[2]) == (2, 0)
+
+
+def test_phash_survives_reencoding_and_resizing():
+    rng = np.random.default_rng(4)
+    img = cv2.GaussianBlur(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), (31, 31), 0)
+    cv2.circle(img, (160, 120), 60, (255, 255, 255), -1)
+
+    ok, jpeg = cv2.imencode(".jpg", cv2.resize(img, (200, 150)), [cv2.IMWRITE_JPEG_QUALITY, 60])
+    reencoded = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+    other = cv2.GaussianBlur(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), (31, 31), 0)
+
+    assert hamming(phash(img), phash(reencoded)) <= 6
+    assert hamming(phash(img), phash(other)) > 6
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from progressive import ProgressiveEstimate, decision_boundaries
+from verdicts import VIDEO_DEEPFAKE_THRESHOLD, VIDEO_UNCERTAIN_BAND, video_verdict
+
+
+def _estimate(*scores, margin=0.05, z=2.0, min_passes=1) -> ProgressiveEstimate:
+    estimate = ProgressiveEstimate(VIDEO_DEEPFAKE_THRESHOLD, VIDEO_UNCERTAIN_BAND, margin, z, min_passes)
+    for s in scores:
+        estimate.add(s, face_frames=10)
+    return estimate
+
+
+def _decision(prob_fake: float) -> tuple:
+    verdict, _, message = video_verdict(prob_fake)
+    return verdict, message
+
+
+def test_boundaries_are_where_the_video_verdict_or_message_changes():
+    boundaries = decision_boundaries(VIDEO_DEEPFAKE_THRESHOLD, VIDEO_UNCERTAIN_BAND)
+    assert boundaries == sorted(boundaries)
+    for b in boundaries:
+        assert _decision(b - 1e-6) != _decision(b + 1e-6)
+
+
+@pytest.mark.parametrize("score, confident", [
+    (0.98, True),   # clearly deepfake
+    (0.92, False),  # within the margin of the deepfake threshold
+    (0.20, True),   # clearly authentic
+    (0.50, True),   # in the middle of the uncertain band
+    (0.66, False),  # at the upper edge of the uncertain band
+    (0.32, False),  # at the lower edge of the uncertain band
+])
+def test_one_clip_is_enough_only_away_from_every_boundary(score, confident):
+    assert _estimate(score).confident() is confident
+
+
+def test_disagreeing_clips_widen_the_interval():
+    assert _estimate(0.2, 0.2).confident()
+    # Same mean, but two standard errors reach the uncertain band at 0.35
+    assert not _estimate(0.1, 0.3).confident()
+
+
+def test_min_passes_is_respected():
+    estimate = _estimate(0.99, min_passes=3)
+    assert not estimate.confident()
+    estimate.add(0.99, face_frames=10)
+    estimate.add(0.99, face_frames=10)
+    assert estimate.confident()
+
+
+def test_clips_without_a_face_do_not_count():
+    estimate = _estimate()
+    estimate.add(None, face_frames=0)
+    estimate.add(0.9, face_frames=0)
+    assert (estimate.passes, estimate.skipped, estimate.frames) == (0, 2, 0)
+    assert estimate.prob_fake is None
+    assert not estimate.confident()
+
+    estimate.add(0.1, face_frames=7)
+    assert (estimate.passes, estimate.frames, estimate.prob_fake) == (1, 7, 0.1)
+
+
+def test_stopping_never_happens_where_more_clips_could_change_the_decision():
+    rng = random.Random(0)
+    for _ in range(2000):
+        center = rng.random()
+        estimate = _estimate(*(min(1.0, max(0.0, rng.gauss(center, 0.1))) for _ in range(rng.randint(1, 6))))
+        if not estimate.confident():
+            continue
+        mean, h = estimate.prob_fake, estimate.half_width()
+        decision = _decision(mean)
+        for p in (mean - h, mean - h / 2, mean + h / 2, mean + h):
+            if 0.0 <= p <= 1.0:
+                assert _decision(p) == decision
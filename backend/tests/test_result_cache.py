@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from result_cache import MemoryCacheBackend, ResultCache, SQLiteCacheBackend, make_namespace
+
+
+class CountingCompute:
+    """compute() for get_or_compute: counts calls, returns after a short delay."""
+
+    def __init__(self, result=None, error=None, delay_s=0.05):
+        self.calls = 0
+        self.result = result if result is not None else {"verdict": "authentic"}
+        self.error = error
+        self.delay_s = delay_s
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay_s)
+        if self.error is not None:
+            raise self.error
+        return dict(self.result)
+
+
+def _memory_cache() -> ResultCache:
+    return ResultCache(MemoryCacheBackend(max_entries=100, ttl_s=3600), namespace="ns")
+
+
+def test_identical_concurrent_requests_share_one_computation():
+    cache = _memory_cache()
+    compute = CountingCompute()
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert compute.calls == 1
+    assert sorted(source for _, source in results) == ["coalesced"] * 4 + ["miss"]
+    assert all(result == {"verdict": "authentic"} for result, _ in results)
+
+
+def test_finished_result_is_served_from_the_cache():
+    cache = _memory_cache()
+    compute = CountingCompute()
+
+    async def run():
+        await cache.get_or_compute("k", compute)
+        return await cache.get_or_compute("k", compute)
+
+    assert asyncio.run(run()) == ({"verdict": "authentic"}, "hit")
+    assert compute.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["in_flight"] == 0
+
+
+def test_degraded_result_is_shared_but_never_stored():
+    cache = _memory_cache()
+    compute = CountingCompute(result={"verdict": "authentic", "degraded": True})
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+        again = await cache.get_or_compute("k", compute)
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert compute.calls == 2
+    assert sorted(source for _, source in first) == ["coalesced", "coalesced", "miss"]
+    assert again[1] == "miss"
+    assert len(cache.backend) == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = _memory_cache()
+    failing = CountingCompute(error=ValueError("boom"))
+
+    async def run():
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", failing) for _ in range(3)), return_exceptions=True
+        )
+        retried = await cache.get_or_compute("k", CountingCompute())
+        return results, retried
+
+    results, retried = asyncio.run(run())
+    assert failing.calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert retried == ({"verdict": "authentic"}, "miss")
+
+
+def test_caller_going_away_does_not_cancel_the_shared_computation():
+    cache = _memory_cache()
+    compute = CountingCompute(delay_s=0.1)
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == ({"verdict": "authentic"}, "coalesced")
+    assert compute.calls == 1
+
+
+def test_without_backend_single_flight_still_applies():
+    cache = ResultCache(None)
+    compute = CountingCompute()
+
+    async def run():
+        await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+        return await cache.get_or_compute("k", compute)
+
+    assert asyncio.run(run())[1] == "miss"
+    assert compute.calls == 2
+
+
+def test_memory_backend_evicts_least_recently_used_and_expires():
+    backend = MemoryCacheBackend(max_entries=2, ttl_s=3600)
+    backend.set("a", {"v": 1})
+    backend.set("b", {"v": 2})
+    assert backend.get("a") == {"v": 1}  # "b" is now least recently used
+    backend.set("c", {"v": 3})
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1} and backend.get("c") == {"v": 3}
+
+    expiring = MemoryCacheBackend(max_entries=2, ttl_s=0.05)
+    expiring.set("a", {"v": 1})
+    time.sleep(0.1)
+    assert expiring.get("a") is None
+
+
+def test_sqlite_backend_persists_and_evicts(tmp_path):
+    path = tmp_path / "results.sqlite3"
+    backend = SQLiteCacheBackend(path, max_entries=2, ttl_s=3600)
+    backend.set("a", {"v": 1})
+    backend.set("b", {"v": 2})
+    backend.set("a", {"v": 10})  # replacing does not count twice
+    assert len(backend) == 2
+
+    reopened = SQLiteCacheBackend(path, max_entries=2, ttl_s=3600)
+    assert reopened.get("a") == {"v": 10}
+    time.sleep(0.01)
+    reopened.set("c", {"v": 3})  # "b" was accessed least recently
+    assert reopened.get("b") is None
+    assert len(reopened) == 2
+
+
+def test_sqlite_calls_run_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingBackend(SQLiteCacheBackend):
+        def get(self, key):
+            threads.append(threading.current_thread().name)
+            return super().get(key)
+
+        def set(self, key, value):
+            threads.append(threading.current_thread().name)
+            super().set(key, value)
+
+    cache = ResultCache(RecordingBackend(tmp_path / "results.sqlite3", 10, 3600), namespace="ns")
+
+    async def run():
+        await cache.get_or_compute("k", CountingCompute())
+        return await cache.get_or_compute("k", CountingCompute())
+
+    assert asyncio.run(run())[1] == "hit"
+    assert len(threads) == 3
+    assert all(name.startswith("cpu-pool") for name in threads)
+
+
+@pytest.mark.parametrize("change", [{"model": "other.pth"}, {"deepfake_threshold": 0.8}])
+def test_namespace_changes_with_anything_the_verdict_depends_on(change):
+    parts = {"model": "image_model.pth:1:2", "deepfake_threshold": 0.9}
+    assert make_namespace(**parts) == make_namespace(**dict(reversed(list(parts.items()))))
+    assert make_namespace(**parts) != make_namespace(**{**parts, **change})
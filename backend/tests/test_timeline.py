@@ -0,0 +1,62 @@
+import pytest
+
+from timeline import segment, suspicious_intervals
+from training.train_ffpp_video_model import window_grid
+
+
+def _segments(*probs, window_s=4.0):
+    # Windows overlapping by half, as timeline mode produces them
+    return [
+        {"start_s": i * window_s / 2, "end_s": i * window_s / 2 + window_s, "prob_fake": p}
+        for i, p in enumerate(probs)
+    ]
+
+
+def test_segment_times_cover_its_last_frame():
+    assert segment(0, 99, 25.0, 0.123456) == {"start_s": 0.0, "end_s": 4.0, "prob_fake": 0.1235}
+
+
+def test_consecutive_suspicious_segments_merge_into_one_interval():
+    intervals = suspicious_intervals(_segments(0.1, 0.7, 0.9, 0.65, 0.2), threshold=0.65)
+    assert intervals == [{
+        "start_s": 2.0, "end_s": 10.0, "peak_prob_fake": 0.9, "mean_prob_fake": 0.75, "segments": 3,
+    }]
+
+
+def test_intervals_are_ranked_by_peak_and_cut_to_top_k():
+    segments = _segments(0.7, 0.1, 0.95, 0.1, 0.8, 0.1, 0.66)
+    intervals = suspicious_intervals(segments, threshold=0.65, top_k=2)
+    assert [i["peak_prob_fake"] for i in intervals] == [0.95, 0.8]
+    assert len(suspicious_intervals(segments, threshold=0.65, top_k=10)) == 4
+
+
+def test_run_reaching_the_end_of_the_video_is_kept():
+    intervals = suspicious_intervals(_segments(0.1, 0.8, 0.9), threshold=0.65)
+    assert intervals[0]["end_s"] == 8.0 and intervals[0]["segments"] == 2
+
+
+def test_nothing_suspicious():
+    assert suspicious_intervals(_segments(0.1, 0.2), threshold=0.65) == []
+    assert suspicious_intervals([], threshold=0.65) == []
+
+
+@pytest.mark.parametrize("total_frames, fps", [(3000, 30.0), (1001, 25.0), (257, 24.0)])
+def test_windows_overlap_by_half_and_cover_the_whole_video(total_frames, fps):
+    num_frames = 10
+    grid, starts = window_grid(total_frames, fps, window_s=4.0, num_frames=num_frames)
+
+    assert grid == sorted(grid) and 0 <= grid[0] and grid[-1] < total_frames
+    assert starts[0] == 0
+    assert starts[-1] + num_frames == len(grid)  # last window aligned to the end
+    strides = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(0 < s <= num_frames // 2 for s in strides)
+    assert all(s == num_frames // 2 for s in strides[:-1])
+    # Each window spans about window_s seconds
+    span_s = (grid[num_frames - 1] - grid[0]) / fps
+    assert 3.0 <= span_s <= 4.0
+
+
+def test_short_video_is_one_window():
+    grid, starts = window_grid(total_frames=40, fps=30.0, window_s=4.0, num_frames=10)
+    assert starts == [0]
+    assert len(grid) <= 10 and grid[-1] < 40
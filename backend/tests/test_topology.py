@@ -0,0 +1,73 @@
+import pytest
+
+import topology
+from topology import claim_worker_slot, format_cores, parse_cores, plan_layout
+
+
+def test_parse_cores():
+    assert parse_cores("0-3,8, 10-11") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cores("3,1-2,2,") == [1, 2, 3]
+    assert parse_cores("") == []
+
+
+@pytest.mark.parametrize("spec", ["0", "0-3,8", "0-15,32-47", "1,3,5"])
+def test_format_cores_round_trips(spec):
+    assert format_cores(parse_cores(spec)) == spec
+
+
+@pytest.mark.parametrize("n_cores, workers", [(16, 4), (10, 3), (7, 7), (3, 8), (64, 1)])
+def test_workers_get_disjoint_contiguous_near_equal_shares(n_cores, workers):
+    cores = parse_cores("0-7,16-23,32-63")[:n_cores]  # not contiguous numbering on purpose
+    layout = plan_layout(cores, workers, split_pools=False, inference_workers=1)
+
+    assert len(layout) == min(workers, n_cores)  # never more workers than cores
+    shares = [parse_cores(w["cores"]) for w in layout]
+    assert sorted(c for share in shares for c in share) == cores
+    assert max(map(len, shares)) - min(map(len, shares)) <= 1
+    for share in shares:
+        i = cores.index(share[0])
+        assert share == cores[i : i + len(share)]
+    for w in layout:
+        assert w["inference_cores"] == w["cpu_cores"] == w["cores"]
+        assert w["intra_op_threads"] == len(parse_cores(w["cores"]))
+
+
+def test_split_pools_partition_each_workers_cores():
+    layout = plan_layout(list(range(16)), 2, split_pools=True, inference_share=0.75, inference_workers=2)
+    for w in layout:
+        mine = parse_cores(w["cores"])
+        inference, decode = parse_cores(w["inference_cores"]), parse_cores(w["cpu_cores"])
+        assert sorted(inference + decode) == mine and not set(inference) & set(decode)
+        assert (len(inference), len(decode)) == (6, 2)
+        assert w["intra_op_threads"] == 3  # 6 cores / 2 inference workers
+        assert w["cpu_workers"] == 2
+
+
+def test_split_pools_always_leave_a_core_to_each_pool():
+    for share in (0.0, 0.99, 1.0):
+        (w,) = plan_layout([0, 1], 1, split_pools=True, inference_share=share, inference_workers=1)
+        assert w["inference_cores"] and w["cpu_cores"] and w["inference_cores"] != w["cpu_cores"]
+    (single,) = plan_layout([5], 1, split_pools=True, inference_workers=1)
+    assert single["inference_cores"] == single["cpu_cores"] == "5"
+
+
+def test_worker_slots_are_claimed_in_order_and_released(tmp_path, monkeypatch):
+    monkeypatch.setattr(topology, "TOPOLOGY_LOCK_DIR", tmp_path)
+    monkeypatch.setattr(topology, "TOPOLOGY_WORKER_INDEX", None)
+    monkeypatch.setattr(topology, "_slot_file", None)
+
+    assert claim_worker_slot(2) == 0
+    first = topology._slot_file
+    assert claim_worker_slot(2) == 1
+    second = topology._slot_file
+    assert claim_worker_slot(2) == 0  # all taken: shares slot 0
+
+    first.close()  # that worker exited
+    assert claim_worker_slot(2) == 0
+    topology._slot_file.close()
+    second.close()
+
+
+def test_worker_index_override(monkeypatch):
+    monkeypatch.setattr(topology, "TOPOLOGY_WORKER_INDEX", "5")
+    assert claim_worker_slot(4) == 1
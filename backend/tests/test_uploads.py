@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+from uploads import FILE_PREFIX, UPLOAD_STALE_AGE_S, sweep_scratch_dir
+
+
+def _upload(directory, pid: int, age_s: float = 0.0):
+    path = directory / f"{FILE_PREFIX}{pid}_{uuid.uuid4().hex}.mp4"
+    path.write_bytes(b"x")
+    if age_s:
+        old = time.time() - age_s
+        os.utime(path, (old, old))
+    return path
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_sweep_removes_leftovers_of_a_restart_with_the_same_pid(tmp_path):
+    # A restarted container runs as the same pid as its crashed predecessor
+    own = _upload(tmp_path, os.getpid())
+    assert sweep_scratch_dir(tmp_path) == 1
+    assert not own.exists()
+
+
+def test_sweep_keeps_recent_uploads_of_live_workers(tmp_path):
+    live = _upload(tmp_path, os.getppid())
+    live_stale = _upload(tmp_path, os.getppid(), age_s=UPLOAD_STALE_AGE_S + 60)
+    dead = _upload(tmp_path, _dead_pid())
+    other = tmp_path / "unrelated.mp4"
+    other.write_bytes(b"x")
+
+    assert sweep_scratch_dir(tmp_path) == 2
+    assert live.exists() and other.exists()
+    assert not live_stale.exists() and not dead.exists()
@@ -0,0 +1,59 @@
+"""
+Per-segment ("timeline") scoring for long videos.
+
+A single score from FRAMES_PER_VIDEO frames says little about a 30-minute
+upload with a 10-second manipulated splice. Timeline mode slides a window of
+VIDEO_TIMELINE_WINDOW_S seconds over the whole video (windows overlap by
+half), scores every window with the video model and reports:
+
+    segments               prob_fake per window, in time order
+    suspicious_intervals   runs of consecutive windows at or above the
+                           suspicious threshold, merged and ranked by their
+                           peak prob_fake (top VIDEO_TIMELINE_TOP_K)
+
+Each window holds FRAMES_PER_VIDEO frames spread over its span, so the model
+sees clips like the ones it was trained on. Frames come from one forward
+decoding pass (iter_video_windows in the training pipeline) and windows are
+scored VIDEO_TIMELINE_BATCH at a time in one forward through the backbone
+and GRU, so memory stays bounded and cost grows linearly with duration.
+"""
+
+import os
+from typing import List
+
+# -------------------
+# CONFIG
+# -------------------
+VIDEO_TIMELINE_WINDOW_S = float(os.getenv("VIDEO_TIMELINE_WINDOW_S", "4.0"))
+VIDEO_TIMELINE_BATCH = int(os.getenv("VIDEO_TIMELINE_BATCH", "8"))        # windows per forward
+VIDEO_TIMELINE_CHUNK_FRAMES = int(os.getenv("VIDEO_TIMELINE_CHUNK_FRAMES", "32"))  # frames decoded per step
+VIDEO_TIMELINE_TOP_K = int(os.getenv("VIDEO_TIMELINE_TOP_K", "5"))
+
+
+def segment(start_frame: int, end_frame: int, fps: float, prob_fake: float) -> dict:
+    return {
+        "start_s": round(start_frame / fps, 2),
+        "end_s": round((end_frame + 1) / fps, 2),
+        "prob_fake": round(float(prob_fake), 4),
+    }
+
+
+def suspicious_intervals(segments: List[dict], threshold: float, top_k: int = VIDEO_TIMELINE_TOP_K) -> List[dict]:
+    """Merge consecutive segments with prob_fake >= threshold; highest peaks first."""
+    intervals, run = [], []
+    for seg in segments + [None]:
+        if seg is not None and seg["prob_fake"] >= threshold:
+            run.append(seg)
+            continue
+        if run:
+            probs = [s["prob_fake"] for s in run]
+            intervals.append({
+                "start_s": run[0]["start_s"],
+                "end_s": run[-1]["end_s"],
+                "peak_prob_fake": max(probs),
+                "mean_prob_fake": round(sum(probs) / len(probs), 4),
+                "segments": len(run),
+            })
+            run = []
+    intervals.sort(key=lambda i: i["peak_prob_fake"], reverse=True)
+    return intervals[:top_k]
@@ -0,0 +1,211 @@
+"""
+Startup-time CPU topology for the detection services.
+
+With several uvicorn workers on one box, every process sizes torch's
+intra-op pool, OpenCV and the executor pools to all of the cores, and they
+oversubscribe the CPU. With TOPOLOGY=auto each worker instead takes its own
+share of the cores:
+
+    cores           TOPOLOGY_CORES ("0-15,32-47"), default the process's
+                    CPU affinity (so container cpusets are respected)
+    per worker      the cores split into TOPOLOGY_WORKERS contiguous groups
+                    (default WEB_CONCURRENCY, which uvicorn --workers uses)
+    within worker   TOPOLOGY_SPLIT_POOLS=1 pins the inference pool to
+                    TOPOLOGY_INFERENCE_SHARE of the worker's cores and the cpu
+                    (decode / face detection) pool to the rest; otherwise both
+                    pools share all of them
+
+and sets the thread counts to match (executors.configure_pools): torch
+intra-op threads = inference cores / inference workers, cpu pool workers =
+decode cores, OpenCV single-threaded. TOPOLOGY_PIN=0 sets the thread counts
+only, without CPU affinity.
+
+Uvicorn does not tell a worker its index, so each worker claims the first
+free slot by locking TOPOLOGY_LOCK_DIR/slot_<i>.lock for its lifetime; a
+restarted worker takes over the slot its predecessor released.
+TOPOLOGY_WORKER_INDEX overrides the claim (e.g. one container per worker).
+
+apply_topology() runs at import in main.py, main_video.py and server.py,
+before the executor pools and models exist; with TOPOLOGY=off it applies
+THREAD_BUDGET (executors.apply_thread_budget) as before. The layout is
+reported under "topology" in /health, /health_video and /health_server;
+benchmarks/sweep_topology.py finds the best split for a box.
+"""
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from executors import INFERENCE_POOL_WORKERS, CPU_POOL_WORKERS, apply_thread_budget, configure_pools
+
+# -------------------
+# CONFIG
+# -------------------
+TOPOLOGY = os.getenv("TOPOLOGY", "off")  # off | auto
+TOPOLOGY_WORKERS = int(os.getenv("TOPOLOGY_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+TOPOLOGY_CORES = os.getenv("TOPOLOGY_CORES", "")
+TOPOLOGY_SPLIT_POOLS = os.getenv("TOPOLOGY_SPLIT_POOLS", "0") == "1"
+TOPOLOGY_INFERENCE_SHARE = float(os.getenv("TOPOLOGY_INFERENCE_SHARE", "0.75"))
+TOPOLOGY_PIN = os.getenv("TOPOLOGY_PIN", "1") == "1"
+TOPOLOGY_LOCK_DIR = Path(os.getenv("TOPOLOGY_LOCK_DIR", Path(tempfile.gettempdir()) / "detectify-topology"))
+TOPOLOGY_WORKER_INDEX = os.getenv("TOPOLOGY_WORKER_INDEX")
+
+_layout: dict = {}
+_slot_file = None  # held open (and locked) for the life of the process
+_lock = threading.Lock()
+
+
+# -------------------
+# LAYOUT
+# -------------------
+def parse_cores(spec: str) -> List[int]:
+    """ "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11] """
+    cores = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-")
+            cores.extend(range(int(lo), int(hi) + 1))
+        else:
+            cores.append(int(part))
+    return sorted(set(cores))
+
+
+def format_cores(cores) -> str:
+    """[0, 1, 2, 3, 8] -> "0-3,8" """
+    cores = sorted(cores)
+    ranges = []
+    for c in cores:
+        if ranges and c == ranges[-1][1] + 1:
+            ranges[-1][1] = c
+        else:
+            ranges.append([c, c])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def available_cores() -> List[int]:
+    if TOPOLOGY_CORES:
+        return parse_cores(TOPOLOGY_CORES)
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_layout(
+    cores: List[int],
+    workers: int,
+    split_pools: bool = TOPOLOGY_SPLIT_POOLS,
+    inference_share: float = TOPOLOGY_INFERENCE_SHARE,
+    inference_workers: int = INFERENCE_POOL_WORKERS,
+) -> List[dict]:
+    """One entry per worker: its cores, each pool's cores and the thread counts."""
+    workers = max(1, min(workers, len(cores)))
+    base, extra = divmod(len(cores), workers)
+    layout, start = [], 0
+    for i in range(workers):
+        mine = cores[start : start + base + (1 if i < extra else 0)]
+        start += len(mine)
+        if split_pools and len(mine) >= 2:
+            n_inf = min(len(mine) - 1, max(1, round(len(mine) * inference_share)))
+            inference, decode = mine[:n_inf], mine[n_inf:]
+        else:
+            inference = decode = mine
+        layout.append({
+            "worker": i,
+            "cores": format_cores(mine),
+            "inference_cores": format_cores(inference),
+            "cpu_cores": format_cores(decode),
+            "intra_op_threads": max(1, len(inference) // max(1, inference_workers)),
+            "cpu_workers": len(decode) if split_pools else min(CPU_POOL_WORKERS, len(mine)),
+        })
+    return layout
+
+
+def claim_worker_slot(workers: int) -> int:
+    """Index of the first free worker slot, held until this process exits."""
+    global _slot_file
+    if TOPOLOGY_WORKER_INDEX is not None:
+        return int(TOPOLOGY_WORKER_INDEX) % workers
+    import fcntl
+
+    TOPOLOGY_LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    for i in range(workers):
+        f = open(TOPOLOGY_LOCK_DIR / f"slot_{i}.lock", "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        _slot_file = f
+        return i
+    # More processes than slots (e.g. a second deployment on the same box):
+    # share a slot rather than refuse to start
+    print(f"⚠️ All {workers} topology slots are taken; sharing slot 0")
+    return 0
+
+
+def _pin_process(cores: List[int]):
+    """Affinity for every thread that already exists; new threads inherit it."""
+    try:
+        tids = [int(t) for t in os.listdir("/proc/self/task")]
+    except OSError:
+        tids = [0]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cores)
+        except OSError:
+            pass  # thread exited meanwhile
+
+
+# -------------------
+# STARTUP
+# -------------------
+def apply_topology() -> dict:
+    """
+    Apply TOPOLOGY to this process (idempotent; the first caller wins). Must
+    run before the executor pools are created and the models load.
+    """
+    with _lock:
+        if _layout:
+            return dict(_layout)
+        if TOPOLOGY != "auto":
+            _layout.update(mode="off", thread_budget=apply_thread_budget())
+            return dict(_layout)
+
+        cores = available_cores()
+        layout = plan_layout(cores, TOPOLOGY_WORKERS)
+        index = claim_worker_slot(len(layout))
+        mine = layout[index]
+
+        pin = TOPOLOGY_PIN and hasattr(os, "sched_setaffinity")
+        if pin:
+            _pin_process(parse_cores(mine["cores"]))
+        affinity = None
+        if pin and TOPOLOGY_SPLIT_POOLS:
+            affinity = {
+                "inference": set(parse_cores(mine["inference_cores"])),
+                "cpu": set(parse_cores(mine["cpu_cores"])),
+            }
+        configure_pools(mine["cpu_workers"], mine["intra_op_threads"], affinity, topology_worker=index)
+
+        _layout.update(
+            mode="auto",
+            workers=len(layout),
+            box_cores=format_cores(cores),
+            split_pools=TOPOLOGY_SPLIT_POOLS,
+            pinned=pin,
+            pid=os.getpid(),
+            **mine,
+        )
+        print(f"🧭 Topology worker {index + 1}/{len(layout)}: cores {mine['cores']} "
+              f"(inference {mine['inference_cores']} x{mine['intra_op_threads']} threads, "
+              f"cpu pool {mine['cpu_cores']} x{mine['cpu_workers']} workers){'' if pin else ', not pinned'}")
+        return dict(_layout)
+
+
+def topology_status() -> Optional[dict]:
+    return dict(_layout) if _layout else None
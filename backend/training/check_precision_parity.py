@@ -0,0 +1,262 @@
+"""
+Parity check of a reduced-precision / channels_last inference mode.
+
+Scores a validation set twice with the same checkpoint: the fp32 eager model
+as trained, and the eager runtime in the mode the services would run with
+IMAGE_PRECISION / VIDEO_PRECISION and *_CHANNELS_LAST (see runtimes.py). Both
+see exactly the same input tensors. The check passes when
+    - p_fake stays within --tolerance of fp32 for every input
+    - at most --max-flips verdicts flip, and at most --max-flips decisions
+      (verdict plus the title / message shown with it) change
+and the script exits 1 otherwise. Verdicts come from the services' own logic
+(verdicts.py), so for images a flip can also be to or from "filtered" or
+"suspicious". The report also has the forward latency of both, per input.
+
+    image   data_small/<--split>/{fake,real}/*.jpg, preprocessed like main.py;
+            the heuristic scores behind "filtered" are computed once per image
+    video   --videos (a folder with fake/ and real/) or the FF++ validation
+            split (default; needs kagglehub), VIDEO_N_PASSES clips per video like
+            main_video.py
+
+When the CPU has no bf16 support the mode falls back to fp32 like the
+services do, and the report says so.
+
+Run (from backend/):
+    python -m training.check_precision_parity --service image --precision bf16 --channels-last
+    python -m training.check_precision_parity --service video --videos /data/val_videos --limit 100
+"""
+
+import argparse
+import json
+import random
+import time
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from tqdm import tqdm
+
+from model_loader import load_checkpoint_model
+from runtimes import PRECISIONS, EagerRuntime, resolve_precision
+import verdicts
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+
+THRESHOLDS = {
+    "image": {
+        "deepfake_threshold": verdicts.DEEPFAKE_THRESHOLD,
+        "uncertain_band": verdicts.UNCERTAIN_BAND,
+        "filter_strong_threshold": verdicts.FILTER_STRONG_THRESHOLD,
+        "filter_medium_threshold": verdicts.FILTER_MEDIUM_THRESHOLD,
+        "filter_min_indicators": verdicts.FILTER_MIN_INDICATORS,
+    },
+    "video": {
+        "deepfake_threshold": verdicts.VIDEO_DEEPFAKE_THRESHOLD,
+        "uncertain_band": verdicts.VIDEO_UNCERTAIN_BAND,
+    },
+}
+MODEL_PATHS = {
+    "image": BASE_DIR / "models" / "image" / "image_model.pth",
+    "video": BASE_DIR / "models" / "video" / "video_best_model.pth",
+}
+DEFAULT_TOLERANCE = 0.02
+
+
+def image_decision(p_fake: float, scores) -> tuple:
+    """(verdict, title) as main.py would return them for these heuristic scores."""
+    verdict, title, _ = verdicts.build_verdict(p_fake, verdicts.looks_like_filtered(p_fake, *scores))
+    return verdict, title
+
+
+def video_decision(p_fake: float) -> tuple:
+    """(verdict, message) as main_video.py would return them."""
+    verdict, _, message = verdicts.video_verdict(p_fake)
+    return verdict, message
+
+
+def timed_p_fake(runtime, x: torch.Tensor):
+    """(p_fake per row, forward seconds)"""
+    start = time.perf_counter()
+    logits = runtime(x)
+    elapsed = time.perf_counter() - start
+    return (1.0 - torch.sigmoid(logits.view(-1))).cpu().numpy(), elapsed
+
+
+# -------------------
+# SCORING
+# -------------------
+def score_images(reference, candidate, args):
+    from heuristics import heuristic_scores
+    from image_pipeline import apply_exif_orientation, decode_image
+    from training.quantize_image_model import ImageFolderSplit
+
+    dataset = ImageFolderSplit(args.data_dir / args.split, args.limit)
+    loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=False)
+    names = [str(p) for p, _ in dataset.samples]
+    # Model-independent, so both runs share them
+    scores = []
+    for p, _ in tqdm(dataset.samples, desc="Heuristics"):
+        data = p.read_bytes()
+        scores.append(heuristic_scores(apply_exif_orientation(decode_image(data), data)))
+
+    warmup = next(iter(loader))[0]  # first-call kernel setup stays out of the latency
+    reference(warmup)
+    candidate(warmup)
+
+    p_ref, p_cand, t_ref, t_cand = [], [], 0.0, 0.0
+    for images, _ in tqdm(loader, desc="Scoring"):
+        p, t = timed_p_fake(reference, images)
+        p_ref.append(p)
+        t_ref += t
+        p, t = timed_p_fake(candidate, images)
+        p_cand.append(p)
+        t_cand += t
+    decide = lambda i, p: image_decision(p, scores[i])
+    return names, np.concatenate(p_ref), np.concatenate(p_cand), t_ref, t_cand, decide
+
+
+def video_samples(args):
+    if args.videos:
+        from training.evaluate_early_exit import folder_samples
+
+        samples = folder_samples(args.videos)
+    else:
+        from training.train_ffpp_video_model import SEED, build_video_list, download_ffpp_dataset
+
+        random.seed(SEED)
+        np.random.seed(SEED)
+        _, samples, _ = build_video_list(download_ffpp_dataset())
+    return samples[: args.limit] if args.limit else samples
+
+
+def score_videos(reference, candidate, args, device):
+    from facenet_pytorch import MTCNN
+    from training.train_ffpp_video_model import FRAMES_PER_VIDEO, IMG_SIZE, SEED, load_video_clips_face_only
+
+    mtcnn = MTCNN(image_size=IMG_SIZE[0], margin=0, keep_all=False, post_process=False, device=device)
+    warmup = torch.zeros(verdicts.VIDEO_N_PASSES, FRAMES_PER_VIDEO, 3, *IMG_SIZE)
+    reference(warmup)
+    candidate(warmup)
+
+    names, p_ref, p_cand, t_ref, t_cand = [], [], [], 0.0, 0.0
+    for i, (path, _) in enumerate(tqdm(video_samples(args), desc="Scoring")):
+        np.random.seed(SEED + i)
+        try:
+            clips = load_video_clips_face_only(path, FRAMES_PER_VIDEO, verdicts.VIDEO_N_PASSES, mtcnn)
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+        # Averaged over the passes, as main_video.py reports it
+        p, t = timed_p_fake(reference, clips)
+        p_ref.append(float(p.mean()))
+        t_ref += t
+        p, t = timed_p_fake(candidate, clips)
+        p_cand.append(float(p.mean()))
+        t_cand += t
+        names.append(str(path))
+    if not names:
+        raise RuntimeError("No video could be scored")
+    decide = lambda i, p: video_decision(p)
+    return names, np.array(p_ref), np.array(p_cand), t_ref, t_cand, decide
+
+
+# -------------------
+# MAIN
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=list(MODEL_PATHS), default="image")
+    parser.add_argument("--precision", choices=PRECISIONS, default="bf16")
+    parser.add_argument("--channels-last", action="store_true")
+    parser.add_argument("--model", type=Path, default=None, help="checkpoint (default: the service's)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="max |p_fake - fp32 p_fake|")
+    parser.add_argument("--max-flips", type=int, default=0, help="verdict flips / decision changes allowed")
+    parser.add_argument("--report", type=Path, default=None, help="default: next to the checkpoint")
+    parser.add_argument("--data-dir", type=Path, default=BASE_DIR / "data_small", help="image: data_small root")
+    parser.add_argument("--split", default="valid", help="image: data_small split")
+    parser.add_argument("--batch-size", type=int, default=16, help="image: images per forward")
+    parser.add_argument("--videos", type=Path, default=None, help="video: folder with fake/ and real/")
+    parser.add_argument("--limit", type=int, default=0, help="inputs to score (0 = all)")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model_path = args.model or MODEL_PATHS[args.service]
+    report_path = args.report or model_path.with_name("precision_report.json")
+    precision = resolve_precision(args.precision, device)
+    mode = f"{precision}{' + channels_last' if args.channels_last else ''}"
+    print(f"🔢 {args.service}: fp32 vs {mode} (requested {args.precision}) on {device}")
+
+    if args.service == "image":
+        from detectors import DeepfakeDetector as build
+    else:
+        from training.train_ffpp_video_model import VideoDeepfakeModel
+
+        build = partial(VideoDeepfakeModel, pretrained=False)
+    # Two copies: channels_last converts the module in place
+    reference = EagerRuntime(load_checkpoint_model(build, model_path, device), device)
+    candidate = EagerRuntime(load_checkpoint_model(build, model_path, device), device, precision, args.channels_last)
+
+    if args.service == "image":
+        names, p_ref, p_cand, t_ref, t_cand, decide = score_images(reference, candidate, args)
+    else:
+        names, p_ref, p_cand, t_ref, t_cand, decide = score_videos(reference, candidate, args, device)
+
+    thresholds = THRESHOLDS[args.service]
+    diff = np.abs(p_cand - p_ref)
+    d_ref = [decide(i, float(p_ref[i])) for i in range(len(names))]
+    d_cand = [decide(i, float(p_cand[i])) for i in range(len(names))]
+    verdict_flips = [i for i in range(len(names)) if d_ref[i][0] != d_cand[i][0]]
+    decision_changes = [i for i in range(len(names)) if d_ref[i] != d_cand[i]]
+    over_tolerance = [i for i in range(len(names)) if diff[i] > args.tolerance]
+    passed = not over_tolerance and len(verdict_flips) <= args.max_flips and len(decision_changes) <= args.max_flips
+
+    report = {
+        "service": args.service,
+        "model": str(model_path),
+        "requested_precision": args.precision,
+        "precision": precision,
+        "channels_last": args.channels_last,
+        "fell_back_to_fp32": precision == "fp32" and args.precision == "bf16",
+        "inputs": len(names),
+        **thresholds,
+        "tolerance": args.tolerance,
+        "max_flips": args.max_flips,
+        "passed": passed,
+        "max_abs_p_fake_diff": float(diff.max()),
+        "mean_abs_p_fake_diff": float(diff.mean()),
+        "p99_abs_p_fake_diff": float(np.percentile(diff, 99)),
+        "over_tolerance": len(over_tolerance),
+        "verdict_flips": len(verdict_flips),
+        "decision_changes": len(decision_changes),
+        "latency_ms_per_input": {
+            "fp32": round(1000.0 * t_ref / len(names), 2),
+            "candidate": round(1000.0 * t_cand / len(names), 2),
+        },
+        # Every input that failed a check, worst first
+        "mismatches": [
+            {"input": names[i], "p_fake_fp32": float(p_ref[i]), "p_fake": float(p_cand[i]),
+             "decision_fp32": " / ".join(d_ref[i]), "decision": " / ".join(d_cand[i])}
+            for i in sorted(set(over_tolerance) | set(decision_changes), key=lambda i: -diff[i])
+        ],
+    }
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2))
+
+    lat = report["latency_ms_per_input"]
+    print("\n" + "=" * 60)
+    print(f"Inputs: {len(names)} | mode: {mode}")
+    print(f"|p_fake diff| max {report['max_abs_p_fake_diff']:.4f}  mean {report['mean_abs_p_fake_diff']:.4f}  "
+          f"(tolerance {args.tolerance}, {len(over_tolerance)} over)")
+    print(f"Verdict flips: {len(verdict_flips)} | "
+          f"decision changes: {len(decision_changes)} (allowed {args.max_flips})")
+    print(f"Latency per input: fp32 {lat['fp32']:.1f} ms -> {lat['candidate']:.1f} ms "
+          f"({lat['fp32'] / max(lat['candidate'], 1e-9):.2f}x)")
+    print("=" * 60)
+    print(f"{'✅ Parity OK' if passed else '❌ Parity check failed'} | report: {report_path}")
+    raise SystemExit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Offline evaluation of early-exit ("progressive") video scoring.
+
+For every video this runs the full VIDEO_N_PASSES analysis exactly as
+main_video.py does, plus up to --max-passes progressive clips scored one at
+a time. The stopping rule (progressive.ProgressiveEstimate) is a pure
+function of the per-clip scores, so it is then replayed for each --margins
+value without touching the model again. The report shows, per margin:
+    - how often the verdict (and the verdict message) differs from the full run
+    - how often scoring stopped early, mean passes and frames used
+    - accuracy of both against the labels
+
+Videos come from a folder with fake/ and real/ subfolders (--videos), or
+from the FF++ test split used in training (default; needs kagglehub).
+
+Run (from backend/):
+    python -m training.evaluate_early_exit --videos /data/eval_videos
+    python -m training.evaluate_early_exit --limit 200 --margins 0.02,0.05,0.1
+"""
+
+import argparse
+import json
+import random
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import torch
+from facenet_pytorch import MTCNN
+from tqdm import tqdm
+
+from model_loader import load_checkpoint_model
+from progressive import EARLY_EXIT_MARGIN, EARLY_EXIT_MIN_PASSES, EARLY_EXIT_Z, ProgressiveEstimate
+from training.train_ffpp_video_model import (
+    BASE_DIR,
+    FRAMES_PER_VIDEO,
+    IMG_SIZE,
+    SEED,
+    VideoDeepfakeModel,
+    build_video_list,
+    download_ffpp_dataset,
+    iter_video_clips,
+    list_videos_in_folder,
+    load_video_clips_face_only,
+)
+from verdicts import VIDEO_DEEPFAKE_THRESHOLD, VIDEO_N_PASSES, VIDEO_UNCERTAIN_BAND, video_verdict
+
+MODEL_PATH = BASE_DIR / "models" / "video" / "video_best_model.pth"
+REPORT_PATH = MODEL_PATH.with_name("early_exit_report.json")
+
+
+def decision(prob_fake: float) -> tuple:
+    """(verdict, message) as main_video.py would return them."""
+    verdict, _, message = video_verdict(prob_fake)
+    return verdict, message
+
+
+def verdict(prob_fake: float) -> str:
+    return video_verdict(prob_fake)[0]
+
+
+# -------------------
+# DATA
+# -------------------
+def folder_samples(root: Path):
+    # fake=0, real=1 (same convention as training)
+    samples = [(p, 0) for p in list_videos_in_folder(root / "fake")]
+    samples += [(p, 1) for p in list_videos_in_folder(root / "real")]
+    if not samples:
+        raise RuntimeError(f"No videos found under {root}/{{fake,real}}")
+    return samples
+
+
+def ffpp_test_samples():
+    random.seed(SEED)
+    np.random.seed(SEED)
+    _, _, test = build_video_list(download_ffpp_dataset())
+    return test
+
+
+# -------------------
+# SCORING
+# -------------------
+def p_fake(model, clips: torch.Tensor, device) -> list:
+    with torch.no_grad():
+        p_real = torch.sigmoid(model(clips.to(device)).view(-1))
+    return (1.0 - p_real).cpu().tolist()
+
+
+def score_video(model, mtcnn, path: Path, max_passes: int, device, seed: int) -> dict:
+    np.random.seed(seed)
+    full = p_fake(model, load_video_clips_face_only(path, FRAMES_PER_VIDEO, VIDEO_N_PASSES, mtcnn), device)
+
+    np.random.seed(seed)
+    passes = []
+    for clip, face_clip, face_frames in iter_video_clips(path, FRAMES_PER_VIDEO, max_passes, mtcnn):
+        clips = clip.unsqueeze(0) if face_clip is None else torch.stack([clip, face_clip])
+        scores = p_fake(model, clips, device)
+        passes.append({
+            "p_fake_full_frames": scores[0],
+            "p_fake_faces": scores[1] if face_clip is not None else None,
+            "face_frames": face_frames,
+        })
+    return {
+        "p_fake_full": float(np.mean(full)),
+        "passes": passes,
+    }
+
+
+def replay(video: dict, margin: float, z: float, min_passes: int) -> dict:
+    """What progressive mode would have returned for this video with these settings."""
+    estimate = ProgressiveEstimate(VIDEO_DEEPFAKE_THRESHOLD, VIDEO_UNCERTAIN_BAND, margin, z, min_passes)
+    attempted = 0
+    for p in video["passes"]:
+        attempted += 1
+        estimate.add(p["p_fake_faces"], p["face_frames"])
+        if estimate.confident():
+            break
+    if estimate.passes == 0:
+        # No face anywhere: the full-frame clips are scored like the full run
+        scores = [p["p_fake_full_frames"] for p in video["passes"]]
+        return {"p_fake": float(np.mean(scores)), "passes": len(scores), "frames": len(scores) * FRAMES_PER_VIDEO,
+                "attempted": len(scores), "early": False}
+    return {"p_fake": estimate.prob_fake, "passes": estimate.passes, "frames": estimate.frames,
+            "attempted": attempted, "early": attempted < len(video["passes"])}
+
+
+def summarize(videos: list, labels: np.ndarray, margin: float, z: float, min_passes: int, max_passes: int) -> dict:
+    runs = [replay(v, margin, z, min_passes) for v in videos]
+    full = np.array([v["p_fake_full"] for v in videos])
+    prog = np.array([r["p_fake"] for r in runs])
+    is_fake = labels == 0
+
+    verdict_flips = [i for i in range(len(videos)) if verdict(full[i]) != verdict(prog[i])]
+    decision_changes = sum(decision(full[i]) != decision(prog[i]) for i in range(len(videos)))
+    return {
+        "margin": margin,
+        "z": z,
+        "min_passes": min_passes,
+        "max_passes": max_passes,
+        "verdict_agreement": 1.0 - len(verdict_flips) / len(videos),
+        "verdict_flips": len(verdict_flips),
+        "flips_to_deepfake": sum(verdict(prog[i]) == "deepfake" for i in verdict_flips),
+        "decision_changes": int(decision_changes),  # verdict or message differs
+        "early_exit_rate": float(np.mean([r["early"] for r in runs])),
+        "mean_passes_attempted": float(np.mean([r["attempted"] for r in runs])),
+        "mean_passes_scored": float(np.mean([r["passes"] for r in runs])),
+        "mean_frames_used": float(np.mean([r["frames"] for r in runs])),
+        "mean_abs_p_fake_diff": float(np.mean(np.abs(full - prog))),
+        "accuracy_full": float(np.mean((full >= 0.5) == is_fake)),
+        "accuracy_progressive": float(np.mean((prog >= 0.5) == is_fake)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=Path, default=None, help="folder with fake/ and real/ (default: FF++ test split)")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--report", type=Path, default=REPORT_PATH)
+    parser.add_argument("--limit", type=int, default=0, help="videos to evaluate (0 = all)")
+    parser.add_argument("--max-passes", type=int, default=VIDEO_N_PASSES)
+    parser.add_argument("--margins", default=f"0.02,{EARLY_EXIT_MARGIN},0.1")
+    parser.add_argument("--z", type=float, default=EARLY_EXIT_Z)
+    parser.add_argument("--min-passes", type=int, default=EARLY_EXIT_MIN_PASSES)
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    samples = folder_samples(args.videos) if args.videos else ffpp_test_samples()
+    if args.limit:
+        samples = samples[: args.limit]
+    print(f"🎞️  Evaluating {len(samples)} videos on {device}")
+
+    model = load_checkpoint_model(partial(VideoDeepfakeModel, pretrained=False), args.model, device)
+    mtcnn = MTCNN(image_size=IMG_SIZE[0], margin=0, keep_all=False, post_process=False, device=device)
+
+    videos, labels = [], []
+    for i, (path, label) in enumerate(tqdm(samples, desc="Scoring")):
+        try:
+            videos.append(score_video(model, mtcnn, path, args.max_passes, device, SEED + i))
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+        videos[-1]["path"] = str(path)
+        labels.append(label)
+    if not videos:
+        raise RuntimeError("No video could be scored")
+    labels = np.array(labels)
+
+    margins = [float(m) for m in args.margins.split(",")]
+    results = [summarize(videos, labels, m, args.z, args.min_passes, args.max_passes) for m in margins]
+    report = {
+        "videos": len(videos),
+        "deepfake_threshold": VIDEO_DEEPFAKE_THRESHOLD,
+        "uncertain_band": VIDEO_UNCERTAIN_BAND,
+        "full_passes": VIDEO_N_PASSES,
+        "frames_per_video": FRAMES_PER_VIDEO,
+        "results": results,
+        "per_video": videos,
+    }
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    args.report.write_text(json.dumps(report, indent=2))
+
+    print("\n" + "=" * 78)
+    print(f"{'margin':>8}{'agree':>9}{'flips':>7}{'changed':>9}{'early':>8}{'passes':>8}{'frames':>8}{'acc full/prog':>19}")
+    for r in results:
+        print(f"{r['margin']:>8.3f}{r['verdict_agreement']*100:>8.2f}%{r['verdict_flips']:>7}"
+              f"{r['decision_changes']:>9}{r['early_exit_rate']*100:>7.1f}%{r['mean_passes_attempted']:>8.2f}"
+              f"{r['mean_frames_used']:>8.1f}{r['accuracy_full']*100:>11.2f}%/{r['accuracy_progressive']*100:.2f}%")
+    print("=" * 78)
+    print(f"✅ Report: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Export the image and video detectors to TorchScript and ONNX.
+
+For each model this writes, next to its .pth checkpoint:
+    <name>.ts.pt   traced TorchScript module
+    <name>.onnx    ONNX graph (dynamic batch axis) for ONNX Runtime
+
+and then checks numerical parity of both artifacts against the eager model
+on random inputs of several batch sizes. The exit code is non-zero if any
+artifact drifts by more than --atol in logit space.
+
+Run (from backend/):
+    python -m training.export_models
+    python -m training.export_models --only image --formats onnx
+"""
+
+import argparse
+import inspect
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+
+IMAGE_MODEL_PATH = BASE_DIR / "models" / "image" / "image_model.pth"
+VIDEO_MODEL_PATH = BASE_DIR / "models" / "video" / "video_best_model.pth"
+
+ONNX_OPSET = 17
+PARITY_BATCH_SIZES = (1, 3)
+
+
+def load_image_model(path: Path) -> torch.nn.Module:
+    from detectors import DeepfakeDetector
+
+    model = DeepfakeDetector()
+    model.load_state_dict(torch.load(path, map_location="cpu"))
+    return model.eval()
+
+
+def load_video_model(path: Path) -> torch.nn.Module:
+    from training.train_ffpp_video_model import VideoDeepfakeModel
+
+    model = VideoDeepfakeModel(pretrained=False)
+    model.load_state_dict(torch.load(path, map_location="cpu"))
+    return model.eval()
+
+
+def export_torchscript(model, example, out_path: Path):
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example, check_trace=False)
+    traced.save(str(out_path))
+    print(f"✅ TorchScript: {out_path}")
+
+
+def export_onnx(model, example, out_path: Path, dynamic_axes: dict):
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # classic tracing exporter, no onnxscript needed
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            example,
+            str(out_path),
+            input_names=["input"],
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+            **kwargs,
+        )
+    print(f"✅ ONNX:        {out_path}")
+
+
+def check_parity(model, artifacts: dict, make_input, atol: float) -> bool:
+    """Compare every exported artifact to the eager model; return True if all match."""
+    from runtimes import OnnxRuntime, TorchScriptRuntime
+
+    ok = True
+    for kind, path in artifacts.items():
+        runtime = (
+            TorchScriptRuntime(path, torch.device("cpu"))
+            if kind == "torchscript"
+            else OnnxRuntime(path)
+        )
+        for bs in PARITY_BATCH_SIZES:
+            x = make_input(bs)
+            with torch.no_grad():
+                ref = model(x).view(-1).numpy()
+            out = runtime(x).view(-1).numpy()
+
+            diff = float(np.max(np.abs(ref - out)))
+            p_diff = float(np.max(np.abs(1 / (1 + np.exp(-ref)) - 1 / (1 + np.exp(-out)))))
+            passed = diff <= atol
+            ok = ok and passed
+            status = "✅" if passed else "❌"
+            print(
+                f"   {status} {kind:<11} batch={bs}: max |Δlogit|={diff:.2e}, "
+                f"max |Δp|={p_diff:.2e}"
+            )
+    return ok
+
+
+def export_one(name: str, model, make_input, dynamic_axes: dict, checkpoint: Path, formats, atol: float) -> bool:
+    print(f"\n=== {name} ({checkpoint.name}) ===")
+    example = make_input(1)
+    artifacts = {}
+
+    if "torchscript" in formats:
+        path = checkpoint.with_name(checkpoint.stem + ".ts.pt")
+        export_torchscript(model, example, path)
+        artifacts["torchscript"] = path
+    if "onnx" in formats:
+        path = checkpoint.with_name(checkpoint.stem + ".onnx")
+        export_onnx(model, example, path, dynamic_axes)
+        artifacts["onnx"] = path
+
+    print("🔎 Parity vs eager:")
+    return check_parity(model, artifacts, make_input, atol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=["image", "video"], help="export just one model")
+    parser.add_argument("--formats", nargs="+", default=["torchscript", "onnx"], choices=["torchscript", "onnx"])
+    parser.add_argument("--image-model", type=Path, default=IMAGE_MODEL_PATH)
+    parser.add_argument("--video-model", type=Path, default=VIDEO_MODEL_PATH)
+    parser.add_argument("--atol", type=float, default=1e-3, help="max allowed |logit| difference")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    ok = True
+
+    if args.only in (None, "image"):
+        from detectors import IMG_SIZE
+
+        ok &= export_one(
+            "Image detector",
+            load_image_model(args.image_model),
+            lambda bs: torch.randn(bs, 3, *IMG_SIZE),
+            {"input": {0: "batch"}, "logits": {0: "batch"}},
+            args.image_model,
+            args.formats,
+            args.atol,
+        )
+
+    if args.only in (None, "video"):
+        from training.train_ffpp_video_model import FRAMES_PER_VIDEO, IMG_SIZE as VIDEO_IMG_SIZE
+
+        ok &= export_one(
+            "Video detector",
+            load_video_model(args.video_model),
+            lambda bs: torch.randn(bs, FRAMES_PER_VIDEO, 3, *VIDEO_IMG_SIZE),
+            {"input": {0: "batch", 1: "frames"}, "logits": {0: "batch"}},
+            args.video_model,
+            args.formats,
+            args.atol,
+        )
+
+    if not ok:
+        print("\n❌ Parity check failed")
+        sys.exit(1)
+    print("\n🎉 All artifacts match the eager models")
+
+
+if __name__ == "__main__":
+    main()
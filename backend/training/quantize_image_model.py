@@ -0,0 +1,260 @@
+"""
+INT8 post-training quantization of the image detector.
+
+Calibrates on the data_small/valid split (see train_deepfake_detector.py),
+produces an INT8 DeepfakeDetector and writes an FP32-vs-INT8 report on the
+test split: accuracy, ROC AUC, verdict agreement at DEEPFAKE_THRESHOLD,
+batch-1 CPU latency and serialized model size.
+
+Modes:
+    static   FX graph-mode static quantization (conv + linear in INT8,
+             activations calibrated on real images). Default.
+    dynamic  dynamic quantization of the Linear head only (no calibration,
+             small gain; useful as a safe baseline).
+
+The result is saved as a frozen TorchScript module that main.py serves with
+IMAGE_RUNTIME=int8:
+    models/image/image_model.int8.ts.pt
+    models/image/quantization_report.json
+
+Run (from backend/):
+    python -m training.quantize_image_model
+    python -m training.quantize_image_model --mode dynamic --eval-limit 500
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Dataset
+from tqdm import tqdm
+
+from verdicts import DEEPFAKE_THRESHOLD  # the image service's
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # -> backend/
+SMALL_BASE = BASE_DIR / "data_small"
+MODEL_PATH = BASE_DIR / "models" / "image" / "image_model.pth"
+OUT_PATH = MODEL_PATH.with_name("image_model.int8.ts.pt")
+REPORT_PATH = MODEL_PATH.with_name("quantization_report.json")
+
+LATENCY_WARMUP = 3  # TorchScript optimizes the graph over the first few runs
+LATENCY_ITERS = 20
+
+
+def pick_engine() -> str:
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            return engine
+    raise RuntimeError(f"No INT8 quantization engine available (have {engines})")
+
+
+# -------------------
+# DATA (serving preprocessing, not torchvision)
+# -------------------
+class ImageFolderSplit(Dataset):
+    """data_small/<split>/{fake,real}/*.jpg, preprocessed exactly like main.py."""
+
+    def __init__(self, split_dir: Path, limit: int = 0):
+        from image_pipeline import normalize_into, prepare_image
+        from detectors import IMG_SIZE
+
+        self._prepare = lambda b: prepare_image(b, IMG_SIZE)[1]
+        self._normalize = normalize_into
+        self.img_size = IMG_SIZE
+
+        # fake=0, real=1 (same convention as training)
+        self.samples = []
+        for label, class_name in enumerate(["fake", "real"]):
+            for p in sorted((split_dir / class_name).glob("*.jpg")):
+                self.samples.append((p, label))
+        if limit:
+            rng = np.random.default_rng(0)
+            idx = rng.permutation(len(self.samples))[:limit]
+            self.samples = [self.samples[i] for i in sorted(idx)]
+        if not self.samples:
+            raise RuntimeError(f"No images found under {split_dir}")
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        path, label = self.samples[idx]
+        resized = self._prepare(path.read_bytes())
+        out = np.empty((3, *self.img_size), dtype=np.float32)
+        self._normalize(resized, out)
+        return torch.from_numpy(out), torch.tensor(label, dtype=torch.float32)
+
+
+# -------------------
+# QUANTIZATION
+# -------------------
+def load_fp32(path: Path) -> nn.Module:
+    from detectors import DeepfakeDetector
+
+    model = DeepfakeDetector()
+    model.load_state_dict(torch.load(path, map_location="cpu"))
+    return model.eval()
+
+
+def quantize_static(model: nn.Module, calib_loader, engine: str, example: torch.Tensor) -> nn.Module:
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), (example,))
+    with torch.no_grad():
+        for images, _ in tqdm(calib_loader, desc="Calibrating"):
+            prepared(images)
+    return convert_fx(prepared)
+
+
+def quantize_dynamic(model: nn.Module) -> nn.Module:
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def to_torchscript(model: nn.Module, example: torch.Tensor):
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example, check_trace=False)
+    return torch.jit.freeze(traced.eval())
+
+
+# -------------------
+# EVALUATION
+# -------------------
+def predict_p_fake(model, loader, desc: str):
+    probs, labels = [], []
+    with torch.no_grad():
+        for images, lbl in tqdm(loader, desc=desc):
+            p_real = torch.sigmoid(model(images).view(-1))
+            probs.append((1.0 - p_real).numpy())
+            labels.append(lbl.numpy())
+    return np.concatenate(probs), np.concatenate(labels)
+
+
+def classification_metrics(p_fake: np.ndarray, labels: np.ndarray) -> dict:
+    from sklearn.metrics import roc_auc_score
+
+    is_fake = labels == 0
+    return {
+        "accuracy": float(np.mean((p_fake >= 0.5) == is_fake)),
+        "auc": float(roc_auc_score(is_fake, p_fake)),
+        "deepfake_rate": float(np.mean(p_fake >= DEEPFAKE_THRESHOLD)),
+    }
+
+
+def latency_ms(model, example: torch.Tensor) -> dict:
+    times = []
+    with torch.no_grad():
+        for _ in range(LATENCY_WARMUP):
+            model(example)
+        for _ in range(LATENCY_ITERS):
+            start = time.perf_counter()
+            model(example)
+            times.append(1000.0 * (time.perf_counter() - start))
+    times = np.array(times)
+    return {
+        "mean": round(float(times.mean()), 2),
+        "p50": round(float(np.percentile(times, 50)), 2),
+        "p95": round(float(np.percentile(times, 95)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH)
+    parser.add_argument("--out", type=Path, default=OUT_PATH)
+    parser.add_argument("--report", type=Path, default=REPORT_PATH)
+    parser.add_argument("--data-dir", type=Path, default=SMALL_BASE)
+    parser.add_argument("--calib-split", default="valid")
+    parser.add_argument("--calib-limit", type=int, default=512, help="calibration images (0 = all)")
+    parser.add_argument("--eval-split", default="test")
+    parser.add_argument("--eval-limit", type=int, default=0, help="evaluation images (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    engine = pick_engine()
+    torch.backends.quantized.engine = engine
+    print(f"🔧 Quantization engine: {engine} | mode: {args.mode}")
+
+    from detectors import IMG_SIZE
+    example = torch.randn(1, 3, *IMG_SIZE)
+
+    fp32 = load_fp32(args.model)
+
+    if args.mode == "static":
+        calib_ds = ImageFolderSplit(args.data_dir / args.calib_split, args.calib_limit)
+        calib_dl = DataLoader(calib_ds, batch_size=args.batch_size, shuffle=False)
+        int8 = quantize_static(load_fp32(args.model), calib_dl, engine, example)
+    else:
+        int8 = quantize_dynamic(load_fp32(args.model))
+
+    int8_ts = to_torchscript(int8, example)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    torch.jit.save(int8_ts, str(args.out), _extra_files={"quant_engine": engine})
+    print(f"✅ Saved INT8 model: {args.out}")
+
+    # Reload the artifact exactly as main.py serves it (IMAGE_RUNTIME=int8).
+    # Latency is measured first, before other batch sizes reshape the graph.
+    from runtimes import Int8Runtime
+    served = Int8Runtime(args.out)
+    lat32 = latency_ms(fp32, example)
+    lat8 = latency_ms(served, example)
+
+    # Evaluate both on the same images
+    eval_ds = ImageFolderSplit(args.data_dir / args.eval_split, args.eval_limit)
+    eval_dl = DataLoader(eval_ds, batch_size=args.batch_size, shuffle=False)
+    p32, labels = predict_p_fake(fp32, eval_dl, "FP32")
+    p8, _ = predict_p_fake(served, eval_dl, "INT8")
+
+    verdict32 = p32 >= DEEPFAKE_THRESHOLD
+    verdict8 = p8 >= DEEPFAKE_THRESHOLD
+
+    report = {
+        "mode": args.mode,
+        "engine": engine,
+        "eval_split": args.eval_split,
+        "eval_images": int(len(labels)),
+        "calib_split": args.calib_split if args.mode == "static" else None,
+        "calib_images": len(calib_ds) if args.mode == "static" else 0,
+        "deepfake_threshold": DEEPFAKE_THRESHOLD,
+        "fp32": {
+            **classification_metrics(p32, labels),
+            "latency_ms": lat32,
+            "size_mb": round(os.path.getsize(args.model) / 1e6, 2),
+        },
+        "int8": {
+            **classification_metrics(p8, labels),
+            "latency_ms": lat8,
+            "size_mb": round(os.path.getsize(args.out) / 1e6, 2),
+        },
+        "verdict_agreement": float(np.mean(verdict32 == verdict8)),
+        "verdict_flips": int(np.sum(verdict32 != verdict8)),
+        "mean_abs_p_fake_diff": float(np.mean(np.abs(p32 - p8))),
+        "max_abs_p_fake_diff": float(np.max(np.abs(p32 - p8))),
+    }
+    args.report.write_text(json.dumps(report, indent=2))
+
+    f, q = report["fp32"], report["int8"]
+    print("\n" + "=" * 60)
+    print(f"{'':<22}{'FP32':>14}{'INT8':>14}")
+    print(f"{'Accuracy':<22}{f['accuracy']*100:>13.2f}%{q['accuracy']*100:>13.2f}%")
+    print(f"{'AUC':<22}{f['auc']:>14.4f}{q['auc']:>14.4f}")
+    print(f"{'Latency p50 (ms)':<22}{f['latency_ms']['p50']:>14.1f}{q['latency_ms']['p50']:>14.1f}")
+    print(f"{'Size (MB)':<22}{f['size_mb']:>14.1f}{q['size_mb']:>14.1f}")
+    print(f"Verdict agreement @ {DEEPFAKE_THRESHOLD}: {report['verdict_agreement']*100:.2f}% "
+          f"({report['verdict_flips']} flips)")
+    print("=" * 60)
+    print(f"✅ Report: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,12 @@ Run:
     python train_ffpp_video_model.py
 """
 
+import bisect
 import os
 import random
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import cv2
@@ -27,9 +29,8 @@ from torch.utils.data import Dataset, DataLoader
 from torchvision import transforms
 import timm
 from facenet_pytorch import MTCNN
-import kagglehub
-from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
+# kagglehub, sklearn and matplotlib are imported where used: the API imports
+# this module for the model and frame loader and should not pay for them
 
 # Set KaggleHub Cache
 os.environ["KAGGLEHUB_CACHE"] = "D:/FYP/KaggleHub"
@@ -62,7 +63,6 @@ LR_STAGE2 = 1e-4                # Increased from 1e-6 to 1e-4
 
 BASE_DIR = Path(__file__).resolve().parent.parent   
 EXPORT_DIR = BASE_DIR / "models" / "video"
-EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 
 FAKE_FOLDERS = [
     "DeepFakeDetection", "Deepfakes", "Face2Face", 
@@ -88,6 +88,8 @@ def get_device():
     return device
 
 def download_ffpp_dataset() -> Path:
+    import kagglehub
+
     print("⬇️  Checking FaceForensics++ Dataset...")
     path = kagglehub.dataset_download("xdxd003/ff-c23")
     dataset_root = Path(path)
@@ -162,53 +164,448 @@ def sample_frame_indices(num_frames: int, num_samples: int) -> List[int]:
     
     return indices.tolist()
 
-def load_video_frames_face_only(video_path: Path, num_frames: int, mtcnn: MTCNN, transform: transforms.Compose) -> torch.Tensor:
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened(): raise RuntimeError(f"Cannot open {video_path}")
-
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    if total_frames <= 0: total_frames = num_frames
+def _no_stage(name: str):
+    return nullcontext()
+
+# ------------------ FRAME READING ------------------
+# A seek decodes from the keyframe before the target; OpenCV also backs off a
+# few frames before that. Scanning forward with grab() decodes every frame in
+# between but skips the colour conversion. Pick whichever decodes less.
+ASSUMED_KEYFRAME_INTERVAL = 250  # x264 default GOP, used when keyframes are unknown
+SEEK_OVERHEAD_FRAMES = 16
+
+def probe_keyframes(video_path: Path) -> Optional[Tuple[List[int], int]]:
+    """
+    (keyframe indices, true frame count) from a packet-only pass that demuxes
+    without decoding, or None if the backend cannot report keyframes.
+    """
+    if not hasattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME"): return None
+    cap = cv2.VideoCapture(str(video_path), cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    try:
+        if not cap.isOpened() or cap.get(cv2.CAP_PROP_FORMAT) != -1: return None
+        keyframes, count = [], 0
+        while cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME): keyframes.append(count)
+            count += 1
+    finally:
+        cap.release()
+    return (keyframes, count) if keyframes else None
+
+def count_frames(cap: cv2.VideoCapture) -> int:
+    """Count by grab()-ing to the end (no colour conversion), then rewind."""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    count = 0
+    while cap.grab(): count += 1
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return count
+
+def _should_seek(pos: int, idx: int, keyframes: Optional[List[int]]) -> bool:
+    if idx < pos: return True
+    scan_cost = idx - pos
+    if keyframes:
+        k = keyframes[max(0, bisect.bisect_right(keyframes, idx) - 1)]
+        if k <= pos: return False  # no keyframe in between: a seek cannot skip anything
+        seek_cost = idx - k + SEEK_OVERHEAD_FRAMES
+    else:
+        seek_cost = ASSUMED_KEYFRAME_INTERVAL // 2 + SEEK_OVERHEAD_FRAMES
+    return seek_cost < scan_cost
+
+def read_frames(cap: cv2.VideoCapture, indices, keyframes: Optional[List[int]] = None) -> Dict[int, np.ndarray]:
+    """
+    Decode each distinct frame index once, in order, advancing with grab()
+    and only retrieve()-ing wanted frames; long gaps are crossed with a seek
+    when that decodes fewer frames. Unreadable indices are left out.
+    """
+    frames = {}
+    pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))  # index of the next frame grab() returns
+    for idx in sorted(set(int(i) for i in indices)):
+        if _should_seek(pos, idx, keyframes):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            pos = idx
+        while pos < idx and cap.grab(): pos += 1
+        if pos < idx or not cap.grab(): break  # past the real end of the stream
+        pos += 1
+        ret, frame = cap.retrieve()
+        if ret:
+            frames[idx] = frame
+    return frames
+
+def read_frames_seeking(cap: cv2.VideoCapture, indices) -> Dict[int, np.ndarray]:
+    """Previous reader: one seek per index (kept for benchmarks/bench_video_reader.py)."""
+    frames = {}
+    for idx in sorted(set(int(i) for i in indices)):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ret, frame = cap.read()
+        if ret:
+            frames[idx] = frame
+    return frames
 
-    indices = sample_frame_indices(total_frames, num_frames)
-    frames = []
+def face_tensor(frame_bgr: np.ndarray, mtcnn: MTCNN, transform: transforms.Compose) -> torch.Tensor:
+    frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+    pil_img = Image.fromarray(frame_rgb)
 
-    for idx in indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
-        ret, frame = cap.read()
-        if not ret:
-            if len(frames) > 0: frames.append(frames[-1])
+    # Detect face
+    face = mtcnn(pil_img)
+    
+    # Robust Logic: Use full frame if face fails, or resize logic
+    if face is None:
+        # Resize full frame to IMG_SIZE directly if no face found
+        img_for_transform = pil_img.resize(IMG_SIZE)
+        img_t = transforms.ToTensor()(img_for_transform)
+        img_t = transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])(img_t)
+    else:
+        # MTCNN returns a tensor, we need to ensure it's PIL for transform or just use it
+        face_pil = transforms.ToPILImage()(face)
+        img_t = transform(face_pil)
+    return img_t
+
+# ------------------ BATCHED FACE EXTRACTION ------------------
+MTCNN_BATCH_SIZE = 8  # frames per MTCNN call; bounds the image-pyramid memory
+IMAGENET_MEAN = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+IMAGENET_STD = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+
+def detect_face_boxes(frames_rgb: List[np.ndarray], mtcnn: MTCNN) -> List[Optional[np.ndarray]]:
+    """One box (MTCNN's own selection) or None per frame, detected in batches."""
+    boxes = []
+    for start in range(0, len(frames_rgb), MTCNN_BATCH_SIZE):
+        chunk = frames_rgb[start : start + MTCNN_BATCH_SIZE]
+        if any(f.shape != chunk[0].shape for f in chunk):
+            # MTCNN batches need equal sizes; fall back to one frame at a time
+            for f in chunk:
+                boxes.extend(detect_face_boxes([f], mtcnn))
             continue
-        
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(frame_rgb)
+        batch = np.stack(chunk)
+        batch_boxes, batch_probs, batch_points = mtcnn.detect(batch, landmarks=True)
+        for frame, b, p, pts in zip(chunk, batch_boxes, batch_probs, batch_points):
+            if b is None:
+                boxes.append(None)
+                continue
+            # Per frame: select_boxes cannot stack a batch mixing None and boxes
+            img = Image.fromarray(frame) if mtcnn.selection_method == "center_weighted_size" else frame
+            b, _, _ = mtcnn.select_boxes(b, p, pts, img, method=mtcnn.selection_method)
+            boxes.append(np.asarray(b).reshape(-1)[:4].astype(np.float64))
+    return boxes
+
+def crop_face(frame_rgb: np.ndarray, box: np.ndarray, size: int) -> np.ndarray:
+    """
+    Same crop + resample as MTCNN.extract (margin=0) on a PIL image, taken
+    straight from the array: (size, size, 3) uint8.
+    """
+    h, w = frame_rgb.shape[:2]
+    x1, y1 = int(max(box[0], 0)), int(max(box[1], 0))
+    x2, y2 = int(min(box[2], w)), int(min(box[3], h))
+    crop = Image.fromarray(frame_rgb[y1:y2, x1:x2])
+    return np.asarray(crop.resize((size, size), Image.BILINEAR))
+
+# ------------------ FACE TRACKING ------------------
+# Detect-then-track: MTCNN runs on a few anchor frames per scene; boxes for
+# the sampled frames in between are interpolated from the bracketing anchors
+# and accepted only if the crop still looks like the anchor faces.
+TRACK_ANCHOR_EVERY = 4        # every Nth sampled frame of a scene is an anchor
+TRACK_MIN_SIMILARITY = 0.6    # normalized cross-correlation vs. the anchor face crops
+TRACK_MAX_SCALE_CHANGE = 1.5  # bracketing anchor boxes may differ in width/height by this factor
+SCENE_CUT_MIN_CORREL = 0.5    # HSV histogram correlation between consecutive sampled frames
+TRACK_PATCH = 32
+
+def _scene_hist(frame_rgb: np.ndarray) -> np.ndarray:
+    small = cv2.resize(frame_rgb, (64, 64), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_RGB2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, [16, 16], [0, 180, 0, 256])
+    return cv2.normalize(hist, hist).flatten()
+
+def _face_patch(frame_rgb: np.ndarray, box: np.ndarray) -> Optional[np.ndarray]:
+    h, w = frame_rgb.shape[:2]
+    x1, y1 = int(max(box[0], 0)), int(max(box[1], 0))
+    x2, y2 = int(min(box[2], w)), int(min(box[3], h))
+    if x2 - x1 < 2 or y2 - y1 < 2: return None
+    gray = cv2.cvtColor(frame_rgb[y1:y2, x1:x2], cv2.COLOR_RGB2GRAY)
+    return cv2.resize(gray, (TRACK_PATCH, TRACK_PATCH), interpolation=cv2.INTER_AREA)
+
+def _patch_similarity(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
+    if a is None or b is None: return -1.0
+    return float(cv2.matchTemplate(a, b, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+def _similar_size(a: np.ndarray, b: np.ndarray) -> bool:
+    wa, ha, wb, hb = a[2] - a[0], a[3] - a[1], b[2] - b[0], b[3] - b[1]
+    if min(wa, ha, wb, hb) <= 0: return False
+    return max(wa / wb, wb / wa, ha / hb, hb / ha) <= TRACK_MAX_SCALE_CHANGE
+
+def _box_iou(a: np.ndarray, b: np.ndarray) -> float:
+    iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def detect_face_boxes_tracked(frames_rgb: List[np.ndarray], frame_indices: List[int], mtcnn: MTCNN) -> List[Optional[np.ndarray]]:
+    """
+    Same result type as detect_face_boxes() for frames in video order, with
+    MTCNN on anchors only: the first and last frame of every scene (a scene
+    cut starts a new one) and every TRACK_ANCHOR_EVERY-th frame in between.
+    Other frames get the box interpolated between their two anchors; they are
+    detected after all when an anchor has no face while the other has one,
+    when the anchor boxes differ a lot in size (zoom, another face) or when
+    the interpolated crop does not match the anchor faces. Frames between two
+    face-less anchors are taken to have no face.
+    """
+    n = len(frames_rgb)
+    if n <= 2: return detect_face_boxes(frames_rgb, mtcnn)
+
+    # Scene cuts between consecutive sampled frames
+    hists = [_scene_hist(f) for f in frames_rgb]
+    scene = [0] * n
+    for i in range(1, n):
+        cut = cv2.compareHist(hists[i - 1], hists[i], cv2.HISTCMP_CORREL) < SCENE_CUT_MIN_CORREL
+        scene[i] = scene[i - 1] + int(cut)
+
+    anchors, pos = [], 0
+    for i in range(n):
+        pos = 0 if i == 0 or scene[i] != scene[i - 1] else pos + 1
+        last_in_scene = i == n - 1 or scene[i + 1] != scene[i]
+        if pos % TRACK_ANCHOR_EVERY == 0 or last_in_scene: anchors.append(i)
+
+    boxes: List[Optional[np.ndarray]] = [None] * n
+    for i, box in zip(anchors, detect_face_boxes([frames_rgb[i] for i in anchors], mtcnn)):
+        boxes[i] = box
+    patches = {i: _face_patch(frames_rgb[i], boxes[i]) for i in anchors if boxes[i] is not None}
+
+    redetect = []
+    for i in range(n):
+        k = bisect.bisect_left(anchors, i)
+        if anchors[k] == i: continue
+        prev, nxt = anchors[k - 1], anchors[k]  # same scene: scenes start and end on anchors
+        bp, bn = boxes[prev], boxes[nxt]
+        if bp is None and bn is None: continue
+        if bp is None or bn is None or not _similar_size(bp, bn):
+            redetect.append(i)
+            continue
+        t = (frame_indices[i] - frame_indices[prev]) / max(1, frame_indices[nxt] - frame_indices[prev])
+        box = bp + t * (bn - bp)
+        patch = _face_patch(frames_rgb[i], box)
+        if max(_patch_similarity(patch, patches.get(prev)), _patch_similarity(patch, patches.get(nxt))) < TRACK_MIN_SIMILARITY:
+            redetect.append(i)
+        else:
+            boxes[i] = box
+
+    for i, box in zip(redetect, detect_face_boxes([frames_rgb[i] for i in redetect], mtcnn)):
+        boxes[i] = box
+    return boxes
+
+def extract_faces(frames_bgr: List[np.ndarray], mtcnn: MTCNN, return_found: bool = False, track_indices: Optional[List[int]] = None, stage=None):
+    """
+    Batched equivalent of face_tensor() over many frames: (N, C, H, W)
+    normalized tensor, bit-identical to the per-frame path it replaces.
+    return_found=True also returns which frames had a face (the others hold
+    the resized full frame). track_indices (the frames' positions in the
+    video, ascending) switches to detect-then-track, which runs MTCNN on a
+    subset of the frames only. stage(name), when given, wraps face detection
+    ("face_detect") and cropping/normalisation ("preprocess"), e.g. to time them.
+    """
+    stage = stage or _no_stage
+    frames_rgb = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames_bgr]
+    with stage("face_detect"):
+        if track_indices is not None:
+            boxes = detect_face_boxes_tracked(frames_rgb, track_indices, mtcnn)
+        else:
+            boxes = detect_face_boxes(frames_rgb, mtcnn)
 
-        # Detect face
-        face = mtcnn(pil_img)
-        
-        # Robust Logic: Use full frame if face fails, or resize logic
-        if face is None:
+    with stage("preprocess"):
+        return _crop_and_normalize(frames_rgb, boxes, return_found)
+
+def _crop_and_normalize(frames_rgb: List[np.ndarray], boxes: list, return_found: bool):
+    out = np.empty((len(frames_rgb), IMG_SIZE[0], IMG_SIZE[1], 3), dtype=np.uint8)
+    for i, (rgb, box) in enumerate(zip(frames_rgb, boxes)):
+        if box is None:
             # Resize full frame to IMG_SIZE directly if no face found
-            img_for_transform = pil_img.resize(IMG_SIZE)
-            img_t = transforms.ToTensor()(img_for_transform)
-            img_t = transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])(img_t)
+            out[i] = np.asarray(Image.fromarray(rgb).resize(IMG_SIZE))
         else:
-            # MTCNN returns a tensor, we need to ensure it's PIL for transform or just use it
-            face_pil = transforms.ToPILImage()(face)
-            img_t = transform(face_pil)
-
-        frames.append(img_t)
+            # The model was trained on faces passed through ToPILImage() as a
+            # 0-255 float tensor, which wraps every value v to (-v) mod 256.
+            # Reproduce that exactly so inference matches training.
+            np.negative(crop_face(rgb, box, IMG_SIZE[0]), out=out[i])
+
+    # ToTensor + Normalize for the whole stack at once
+    x = torch.from_numpy(out).permute(0, 3, 1, 2).float().div_(255)
+    x = x.sub_(IMAGENET_MEAN).div_(IMAGENET_STD).contiguous()
+    if return_found:
+        return x, [box is not None for box in boxes]
+    return x
+
+def clip_frame_keys(indices: List[int], faces: Dict[int, torch.Tensor], num_frames: int) -> List[int]:
+    """
+    Which decoded frame fills each slot of assemble_clip(indices, faces, ...):
+    missing frames repeat the previous one, -1 is a black frame.
+    """
+    keys = []
+    for idx in indices:
+        if idx not in faces:
+            if len(keys) > 0: keys.append(keys[-1])
+            continue
+        keys.append(idx)
 
-    cap.release()
-    
     # Padding if video was too short/corrupt
-    while len(frames) < num_frames:
-        if len(frames) > 0: frames.append(frames[-1])
-        else: return torch.zeros((num_frames, 3, IMG_SIZE[0], IMG_SIZE[1])) # Return black frames if total fail
+    while len(keys) < num_frames:
+        if len(keys) > 0: keys.append(keys[-1])
+        else: return [-1] * num_frames # Black frames if total fail
+
+    return keys[:num_frames]
+
+def assemble_clip(indices: List[int], faces: Dict[int, torch.Tensor], num_frames: int) -> torch.Tensor:
+    keys = clip_frame_keys(indices, faces, num_frames)
+    if keys[0] == -1: return torch.zeros((num_frames, 3, IMG_SIZE[0], IMG_SIZE[1]))
+    return torch.stack([faces[k] for k in keys], dim=0)
+
+def open_video(video_path: Path, num_frames: int):
+    """(cap, keyframes or None, total frame count) for an opened video."""
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened(): raise RuntimeError(f"Cannot open {video_path}")
+
+    try:
+        # Container frame counts can be wrong or missing; the packet probe's is exact
+        probe = probe_keyframes(video_path)
+        keyframes, total_frames = probe if probe else (None, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        if total_frames <= 0: total_frames = count_frames(cap)
+        if total_frames <= 0: total_frames = num_frames
+    except BaseException:
+        cap.release()
+        raise
+    return cap, keyframes, total_frames
+
+def iter_video_clips(video_path: Path, num_frames: int, num_passes: int, mtcnn: MTCNN, track: bool = False, return_keys: bool = False, stage=None):
+    """
+    One jittered sampling at a time, for early exit: yields
+    (clip, face_clip, face_frames) where clip is what the full run would use,
+    face_clip is built from face frames only (None when no sampled frame had
+    a face) and face_frames counts those frames. Frames already decoded for
+    an earlier pass are reused. track=True uses detect-then-track.
+    return_keys=True appends the clip_frame_keys() of clip and face_clip.
+    stage as in extract_faces(); frame reading is the "decode" stage.
+    """
+    stage = stage or _no_stage
+    with stage("decode"):
+        cap, keyframes, total_frames = open_video(video_path, num_frames)
+    seen: Dict[int, Tuple[torch.Tensor, bool]] = {}
+    try:
+        for _ in range(num_passes):
+            indices = sample_frame_indices(total_frames, num_frames)
+            new = [i for i in sorted(set(indices)) if i not in seen]
+            if new:
+                with stage("decode"):
+                    decoded = read_frames(cap, new, keyframes)
+                order = sorted(decoded)
+                if order:
+                    x, found = extract_faces(
+                        [decoded[i] for i in order], mtcnn, return_found=True,
+                        track_indices=order if track else None, stage=stage,
+                    )
+                    seen.update(zip(order, zip(x, found)))
+
+            faces = {i: seen[i][0] for i in indices if i in seen}
+            face_only = {i: t for i, t in faces.items() if seen[i][1]}
+            face_frames = sum(1 for i in indices if i in face_only)
+            step = (
+                assemble_clip(indices, faces, num_frames),
+                assemble_clip(indices, face_only, num_frames) if face_only else None,
+                face_frames,
+            )
+            if return_keys:
+                step += (
+                    clip_frame_keys(indices, faces, num_frames),
+                    clip_frame_keys(indices, face_only, num_frames) if face_only else None,
+                )
+            yield step
+    finally:
+        cap.release()
+
+def window_grid(total_frames: int, fps: float, window_s: float, num_frames: int) -> Tuple[List[int], List[int]]:
+    """
+    Frame grid and window starts for timeline scoring: num_frames evenly
+    spaced grid frames per window of window_s seconds, windows overlapping by
+    half. Returns (grid frame indices, index into the grid where each window
+    starts); the last window is aligned to the end of the video.
+    """
+    step = max(1, int(round(window_s * fps / num_frames)))
+    grid = list(range(0, max(total_frames, 1), step))
+    if len(grid) <= num_frames: return grid, [0]
+    stride = max(1, num_frames // 2)
+    starts = list(range(0, len(grid) - num_frames + 1, stride))
+    if starts[-1] + num_frames < len(grid): starts.append(len(grid) - num_frames)
+    return grid, starts
+
+def iter_video_windows(video_path: Path, window_s: float, num_frames: int, mtcnn: MTCNN, chunk_frames: int = 32, track: bool = False, return_keys: bool = False, stage=None):
+    """
+    Timeline scoring input: yields (start_frame, end_frame, fps, clip) for
+    every window of window_grid(), in order, from a single forward decoding
+    pass. Grid frames are decoded and face-cropped chunk_frames at a time and
+    dropped once no later window needs them, so memory does not grow with
+    the video's length. return_keys=True appends the clip's clip_frame_keys().
+    stage as in iter_video_clips().
+    """
+    stage = stage or _no_stage
+    with stage("decode"):
+        cap, keyframes, total_frames = open_video(video_path, num_frames)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        grid, starts = window_grid(total_frames, fps, window_s, num_frames)
+        faces: Dict[int, torch.Tensor] = {}
+        decoded_upto = 0  # grid positions [0, decoded_upto) have been read
+        for start in starts:
+            window = grid[start : start + num_frames]
+            while decoded_upto < min(start + num_frames, len(grid)):
+                chunk = grid[decoded_upto : decoded_upto + chunk_frames]
+                with stage("decode"):
+                    decoded = read_frames(cap, chunk, keyframes)
+                order = sorted(decoded)
+                if order:
+                    x = extract_faces([decoded[i] for i in order], mtcnn, track_indices=order if track else None, stage=stage)
+                    faces.update(zip(order, x))
+                decoded_upto += len(chunk)
+            for idx in [i for i in faces if i < window[0]]: del faces[idx]
+            step = (window[0], window[-1], fps, assemble_clip(window, faces, num_frames))
+            if return_keys:
+                step += (clip_frame_keys(window, faces, num_frames),)
+            yield step
+    finally:
+        cap.release()
+
+def load_video_clips_face_only(video_path: Path, num_frames: int, num_passes: int, mtcnn: MTCNN, transform: Optional[transforms.Compose] = None, track: bool = False, return_keys: bool = False, stage=None):
+    """
+    num_passes independently jittered samplings of the same video as one
+    (num_passes, T, C, H, W) tensor. Each distinct frame is decoded and
+    face-cropped once, however many passes use it. return_keys=True also
+    returns each pass's clip_frame_keys().
+
+    transform=None uses the batched extract_faces() (Resize/ToTensor/Normalize
+    as in training); pass a transform to run it per face instead.
+    track=True (batched path only) runs MTCNN on anchor frames and tracks
+    faces in between (detect_face_boxes_tracked). stage as in iter_video_clips().
+    """
+    stage = stage or _no_stage
+    with stage("decode"):
+        cap, keyframes, total_frames = open_video(video_path, num_frames)
+        try:
+            passes = [sample_frame_indices(total_frames, num_frames) for _ in range(num_passes)]
+            decoded = read_frames(cap, [i for indices in passes for i in indices], keyframes)
+        finally:
+            cap.release()
+
+    if transform is None:
+        order = sorted(decoded)
+        x = extract_faces([decoded[i] for i in order], mtcnn, track_indices=order if track else None, stage=stage) if order else []
+        faces = dict(zip(order, x))
+    else:
+        faces = {idx: face_tensor(frame, mtcnn, transform) for idx, frame in decoded.items()}
+
+    clips = torch.stack([assemble_clip(indices, faces, num_frames) for indices in passes], dim=0)
+    if return_keys:
+        return clips, [clip_frame_keys(indices, faces, num_frames) for indices in passes]
+    return clips
 
-    return torch.stack(frames[:num_frames], dim=0)
+def load_video_frames_face_only(video_path: Path, num_frames: int, mtcnn: MTCNN, transform: Optional[transforms.Compose] = None, track: bool = False) -> torch.Tensor:
+    return load_video_clips_face_only(video_path, num_frames, 1, mtcnn, transform, track)[0]
 
 class FFPPVideoDataset(Dataset):
-    def __init__(self, samples, mtcnn, num_frames, transform):
+    def __init__(self, samples, mtcnn, num_frames, transform=None):
         self.samples = samples
         self.mtcnn = mtcnn
         self.num_frames = num_frames
@@ -233,11 +630,12 @@ class FFPPVideoDataset(Dataset):
         return torch.zeros((self.num_frames, 3, IMG_SIZE[0], IMG_SIZE[1])), torch.tensor(0.0)
 
 class VideoDeepfakeModel(nn.Module):
-    def __init__(self, backbone_name=BACKBONE_NAME, hidden_size=128, bidirectional=True):
+    def __init__(self, backbone_name=BACKBONE_NAME, hidden_size=128, bidirectional=True, pretrained=True):
         super().__init__()
         
         # Load EfficientNet-B0 (Much lighter than B4)
-        self.backbone = timm.create_model(backbone_name, pretrained=True, num_classes=0, global_pool="avg")
+        # pretrained=False for inference: the checkpoint replaces these weights
+        self.backbone = timm.create_model(backbone_name, pretrained=pretrained, num_classes=0, global_pool="avg")
         feature_dim = self.backbone.num_features
 
         self.gru = nn.GRU(
@@ -257,14 +655,12 @@ class VideoDeepfakeModel(nn.Module):
             nn.Linear(128, 1)
         )
 
-    def forward(self, x):
-        B, T, C, H, W = x.shape
-        x = x.view(B * T, C, H, W)
-        
-        # Extract features
-        feats = self.backbone(x) # (B*T, F)
-        feats = feats.view(B, T, -1)
-        
+    def embed_frames(self, x):
+        """Per-frame backbone features: (N, C, H, W) -> (N, F)."""
+        return self.backbone(x)
+
+    def classify_sequence(self, feats):
+        """Logits from per-frame features: (B, T, F) -> (B,)."""
         # Temporal Modeling
         out, _ = self.gru(feats)
         
@@ -273,6 +669,16 @@ class VideoDeepfakeModel(nn.Module):
         
         return self.classifier(out).squeeze(-1)
 
+    def forward(self, x):
+        B, T, C, H, W = x.shape
+        x = x.view(B * T, C, H, W)
+        
+        # Extract features
+        feats = self.embed_frames(x) # (B*T, F)
+        feats = feats.view(B, T, -1)
+        
+        return self.classify_sequence(feats)
+
 def train_epoch(model, loader, criterion, optimizer, device, accum_steps):
     model.train()
     total_loss, correct, total = 0, 0, 0
@@ -317,25 +723,21 @@ def validate(model, loader, criterion, device):
 def main():
     set_seed(SEED)
     device = get_device()
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
     
     # Data Setup
     root = download_ffpp_dataset()
     train_s, val_s, test_s = build_video_list(root)
     
-    # Smaller image size for B0
-    tfms = transforms.Compose([
-        transforms.Resize(IMG_SIZE),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-    ])
-    
+    # Faces are resized to IMG_SIZE (smaller for B0) and normalized by the
+    # batched extract_faces(); no per-frame transform needed
     # Initializing MTCNN
     print("Loading MTCNN...")
     mtcnn = MTCNN(image_size=IMG_SIZE[0], margin=0, keep_all=False, post_process=False, device=device)
 
-    train_ds = FFPPVideoDataset(train_s, mtcnn, FRAMES_PER_VIDEO, tfms)
-    val_ds = FFPPVideoDataset(val_s, mtcnn, FRAMES_PER_VIDEO, tfms)
-    test_ds = FFPPVideoDataset(test_s, mtcnn, FRAMES_PER_VIDEO, tfms)
+    train_ds = FFPPVideoDataset(train_s, mtcnn, FRAMES_PER_VIDEO)
+    val_ds = FFPPVideoDataset(val_s, mtcnn, FRAMES_PER_VIDEO)
+    test_ds = FFPPVideoDataset(test_s, mtcnn, FRAMES_PER_VIDEO)
     
     train_dl = DataLoader(train_ds, batch_size=BATCH_SIZE, shuffle=True, num_workers=NUM_WORKERS)
     val_dl = DataLoader(val_ds, batch_size=BATCH_SIZE, shuffle=False, num_workers=NUM_WORKERS)
@@ -387,6 +789,9 @@ def main():
             all_preds.extend((out > 0.5).float().cpu().numpy())
             all_lbls.extend(lbl.numpy())
             
+    from sklearn.metrics import classification_report, confusion_matrix
+    import matplotlib.pyplot as plt
+
     print(classification_report(all_lbls, all_preds, target_names=["Fake", "Real"]))
     print("Confusion Matrix:\n", confusion_matrix(all_lbls, all_preds))
     
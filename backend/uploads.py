@@ -0,0 +1,253 @@
+"""
+Streaming uploads to a scratch directory.
+
+FastAPI's UploadFile parameters buffer the whole multipart body before the
+endpoint runs, and reading the file back with `await file.read()` holds it
+in memory once more. For videos that means peak memory grows with the upload
+size. staged_upload() instead parses the request body as it arrives and
+writes the file part straight to UPLOAD_SCRATCH_DIR in chunks while
+hashing it, so memory per request stays at about one chunk:
+
+    async with staged_upload(request, max_bytes, accept=("video/",)) as upload:
+        upload.path, upload.digest, upload.size, upload.filename
+
+Requests are rejected before the body is read when Content-Length already
+exceeds the cap, and as soon as the streamed file crosses it otherwise.
+The temp file is deleted when the block exits, unless upload.detach() handed
+it to work that outlives the request. Files left behind by a
+worker that crashed are removed by sweep_scratch_dir() at startup: every
+name carries the owning process id, so a sweep never touches the (recent)
+files of live workers sharing the directory. Files carrying this process's
+own id are leftovers of an earlier process that had the same pid (a
+restarted container runs as pid 1 again), since nothing has been staged yet.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart import MultipartParser
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart import MultipartParser
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import parse_options_header
+
+# -------------------
+# CONFIG
+# -------------------
+UPLOAD_SCRATCH_DIR = Path(os.getenv("UPLOAD_SCRATCH_DIR", tempfile.gettempdir()))  # may be a tmpfs
+UPLOAD_WRITE_CHUNK_BYTES = int(os.getenv("UPLOAD_WRITE_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_STALE_AGE_S = float(os.getenv("UPLOAD_STALE_AGE_S", str(6 * 3600)))
+
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+FILE_PREFIX = "upload_"
+
+
+class StagedUpload:
+    def __init__(self, path: Path):
+        self.path = path
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self.digest = ""
+        self.detached = False
+
+    def detach(self) -> Path:
+        """Take over the file: staged_upload() will no longer delete it, the caller must."""
+        self.detached = True
+        return self.path
+
+
+def _scratch_path(directory: Path, suffix: str) -> Path:
+    return directory / f"{FILE_PREFIX}{os.getpid()}_{uuid.uuid4().hex}{suffix}"
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_scratch_dir(directory: Path = UPLOAD_SCRATCH_DIR) -> int:
+    """
+    Delete uploads whose worker is gone, that are older than
+    UPLOAD_STALE_AGE_S, or that carry this process's pid. Call at startup,
+    before this process stages anything.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    removed = 0
+    now = time.time()
+    for path in directory.glob(f"{FILE_PREFIX}*"):
+        try:
+            pid = int(path.name[len(FILE_PREFIX):].split("_", 1)[0])
+        except ValueError:
+            continue
+        try:
+            stale = now - path.stat().st_mtime > UPLOAD_STALE_AGE_S
+            if pid == os.getpid() or stale or not pid_alive(pid):
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        print(f"🧹 Removed {removed} stale upload(s) from {directory}")
+    return removed
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File exceeds {max_bytes} bytes")
+
+
+def _write_chunk(f, sha, data: bytes):
+    f.write(data)
+    sha.update(data)
+
+
+async def _receive_file(
+    request: Request,
+    upload: StagedUpload,
+    field: str,
+    max_bytes: int,
+    accept: Sequence[str],
+    type_error: str,
+):
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+
+    # Early rejection: the declared body is already too big
+    declared = request.headers.get("content-length")
+    body_limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+    if declared and declared.isdigit() and int(declared) > body_limit:
+        raise _too_large(max_bytes)
+
+    # Parser callbacks are synchronous; they only collect bytes and headers,
+    # the file I/O happens below, off the event loop
+    state = {"headers": {}, "header": b"", "value": b"", "in_file": False, "done": False}
+    pending = []
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header"].lower()] = state["value"]
+        state["header"], state["value"] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        is_file = (
+            not state["done"]
+            and disposition.get(b"name", b"").decode("latin-1") == field
+            and b"filename" in disposition
+        )
+        state["in_file"] = is_file
+        if is_file:
+            upload.filename = disposition[b"filename"].decode("utf-8", "replace")
+            upload.content_type = state["headers"].get(b"content-type", b"").decode("latin-1")
+
+    def on_part_data(data, start, end):
+        if state["in_file"]:
+            pending.append(data[start:end])
+            upload.size += end - start
+
+    def on_part_end():
+        if state["in_file"]:
+            state["in_file"], state["done"] = False, True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    sha = hashlib.sha256()
+    received = 0
+    f = await run_in_threadpool(open, upload.path, "xb")
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise _too_large(max_bytes)
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+
+            # Wrong type: reject as soon as the part headers are in
+            if upload.content_type is not None and accept and not upload.content_type.startswith(tuple(accept)):
+                raise HTTPException(status_code=400, detail=type_error)
+
+            if upload.size > max_bytes:
+                raise _too_large(max_bytes)
+            if sum(map(len, pending)) >= UPLOAD_WRITE_CHUNK_BYTES:
+                data = b"".join(pending)
+                pending.clear()
+                await run_in_threadpool(_write_chunk, f, sha, data)
+        parser.finalize()
+        if pending:
+            await run_in_threadpool(_write_chunk, f, sha, b"".join(pending))
+            pending.clear()
+    finally:
+        await run_in_threadpool(f.close)
+
+    if not state["done"]:
+        raise HTTPException(status_code=400, detail=f"Missing file field '{field}'.")
+    upload.digest = sha.hexdigest()
+
+
+@asynccontextmanager
+async def staged_upload(
+    request: Request,
+    max_bytes: int,
+    field: str = "file",
+    accept: Sequence[str] = (),
+    suffix: str = "",
+    type_error: str = "Unsupported file type.",
+    directory: Path = UPLOAD_SCRATCH_DIR,
+):
+    """
+    Stream the `field` file of a multipart request to `directory` and yield a
+    StagedUpload; the file is removed on exit. `accept` lists allowed
+    content-type prefixes (empty = any); other types fail with 400 type_error.
+    """
+    upload = StagedUpload(_scratch_path(directory, suffix))
+    try:
+        await _receive_file(request, upload, field, max_bytes, accept, type_error)
+        yield upload
+    finally:
+        if not upload.detached:
+            remove_quietly(upload.path)
+
+
+def remove_quietly(path: Path):
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        pass
@@ -0,0 +1,114 @@
+"""
+Verdict logic of the image (main.py) and video (main_video.py) services.
+
+Kept apart from the services so tools can reproduce exactly what a request
+would have returned without importing a service (which loads its model and
+starts its pools), e.g. training/check_precision_parity.py.
+
+    image   build_verdict(p_fake, looks_like_filtered(p_fake, tex, light, pix))
+            -> (verdict, title, message); verdict is deepfake | filtered |
+            suspicious | authentic
+    video   video_verdict(prob_fake) -> (verdict, confidence, message);
+            verdict is deepfake | real, the message tells an uncertain real
+            from a confident one; prob_fake averages VIDEO_N_PASSES clips
+"""
+
+from typing import Tuple
+
+# -------------------
+# IMAGE
+# -------------------
+# How strict we are when calling something "deepfake"
+DEEPFAKE_THRESHOLD = 0.9   # require very high fake probability
+UNCERTAIN_BAND = 0.10      # around 0.5 → treat as uncertain, favor authentic
+
+# Thresholds for “filter-like manipulation”
+FILTER_STRONG_THRESHOLD = 80  # very strong weirdness
+FILTER_MEDIUM_THRESHOLD = 70  # medium weirdness
+FILTER_MIN_INDICATORS = 2     # how many scores must be high to call it filtered
+
+
+def looks_like_filtered(p_fake: float, tex: int, light: int, pix: int) -> bool:
+    if p_fake >= DEEPFAKE_THRESHOLD:
+        # Model already strongly believes it's a deepfake → don't override
+        return False
+
+    # Count how many indicators are very high
+    strong_indicators = sum(
+        score >= FILTER_STRONG_THRESHOLD for score in (tex, light, pix)
+    )
+
+    # Also treat as filtered if all three are above medium threshold
+    medium_all = all(score >= FILTER_MEDIUM_THRESHOLD for score in (tex, light, pix))
+
+    # Only consider "filtered" primarily when model leans real
+    if p_fake < 0.5 and (strong_indicators >= FILTER_MIN_INDICATORS or medium_all):
+        return True
+
+    return False
+
+def build_verdict(p_fake: float, is_filtered: bool) -> Tuple[str, str, str]:
+    # First, strong deepfake
+    if p_fake >= DEEPFAKE_THRESHOLD:
+        return (
+            "deepfake",
+            "Deepfake Detected",
+            "Strong indicators of facial manipulation consistent with deepfake generation techniques were detected.",
+        )
+
+    # If heuristics say "looks like a filter / heavy effect"
+    if is_filtered:
+        return (
+            "filtered",
+            "Filtered / Visually Manipulated",
+            "The image shows strong signs of filters or heavy visual effects, but not classic deepfake-style face swapping.",
+        )
+
+    # Close to 0.5 → uncertain, but do NOT call deepfake
+    if abs(p_fake - 0.5) <= UNCERTAIN_BAND:
+        return (
+            "suspicious",
+            "Inconclusive Analysis",
+            "Analysis results are borderline. Additional verification is recommended.",
+        )
+
+    # Moderately high fake probability but below deepfake threshold
+    if p_fake >= 0.6:
+        return (
+            "suspicious",
+            "Suspicious Content",
+            "Notable visual inconsistencies detected. Manual verification is recommended.",
+        )
+
+    # Otherwise, treat as authentic
+    return (
+        "authentic",
+        "Authentic Media",
+        "No strong signs of deepfake-style facial manipulation detected.",
+    )
+
+
+# -------------------
+# VIDEO
+# -------------------
+# High threshold: require very strong evidence to call "deepfake"
+VIDEO_DEEPFAKE_THRESHOLD = 0.9
+
+# Around 0.5, treat as "uncertain but likely real"
+VIDEO_UNCERTAIN_BAND = 0.15  # e.g., prob_fake in [0.35, 0.65]
+
+# How many times to resample frames & average predictions (full analysis)
+VIDEO_N_PASSES = 3  # increase for more stability (with more latency)
+
+
+def video_verdict(prob_fake: float) -> Tuple[str, float, str]:
+    """(verdict, confidence in [0, 1], message) for an averaged prob_fake."""
+    prob_real = 1.0 - prob_fake
+
+    # Decision logic with threshold + uncertain zone
+    if prob_fake >= VIDEO_DEEPFAKE_THRESHOLD:
+        return "deepfake", prob_fake, "Video likely manipulated (deepfake)."
+    if abs(prob_fake - 0.5) <= VIDEO_UNCERTAIN_BAND:
+        # In the "uncertain" zone around 0.5 → favor real, but warn
+        return "real", prob_real, "Video appears real, but the model is not very confident."
+    return "real", prob_real, "Video appears authentic."